@@ -0,0 +1,158 @@
+import glob
+import io
+import json
+import os
+import time
+from datetime import datetime
+
+try:
+    import zstandard
+except ImportError:  # zstd output is optional
+    zstandard = None
+
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024  # Rotate after this many (uncompressed) bytes
+DEFAULT_MAX_AGE = 3600                 # Rotate after this many seconds
+DEFAULT_FSYNC_EVERY = 100              # fsync after this many articles...
+DEFAULT_FSYNC_INTERVAL = 5.0           # ...or this many seconds, whichever comes first
+
+
+class ArticleWriter:
+    def __init__(self, prefix, compress=False, max_bytes=DEFAULT_MAX_BYTES, max_age=DEFAULT_MAX_AGE,
+                 fsync_every=DEFAULT_FSYNC_EVERY, fsync_interval=DEFAULT_FSYNC_INTERVAL):
+        """
+        Append-only JSONL sink that articles are streamed into as they are scraped.
+        Files are named <prefix>-<timestamp>-<seq>.jsonl[.zst] and rotated by size/age.
+        Args:
+            prefix: Path prefix for the output files
+            compress: Write zstd-compressed files (needs the zstandard package)
+            max_bytes: Rotate once a file has this many uncompressed bytes
+            max_age: Rotate once a file has been open this many seconds
+            fsync_every: Flush and fsync after this many articles
+            fsync_interval: Flush and fsync at least this often, in seconds
+        """
+        if compress and zstandard is None:
+            raise ImportError("compress=True needs the zstandard package")
+        self.prefix = prefix
+        self.compress = compress
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.fsync_every = fsync_every
+        self.fsync_interval = fsync_interval
+        self.count = 0
+        self.paths = []
+        self._seq = 0
+        self._raw = None
+        self._stream = None
+
+    def _open(self):
+        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+        path = f"{self.prefix}-{timestamp}-{self._seq:04d}.jsonl" + ('.zst' if self.compress else '')
+        self._seq += 1
+        self._raw = open(path, 'ab')
+        # Each sync closes a zstd frame, so a crash loses at most the unsynced tail
+        self._stream = zstandard.ZstdCompressor().stream_writer(self._raw, closefd=False) \
+            if self.compress else self._raw
+        self._opened_at = time.time()
+        self._last_sync = self._opened_at
+        self._bytes = 0
+        self._unsynced = 0
+        self.paths.append(path)
+
+    def write(self, article):
+        """Append one article and sync/rotate when the thresholds are reached."""
+        if self._raw is None:
+            self._open()
+        line = (json.dumps(article, ensure_ascii=False) + '\n').encode('utf-8')
+        self._stream.write(line)
+        self._bytes += len(line)
+        self._unsynced += 1
+        self.count += 1
+
+        now = time.time()
+        if self._unsynced >= self.fsync_every or now - self._last_sync >= self.fsync_interval:
+            self.sync()
+        if self._bytes >= self.max_bytes or now - self._opened_at >= self.max_age:
+            self._close_file()
+
+    def sync(self):
+        """Flush buffered articles to disk."""
+        if self._raw is None or not self._unsynced:
+            return
+        if self.compress:
+            self._stream.flush(zstandard.FLUSH_FRAME)
+        self._raw.flush()
+        os.fsync(self._raw.fileno())
+        self._unsynced = 0
+        self._last_sync = time.time()
+
+    def _close_file(self):
+        self.sync()
+        if self.compress:
+            self._stream.close()
+        self._raw.close()
+        self._raw = self._stream = None
+
+    def close(self):
+        if self._raw is not None:
+            self._close_file()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def _iter_file(path):
+    if path.endswith('.json'):
+        # Legacy single-array dumps
+        with open(path, encoding='utf-8') as f:
+            yield from json.load(f)
+        return
+
+    if path.endswith('.zst'):
+        if zstandard is None:
+            raise ImportError(f"Reading {path} needs the zstandard package")
+        raw = open(path, 'rb')
+        stream = io.TextIOWrapper(
+            zstandard.ZstdDecompressor().stream_reader(raw, read_across_frames=True), encoding='utf-8')
+    else:
+        raw = None
+        stream = open(path, encoding='utf-8')
+
+    with stream:
+        for line in stream:
+            if not line.strip():
+                continue
+            try:
+                yield json.loads(line)
+            except ValueError:
+                # A torn last line from a crash mid-write; everything before it is intact
+                print(f"Skipping unreadable line in {path}")
+    if raw is not None:
+        raw.close()
+
+
+def iter_articles(source, unique=False):
+    """
+    Lazily yield articles from a file, a directory, or a glob pattern.
+    Handles .jsonl, .jsonl.zst and legacy .json array files; files are read
+    in name order, which is write order for ArticleWriter output.
+    With unique=True only the first article seen for each link is yielded, since
+    every run of a writer adds its own files and re-saves stories still in the feed.
+    """
+    if os.path.isdir(source):
+        paths = sorted(glob.glob(os.path.join(source, '*.json*')))
+    elif os.path.exists(source):
+        paths = [source]
+    else:
+        paths = sorted(glob.glob(source))
+    seen = set()
+    for path in paths:
+        for article in _iter_file(path):
+            link = article.get('link') if unique else None
+            if link:
+                if link in seen:
+                    continue
+                seen.add(link)
+            yield article
@@ -0,0 +1,75 @@
+import glob
+import os
+import sys
+import time
+from bs4 import BeautifulSoup
+from extractor import extract_article
+
+# Benchmark the single-pass extractor against the BeautifulSoup html.parser path
+# Usage: python bench_extractor.py [directory of saved article .html pages] [repeats]
+# Without a directory it runs on bench_pages/, article pages laid out like aajtak.in's
+# (Hindi and English, with and without a declared charset, datetime or featured image)
+
+DEFAULT_PAGES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'bench_pages')
+
+def soup_extract(content):
+    """The previous scrape_article logic from test2/test3, kept here as the baseline."""
+    soup = BeautifulSoup(content, "html.parser")
+    title = soup.find("h1").text.strip() if soup.find("h1") else None
+    author = soup.find(class_="author_name").text.strip() if soup.find(class_="author_name") else "Unknown"
+    description = soup.find("meta", {"name": "description"})["content"].strip() if soup.find("meta", {"name": "description"}) else None
+    article_content = " ".join([p.text for p in soup.find_all("p")])
+    published_date = soup.find("time")["datetime"] if soup.find("time") else None
+    image = soup.find("img", {"class": "featured-image"})["src"] if soup.find("img", {"class": "featured-image"}) else None
+    return {
+        'title': title,
+        'author': author,
+        'description': description,
+        'text': article_content,
+        'published_date': published_date,
+        'image_link': image
+    }
+
+def time_extractor(name, extract, pages, repeats):
+    start = time.perf_counter()
+    for _ in range(repeats):
+        for content in pages:
+            try:
+                extract(content)
+            except (KeyError, TypeError):
+                # The baseline raises on pages missing an attribute, as scrape_article did
+                pass
+    elapsed = time.perf_counter() - start
+    per_page = elapsed / (len(pages) * repeats) * 1000
+    print(f"{name:<12} {elapsed:8.2f}s total  {per_page:8.2f} ms/page")
+    return elapsed
+
+def main():
+    pages_dir = sys.argv[1] if len(sys.argv) > 1 else DEFAULT_PAGES_DIR
+    repeats = int(sys.argv[2]) if len(sys.argv) > 2 else 3
+
+    pages = []
+    for path in sorted(glob.glob(os.path.join(pages_dir, '*.html'))):
+        with open(path, 'rb') as f:
+            pages.append(f.read())
+    if not pages:
+        print(f"No .html pages found in {pages_dir}")
+        return
+
+    # Fields that differ between the two paths, so regressions show up next to the timings
+    mismatches = 0
+    for content in pages:
+        try:
+            expected = soup_extract(content)
+        except (KeyError, TypeError):
+            continue
+        actual = extract_article(content)
+        mismatches += sum(1 for key in expected if expected[key] != actual[key])
+    print(f"{len(pages)} pages, {mismatches} mismatched fields")
+
+    baseline = time_extractor('html.parser', soup_extract, pages, repeats)
+    single_pass = time_extractor('single-pass', extract_article, pages, repeats)
+    print(f"Speedup: {baseline / single_pass:.1f}x")
+
+if __name__ == "__main__":
+    main()
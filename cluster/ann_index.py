@@ -0,0 +1,138 @@
+import json
+import os
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import hnswlib
+import numpy as np
+
+DEFAULT_INDEX_PATH = 'ann_index'
+INITIAL_CAPACITY = 10_000   # Elements allocated up front; doubled as the index fills
+EF_CONSTRUCTION = 200       # Build-time candidate list; higher is slower to build but more accurate
+M = 16                      # Graph links per element
+EF_SEARCH = 64              # Query-time candidate list; raised automatically to at least k
+
+
+class ArticleIndex:
+    def __init__(self, dim: int, path: str = DEFAULT_INDEX_PATH, space: str = 'cosine'):
+        """
+        Persistent HNSW index of article embeddings keyed by article (e.g. its link).
+        Supports incremental inserts, deletes and batched top-k queries; the graph
+        is saved to <path>.bin, and the key <-> label map, the dimension and each
+        key's metadata (e.g. the article's title and link) to <path>.keys.json.
+        Args:
+            dim: Embedding dimension
+            path: Path prefix for the index files
+            space: 'cosine', 'ip' or 'l2'
+        """
+        self.dim = dim
+        self.path = path
+        self.space = space
+        self.index = hnswlib.Index(space=space, dim=dim)
+        self.labels: Dict[str, int] = {}
+        self.keys: Dict[int, str] = {}
+        self.metadata: Dict[str, dict] = {}
+        self.next_label = 0
+
+        if os.path.exists(path + '.bin') and os.path.exists(path + '.keys.json'):
+            with open(path + '.keys.json', encoding='utf-8') as f:
+                meta = json.load(f)
+            if meta.get('dim', dim) != dim:
+                raise ValueError(f"{path} holds {meta['dim']}-dimensional vectors, not {dim}")
+            self.index.load_index(path + '.bin', max_elements=meta['capacity'], allow_replace_deleted=True)
+            self.labels = {key: label for key, label in meta['labels']}
+            self.metadata = meta.get('metadata', {})
+            self.next_label = meta['next_label']
+        else:
+            self.index.init_index(max_elements=INITIAL_CAPACITY, ef_construction=EF_CONSTRUCTION,
+                                  M=M, allow_replace_deleted=True)
+        self.keys = {label: key for key, label in self.labels.items()}
+        self.index.set_ef(EF_SEARCH)
+
+    @classmethod
+    def load(cls, path: str = DEFAULT_INDEX_PATH) -> Optional['ArticleIndex']:
+        """Open a saved index with the dimension and space it was built with, or None if there is none."""
+        if not (os.path.exists(path + '.bin') and os.path.exists(path + '.keys.json')):
+            return None
+        with open(path + '.keys.json', encoding='utf-8') as f:
+            meta = json.load(f)
+        if 'dim' not in meta:
+            return None  # Saved before the dimension was stored; rebuilt on the next add
+        return cls(meta['dim'], path=path, space=meta.get('space', 'cosine'))
+
+    def __len__(self):
+        return len(self.labels)
+
+    def __contains__(self, key):
+        return key in self.labels
+
+    def add(self, keys: Sequence[str], vectors: np.ndarray, metadata: Sequence[dict] = None):
+        """Insert (or replace) the vectors for `keys`, with optional metadata returned by get()."""
+        if not len(keys):
+            return
+        if len(set(keys)) < len(keys):
+            # One label per key: the last copy of a repeated key wins
+            rows = sorted({key: row for row, key in enumerate(keys)}.values())
+            keys = [keys[row] for row in rows]
+            vectors = np.asarray(vectors)[rows]
+            metadata = [metadata[row] for row in rows] if metadata is not None else None
+        self.remove([key for key in keys if key in self.labels])
+        # Slots freed by deletes are reused, so the index only grows with live articles
+        needed = len(self.labels) + len(keys)
+        capacity = self.index.get_max_elements()
+        if needed > capacity:
+            while capacity < needed:
+                capacity *= 2
+            self.index.resize_index(capacity)
+
+        labels = np.arange(self.next_label, self.next_label + len(keys))
+        self.next_label += len(keys)
+        self.index.add_items(np.asarray(vectors, dtype=np.float32), labels, replace_deleted=True)
+        for key, label in zip(keys, labels.tolist()):
+            self.labels[key] = label
+            self.keys[label] = key
+        if metadata is not None:
+            self.metadata.update(zip(keys, metadata))
+
+    def get(self, key: str) -> Optional[dict]:
+        """Metadata stored with `key`, or None."""
+        return self.metadata.get(key)
+
+    def remove(self, keys: Sequence[str]):
+        """Delete articles from the index; unknown keys are ignored."""
+        for key in keys:
+            label = self.labels.pop(key, None)
+            if label is not None:
+                del self.keys[label]
+                self.metadata.pop(key, None)
+                self.index.mark_deleted(label)
+
+    def query(self, vectors: np.ndarray, k: int = 10) -> List[List[Tuple[str, float]]]:
+        """
+        Top-k neighbours for each query vector, as (key, similarity) pairs sorted
+        by decreasing similarity. For cosine/ip spaces similarity is 1 - distance;
+        for l2 it is the negated squared distance.
+        """
+        vectors = np.atleast_2d(np.asarray(vectors, dtype=np.float32))
+        k = min(k, len(self))
+        if not k:
+            return [[] for _ in vectors]
+        self.index.set_ef(max(EF_SEARCH, k))
+        labels, distances = self.index.knn_query(vectors, k=k)
+        scores = -distances if self.space == 'l2' else 1 - distances
+        # Labels missing from the key map (a crash between the two renames in save) are skipped
+        return [
+            [(self.keys[label], float(score)) for label, score in zip(row_labels.tolist(), row_scores)
+             if label in self.keys]
+            for row_labels, row_scores in zip(labels, scores)
+        ]
+
+    def save(self):
+        # Both files are written in full before either replaces the saved copy
+        self.index.save_index(self.path + '.bin.tmp')
+        tmp_path = self.path + '.keys.json.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'dim': self.dim, 'space': self.space, 'capacity': self.index.get_max_elements(),
+                       'next_label': self.next_label, 'labels': list(self.labels.items()),
+                       'metadata': self.metadata}, f, ensure_ascii=False)
+        os.replace(self.path + '.bin.tmp', self.path + '.bin')
+        os.replace(tmp_path, self.path + '.keys.json')
@@ -7,17 +7,35 @@ import umap
 import hdbscan
 from typing import List, Dict, Tuple
 import pandas as pd
-import json
+import os
+import sys
+
+# Shared crawler modules live in the repository root
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from article_store import iter_articles
+from near_dup import fold_near_duplicates
+from embedding_cache import EmbeddingCache, text_digest
+from ann_index import ArticleIndex
+
+# Article fields kept with each indexed vector
+INDEX_METADATA_FIELDS = ('title', 'link', 'content', 'published_date')
 
 class NewsClusteringPipeline:
-    def __init__(self, model_name: str = "all-MiniLM-L6-v2"):
+    def __init__(self, model_name: str = "all-MiniLM-L6-v2", index_path: str = 'ann_index'):
         """
         Initialize the news clustering pipeline.
         Args:
             model_name: Name of the sentence transformer model to use
+            index_path: Path prefix of the persistent nearest-neighbour index
         """
         # Initialize BERT-based sentence transformer for embeddings
         self.encoder = SentenceTransformer(model_name)
+        # Articles seen in earlier runs are read back from disk instead of re-encoded
+        self.embedding_cache = EmbeddingCache(model_name)
+        # HNSW index over every article indexed so far, reopened from disk if an earlier run
+        # saved one; otherwise created once the embedding size is known
+        self.index_path = index_path
+        self.article_index = ArticleIndex.load(index_path)
         
         # Initialize BERTopic model with custom parameters
         self.topic_model = BERTopic(
@@ -48,10 +66,14 @@ class NewsClusteringPipeline:
             DataFrame with clustering results and topic information
         """
         # Combine title and content for better context
-        texts = [f"{art['title']}. {art['content']}" for art in articles]
+        # Fit on one copy of each story; near-duplicates take their first copy's topic
+        unique_articles, assignment = fold_near_duplicates(articles)
+        texts = [f"{art['title']}. {art['content']}" for art in unique_articles]
         
         # Fit the topic model and transform the documents
-        topics, probs = self.topic_model.fit_transform(texts)
+        embeddings = self.embedding_cache.encode(self.encoder, texts)
+        topics, probs = self.topic_model.fit_transform(texts, embeddings=embeddings)
+        topics, probs = np.asarray(topics)[assignment], np.asarray(probs)[assignment]
         
         # Get topic info and representative terms
         topic_info = self.topic_model.get_topic_info()
@@ -73,6 +95,65 @@ class NewsClusteringPipeline:
         
         return results_df, topic_mapping
     
+    @staticmethod
+    def _article_text(article: Dict) -> str:
+        return f"{article['title']}. {article['content']}"
+
+    @staticmethod
+    def _article_key(article: Dict) -> str:
+        # Articles without a link are keyed by their text
+        return article.get('link') or text_digest(NewsClusteringPipeline._article_text(article)).hex()
+
+    @staticmethod
+    def _article_metadata(article: Dict) -> Dict:
+        # Stored with the index so later runs can return matches without the article files
+        return {field: article[field] for field in INDEX_METADATA_FIELDS if field in article}
+
+    def index_articles(self, articles: List[Dict]):
+        """
+        Add articles to the persistent nearest-neighbour index. Articles already
+        indexed are skipped, and embeddings come from the on-disk cache, so only
+        new articles are encoded.
+        """
+        if self.article_index is not None:
+            articles = [art for art in articles if self._article_key(art) not in self.article_index]
+        if not articles:
+            return
+        embeddings = self.embedding_cache.encode(self.encoder, [self._article_text(art) for art in articles])
+        if self.article_index is None:
+            self.article_index = ArticleIndex(embeddings.shape[1], path=self.index_path)
+        new = [i for i, art in enumerate(articles) if self._article_key(art) not in self.article_index]
+        self.article_index.add([self._article_key(articles[i]) for i in new], embeddings[new],
+                               [self._article_metadata(articles[i]) for i in new])
+        self.article_index.save()
+
+    def get_similar_articles_batch(self,
+                                   target_articles: List[Dict],
+                                   threshold: float = 0.7,
+                                   top_k: int = 10) -> List[List[Dict]]:
+        """
+        Find the articles most similar to each target with one batched ANN query
+        over everything added by index_articles (in this or earlier runs).
+        
+        Args:
+            target_articles: Articles to find related stories for
+            threshold: Similarity threshold for matching
+            top_k: Maximum number of matches per target
+            
+        Returns:
+            For each target, its matches sorted by decreasing similarity, as the
+            metadata stored when they were indexed (title, link, content, ...).
+        """
+        if self.article_index is None or not len(self.article_index):
+            return [[] for _ in target_articles]
+        target_embeddings = self.embedding_cache.encode(
+            self.encoder, [self._article_text(art) for art in target_articles])
+        return [
+            [{**(self.article_index.get(key) or {'link': key}), 'similarity_score': score}
+             for key, score in neighbours if score > threshold]
+            for neighbours in self.article_index.query(target_embeddings, k=top_k)
+        ]
+
     def get_similar_articles(self, 
                            target_article: Dict,
                            articles: List[Dict],
@@ -88,12 +169,13 @@ class NewsClusteringPipeline:
         Returns:
             List of similar articles
         """
-        target_text = f"{target_article['title']}. {target_article['content']}"
-        compare_texts = [f"{art['title']}. {art['content']}" for art in articles]
-        
-        # Generate embeddings
-        target_embedding = self.encoder.encode(target_text)
-        article_embeddings = self.encoder.encode(compare_texts)
+        if not articles:
+            return []
+        # Embeddings come from the on-disk cache, so only articles never seen before are encoded;
+        # the persistent index is neither searched nor written here
+        embeddings = self.embedding_cache.encode(
+            self.encoder, [self._article_text(art) for art in [target_article] + list(articles)])
+        target_embedding, article_embeddings = embeddings[0], embeddings[1:]
         
         # Calculate similarities
         similarities = np.dot(article_embeddings, target_embedding) / (
@@ -111,8 +193,7 @@ class NewsClusteringPipeline:
 
 def example_usage():
     # Sample articles
-    with open ('articles.json') as f:
-        articles = json.load(f)
+    articles = list(iter_articles('feed_articles-*.jsonl*', unique=True))
     
     # Initialize pipeline
     pipeline = NewsClusteringPipeline()
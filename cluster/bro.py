@@ -8,21 +8,51 @@ import hdbscan
 from typing import List, Dict, Tuple
 import pandas as pd
 import json
-from datetime import datetime
+from datetime import datetime, timedelta
 import os
+import sys
+
+# Shared crawler modules live in the repository root
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from article_store import iter_articles
+from cluster_format import group_items
+from near_dup import fold_near_duplicates
+from embedding_cache import EmbeddingCache, text_digest
+
+REFIT_INTERVAL = timedelta(days=1)   # Warm-started models older than this are refit
+REFIT_AFTER = 5000                    # ... as are models that have labelled this many new articles
 
 class NewsClusteringPipeline:
-    def __init__(self, model_name: str = "all-MiniLM-L6-v2"):
+    def __init__(self, model_name: str = "all-MiniLM-L6-v2", model_path: str = 'bertopic_model',
+                 refit_interval: timedelta = REFIT_INTERVAL, refit_after: int = REFIT_AFTER):
         """
         Initialize the news clustering pipeline.
         Args:
             model_name: Name of the sentence transformer model to use
+            model_path: Where the fitted topic model is kept for warm starts
+            refit_interval: Age after which a warm-started model is refit
+            refit_after: Number of labelled articles after which it is refit
         """
         # Initialize BERT-based sentence transformer for embeddings
         self.encoder = SentenceTransformer(model_name)
+        # Articles seen in earlier runs are read back from disk instead of re-encoded
+        self.embedding_cache = EmbeddingCache(model_name)
+        
+        self.model_path = model_path
+        self.refit_interval = refit_interval
+        self.refit_after = refit_after
+        # When the current topic model was fit and how many articles it has labelled since
+        self.fitted_at = None
+        self.labelled_since_fit = 0
+        # Article key -> (topic, probability) from the current model, so articles
+        # already fit or labelled are never labelled (or counted) again
+        self.labels = {}
         
-        # Initialize BERTopic model with custom parameters
-        self.topic_model = BERTopic(
+        self.topic_model = self._new_topic_model()
+
+    def _new_topic_model(self) -> BERTopic:
+        """BERTopic model with custom parameters, not yet fit."""
+        return BERTopic(
             embedding_model=self.encoder,
             umap_model=umap.UMAP(
                 n_neighbors=15,
@@ -39,10 +69,98 @@ class NewsClusteringPipeline:
             verbose=True
         )
 
-    def process_articles(self, articles: List[Dict]) -> Tuple[pd.DataFrame, Dict]:
-        """Process and cluster news articles."""
+    def _texts_and_embeddings(self, articles: List[Dict]) -> Tuple[List[str], np.ndarray]:
         texts = [f"{art['title']}. {art['content']}" for art in articles]
-        topics, probs = self.topic_model.fit_transform(texts)
+        return texts, self.embedding_cache.encode(self.encoder, texts)
+
+    @staticmethod
+    def _article_key(article: Dict) -> str:
+        # Articles without a link are keyed by their text
+        return article.get('link') or text_digest(f"{article['title']}. {article['content']}").hex()
+
+    def _remember_labels(self, articles: List[Dict], topics, probs):
+        probs = np.asarray(probs)
+        for art, topic, prob in zip(articles, topics, probs):
+            self.labels[self._article_key(art)] = (int(topic), prob.tolist())
+
+    def save_topic_model(self):
+        """Persist the fitted BERTopic model (with its UMAP and HDBSCAN state) and fit metadata."""
+        # The encoder is not saved; load_topic_model hands the pipeline's own back in
+        self.topic_model.save(self.model_path, serialization='pickle', save_embedding_model=False)
+        self._save_fit_state()
+
+    def _save_fit_state(self):
+        tmp_path = f"{self.model_path}.json.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'fitted_at': self.fitted_at.isoformat(),
+                       'labelled_since_fit': self.labelled_since_fit,
+                       'labels': self.labels}, f)
+        os.replace(tmp_path, f"{self.model_path}.json")
+
+    def load_topic_model(self) -> bool:
+        """Load a topic model saved by an earlier run. Returns False if there is none."""
+        if not (os.path.exists(self.model_path) and os.path.exists(f"{self.model_path}.json")):
+            return False
+        self.topic_model = BERTopic.load(self.model_path, embedding_model=self.encoder)
+        with open(f"{self.model_path}.json", encoding='utf-8') as f:
+            state = json.load(f)
+        self.fitted_at = datetime.fromisoformat(state['fitted_at'])
+        self.labelled_since_fit = state['labelled_since_fit']
+        self.labels = {key: tuple(label) for key, label in state.get('labels', {}).items()}
+        return True
+
+    def needs_refit(self) -> bool:
+        """Whether the topic model is missing or due for its scheduled full refit."""
+        return (self.fitted_at is None
+                or datetime.now() - self.fitted_at >= self.refit_interval
+                or self.labelled_since_fit >= self.refit_after)
+
+    def fit(self, articles: List[Dict]) -> Tuple[List[int], np.ndarray]:
+        """Fit a fresh topic model on a reference window of articles and save it."""
+        texts, embeddings = self._texts_and_embeddings(articles)
+        self.topic_model = self._new_topic_model()
+        topics, probs = self.topic_model.fit_transform(texts, embeddings=embeddings)
+        self.fitted_at = datetime.now()
+        self.labelled_since_fit = 0
+        self.labels = {}
+        self._remember_labels(articles, topics, probs)
+        self.save_topic_model()
+        return topics, probs
+
+    def label_articles(self, articles: List[Dict]) -> Tuple[List[int], np.ndarray]:
+        """
+        Assign articles to the fitted model's topics without refitting: UMAP.transform
+        plus HDBSCAN approximate_predict on their (cached) embeddings. Articles this
+        model already fit or labelled keep their stored topic; only new ones are
+        labelled and counted towards the refit.
+        """
+        new = [art for art in articles if self._article_key(art) not in self.labels]
+        if new:
+            texts, embeddings = self._texts_and_embeddings(new)
+            topics, probs = self.topic_model.transform(texts, embeddings=embeddings)
+            self._remember_labels(new, topics, probs)
+            self.labelled_since_fit += len(new)
+            self._save_fit_state()
+        labels = [self.labels[self._article_key(art)] for art in articles]
+        return [topic for topic, _ in labels], np.asarray([prob for _, prob in labels])
+
+    def process_articles(self, articles: List[Dict], warm_start: bool = False) -> Tuple[pd.DataFrame, Dict]:
+        """
+        Process and cluster news articles.
+        With warm_start the topic model saved by an earlier run labels the articles
+        and is only refit (on these articles) when missing or due per the schedule;
+        otherwise it is refit from scratch every call.
+        """
+        # Fit on one copy of each story; near-duplicates take their first copy's topic
+        unique_articles, assignment = fold_near_duplicates(articles)
+        if warm_start and (self.fitted_at is not None or self.load_topic_model()) and not self.needs_refit():
+            topics, probs = self.label_articles(unique_articles)
+        elif warm_start:
+            topics, probs = self.fit(unique_articles)
+        else:
+            texts, embeddings = self._texts_and_embeddings(unique_articles)
+            topics, probs = self.topic_model.fit_transform(texts, embeddings=embeddings)
+        topics, probs = np.asarray(topics)[assignment], np.asarray(probs)[assignment]
         
         topic_info = self.topic_model.get_topic_info()
         
@@ -68,23 +186,25 @@ class NewsClusteringPipeline:
         """
         clusters = {}
         
+        # One pass to build the records and one argsort to group them by topic
+        records = results_df[['title', 'content', 'confidence']].to_dict('records')
+        groups = group_items(records, results_df['topic_id'].to_numpy(), noise=None)
+        
         # Handle unclustered articles (topic_id = -1)
-        unclustered = results_df[results_df['topic_id'] == -1]
-        if not unclustered.empty:
+        if -1 in groups:
             clusters['unclustered'] = {
-                'articles': unclustered[['title', 'content', 'confidence']].to_dict('records'),
+                'articles': groups[-1],
                 'keywords': ['unclustered'],
-                'article_count': len(unclustered)
+                'article_count': len(groups[-1])
             }
         
         # Handle clustered articles
         for topic_id in topic_mapping.keys():
-            cluster_articles = results_df[results_df['topic_id'] == topic_id]
-            if not cluster_articles.empty:
+            if topic_id in groups:
                 clusters[f'cluster_{topic_id}'] = {
-                    'articles': cluster_articles[['title', 'content', 'confidence']].to_dict('records'),
+                    'articles': groups[topic_id],
                     'keywords': topic_mapping[topic_id],
-                    'article_count': len(cluster_articles)
+                    'article_count': len(groups[topic_id])
                 }
         
         return clusters
@@ -124,14 +244,13 @@ class NewsClusteringPipeline:
 
 def example_usage():
     # Sample articles
-    with open('articles.json') as f:
-        articles = json.load(f)
+    articles = list(iter_articles('feed_articles-*.jsonl*', unique=True))
     
     # Initialize pipeline
     pipeline = NewsClusteringPipeline()
     
-    # Process articles
-    results_df, topic_mapping = pipeline.process_articles(articles)
+    # Process articles; with --warm-start the saved topic model labels them unless a refit is due
+    results_df, topic_mapping = pipeline.process_articles(articles, warm_start='--warm-start' in sys.argv)
     
     # Format clusters
     clusters = pipeline.format_clusters(results_df, topic_mapping)
@@ -0,0 +1,93 @@
+from typing import Dict, Hashable, List, Optional, Sequence
+
+import numpy as np
+from scipy import sparse
+from sklearn.preprocessing import normalize
+
+# Assembling clustering output: every grouping is one stable argsort over the
+# labels, and within-cluster similarities come from per-cluster sums of unit
+# vectors (|sum|^2 = n + sum of pairwise similarities) instead of n x n blocks.
+
+
+def group_indices(labels: Sequence[Hashable], noise: Optional[Hashable] = -1) -> Dict[Hashable, np.ndarray]:
+    """
+    Row indices of each label, in order of first appearance; rows within a
+    label keep their input order. Rows labelled `noise` are left out
+    (pass noise=None to keep them).
+    """
+    labels = np.asarray(labels)
+    if not len(labels):
+        return {}
+    unique, first, inverse = np.unique(labels, return_index=True, return_inverse=True)
+    order = np.argsort(inverse, kind='stable')
+    bounds = np.cumsum(np.bincount(inverse, minlength=len(unique)))[:-1]
+    members = np.split(order, bounds)
+    return {unique[i].item(): members[i] for i in np.argsort(first)
+            if noise is None or unique[i] != noise}
+
+
+def _unit_rows(vectors):
+    if sparse.issparse(vectors):
+        return normalize(vectors.tocsr())
+    return normalize(np.asarray(vectors, dtype=np.float32))
+
+
+def _cluster_sums(unit, labels):
+    """Indicator matrix (cluster x row) of the clustered rows and the per-cluster vector sums."""
+    clustered = np.nonzero(labels >= 0)[0]
+    _, cluster_of = np.unique(labels[clustered], return_inverse=True)
+    indicator = sparse.csr_matrix((np.ones(len(clustered), dtype=np.float32), (cluster_of, clustered)),
+                                  shape=(cluster_of.max() + 1 if len(clustered) else 0, unit.shape[0]))
+    return clustered, cluster_of, indicator @ unit
+
+
+def member_similarity(vectors, labels) -> np.ndarray:
+    """
+    Each row's mean cosine similarity to the other members of its cluster, in
+    O(N x dim). Noise rows (label -1) and singleton clusters get NaN.
+    """
+    labels = np.asarray(labels)
+    unit = _unit_rows(vectors)
+    result = np.full(len(labels), np.nan)
+    clustered, cluster_of, sums = _cluster_sums(unit, labels)
+    if not len(clustered):
+        return result
+    # Similarity of each member to its own cluster's sum, minus its similarity to itself
+    own_sums = sums[cluster_of]
+    member_rows = unit[clustered]
+    dots = np.asarray(member_rows.multiply(own_sums).sum(axis=1)).ravel() if sparse.issparse(member_rows) \
+        else np.einsum('ij,ij->i', member_rows, own_sums)
+    sizes = np.bincount(cluster_of)[cluster_of]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        result[clustered] = np.where(sizes > 1, (dots - 1) / (sizes - 1), np.nan)
+    return result
+
+
+def mean_intra_similarity(vectors, labels) -> Optional[float]:
+    """Average over clusters of the mean pairwise cosine similarity inside the cluster."""
+    labels = np.asarray(labels)
+    unit = _unit_rows(vectors)
+    clustered, cluster_of, sums = _cluster_sums(unit, labels)
+    if not len(clustered):
+        return None
+    squared = np.asarray(sums.multiply(sums).sum(axis=1)).ravel() if sparse.issparse(sums) \
+        else np.einsum('ij,ij->i', sums, sums)
+    sizes = np.bincount(cluster_of)
+    pairs = sizes > 1
+    if not pairs.any():
+        return None
+    return float(np.mean((squared[pairs] - sizes[pairs]) / (sizes[pairs] * (sizes[pairs] - 1))))
+
+
+def group_items(items: Sequence, labels, similarity: Optional[np.ndarray] = None,
+                noise: Optional[Hashable] = -1) -> Dict[Hashable, List]:
+    """
+    Items of each cluster, in label first-appearance order. With `similarity`
+    (e.g. from member_similarity) each cluster is sorted most similar first.
+    """
+    groups = {}
+    for label, members in group_indices(labels, noise=noise).items():
+        if similarity is not None:
+            members = members[np.argsort(-similarity[members], kind='stable')]
+        groups[label] = [items[i] for i in members]
+    return groups
@@ -0,0 +1,172 @@
+import fcntl
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import unicodedata
+from contextlib import contextmanager
+from typing import List
+
+import numpy as np
+
+DEFAULT_CACHE_DIR = 'embedding_cache'
+INITIAL_CAPACITY = 1024   # Rows allocated when a store is created; doubled as it fills
+LOOKUP_CHUNK = 500        # Digests per SQLite IN (...) query
+# encode() arguments that change how texts are batched or returned, not the vectors
+NON_VECTOR_KWARGS = {'batch_size', 'show_progress_bar', 'device', 'convert_to_numpy', 'convert_to_tensor'}
+
+_WHITESPACE_RE = re.compile(r'\s+')
+
+
+def normalize_text(text: str) -> str:
+    """Text as the cache keys it: NFKC-normalized with whitespace collapsed."""
+    return _WHITESPACE_RE.sub(' ', unicodedata.normalize('NFKC', text)).strip()
+
+
+def text_digest(text: str, variant: str = '') -> bytes:
+    """Cache key of a text; `variant` tells apart vectors encoded with different settings."""
+    key = normalize_text(text) + ('\0' + variant if variant else '')
+    return hashlib.blake2b(key.encode('utf-8'), digest_size=16).digest()
+
+
+def encode_variant(encode_kwargs: dict) -> str:
+    """The encode() arguments that affect the vectors (e.g. normalize_embeddings), as a string."""
+    settings = {name: value for name, value in encode_kwargs.items() if name not in NON_VECTOR_KWARGS}
+    return json.dumps(settings, sort_keys=True, default=str) if settings else ''
+
+
+class EmbeddingCache:
+    def __init__(self, model_name: str, cache_dir: str = DEFAULT_CACHE_DIR, dtype: str = 'float32'):
+        """
+        On-disk embedding store for one model: a memory-mapped matrix of vectors
+        plus a SQLite index from normalized-text hash to row, so a text is only
+        ever encoded once per model and set of encode() settings. Several processes
+        may share a store; appending rows is serialized by a lock file.
+        Args:
+            model_name: Name of the model the embeddings come from; each model gets its own store
+            cache_dir: Directory holding the per-model stores
+            dtype: 'float32', or 'float16' to halve the disk and page-cache footprint
+        """
+        self.model_name = model_name
+        self.path = os.path.join(cache_dir, re.sub(r'[^\w.-]+', '_', model_name))
+        os.makedirs(self.path, exist_ok=True)
+        self.meta_path = os.path.join(self.path, 'meta.json')
+        self.vectors_path = os.path.join(self.path, 'vectors.bin')
+        self.lock_path = os.path.join(self.path, 'lock')
+
+        self.conn = sqlite3.connect(os.path.join(self.path, 'index.db'))
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('CREATE TABLE IF NOT EXISTS rows (digest BLOB PRIMARY KEY, row INTEGER NOT NULL) WITHOUT ROWID')
+        self.conn.commit()
+
+        self.dtype = np.dtype(dtype)
+        self.dim = None       # Known once the first batch is encoded
+        self.capacity = 0
+        self.vectors = None
+        self._refresh()
+
+    def _refresh(self):
+        """Pick up rows and growth written by other processes sharing the store."""
+        if os.path.exists(self.meta_path):
+            with open(self.meta_path) as f:
+                meta = json.load(f)
+            self.dtype = np.dtype(meta['dtype'])
+            self.dim = meta['dim']
+            if meta['capacity'] != self.capacity or self.vectors is None:
+                self.capacity = meta['capacity']
+                self.vectors = self._open()
+        self.size = self.conn.execute('SELECT COUNT(*) FROM rows').fetchone()[0]
+
+    @contextmanager
+    def _locked(self):
+        # Cross-process: row numbers and file growth must be decided by one writer at a time
+        with open(self.lock_path, 'a') as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    def _open(self):
+        return np.memmap(self.vectors_path, dtype=self.dtype, mode='r+', shape=(self.capacity, self.dim))
+
+    def _save_meta(self):
+        with open(self.meta_path + '.tmp', 'w') as f:
+            json.dump({'model_name': self.model_name, 'dtype': self.dtype.name,
+                       'dim': self.dim, 'capacity': self.capacity}, f)
+        os.replace(self.meta_path + '.tmp', self.meta_path)
+
+    def _reserve(self, rows: int):
+        """Grow the matrix file so it can hold `rows` vectors."""
+        if rows <= self.capacity:
+            return
+        capacity = max(self.capacity, INITIAL_CAPACITY)
+        while capacity < rows:
+            capacity *= 2
+        if self.vectors is not None:
+            self.vectors.flush()
+            del self.vectors
+        with open(self.vectors_path, 'ab') as f:
+            f.truncate(capacity * self.dim * self.dtype.itemsize)
+        self.capacity = capacity
+        self.vectors = self._open()
+        self._save_meta()
+
+    def _lookup(self, digests: List[bytes]) -> dict:
+        rows = {}
+        for start in range(0, len(digests), LOOKUP_CHUNK):
+            chunk = digests[start:start + LOOKUP_CHUNK]
+            placeholders = ','.join('?' * len(chunk))
+            rows.update(self.conn.execute(
+                f'SELECT digest, row FROM rows WHERE digest IN ({placeholders})', chunk))
+        return rows
+
+    def encode(self, encoder, texts: List[str], **encode_kwargs) -> np.ndarray:
+        """
+        Embeddings for `texts` as a float32 array, in order. Only texts missing from
+        the store are passed to `encoder.encode` (once each, in a single batch call)
+        and appended to it. Vectors are keyed by `encode_kwargs` too, so e.g.
+        normalize_embeddings=True never returns vectors cached without it.
+        """
+        variant = encode_variant(encode_kwargs)
+        digests = [text_digest(text, variant) for text in texts]
+        rows = self._lookup(list(set(digests)))
+
+        missing = {}
+        for digest, text in zip(digests, texts):
+            if digest not in rows and digest not in missing:
+                missing[digest] = text
+        if missing:
+            # Encoding is the slow part, so it happens outside the lock
+            new_vectors = np.asarray(encoder.encode(list(missing.values()), **encode_kwargs))
+            with self._locked():
+                # Another process may have grown the store or added some of these texts meanwhile
+                self._refresh()
+                rows.update(self._lookup(list(missing)))
+                todo = [i for i, digest in enumerate(missing) if digest not in rows]
+                if todo:
+                    if self.dim is None:
+                        self.dim = new_vectors.shape[1]
+                    self._reserve(self.size + len(todo))
+                    self.vectors[self.size:self.size + len(todo)] = new_vectors[todo]
+                    self.vectors.flush()
+                    keys = list(missing)
+                    new_rows = {keys[i]: self.size + n for n, i in enumerate(todo)}
+                    # Rows are only indexed after their vectors are on disk
+                    self.conn.executemany('INSERT INTO rows (digest, row) VALUES (?, ?)', new_rows.items())
+                    self.conn.commit()
+                    self.size += len(todo)
+                    rows.update(new_rows)
+        elif rows and max(rows.values()) >= self.capacity:
+            # Rows appended by another process beyond the part of the file mapped here
+            self._refresh()
+
+        if not texts:
+            return np.empty((0, self.dim or 0), dtype=np.float32)
+        return np.asarray(self.vectors[[rows[digest] for digest in digests]], dtype=np.float32)
+
+    def close(self):
+        if self.vectors is not None:
+            self.vectors.flush()
+        self.conn.close()
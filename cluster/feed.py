@@ -1,16 +1,41 @@
 import feedparser
-import json
+import os
+import sys
+import time
+import requests
+from collections import Counter, namedtuple
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime
+from requests.adapters import HTTPAdapter
 
-def scrape_rss_feed(feed_url):
-    # Parse the RSS feed
-    feed = feedparser.parse(feed_url)
-    
-    # Check if the feed was successfully parsed
-    if feed.bozo:
-        print(f"Error parsing the feed: {feed_url}")
-        return []
-    
+# Shared crawler modules live in the repository root
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from http_cache import cached_get
+from article_store import ArticleWriter
+from frontier import URLFrontier
+from near_dup import NearDuplicateIndex, article_text
+from feed_scheduler import FeedScheduler
+
+FEED_TIMEOUT = 15       # Seconds per feed request
+MAX_FEED_WORKERS = 32   # Feeds fetched and parsed at the same time
+
+# Outcome of polling one feed. status is 'ok', 'not_modified', 'http_error',
+# 'parse_error' or 'error'; latency is the fetch + parse time in seconds.
+# response is the CachedResponse of an 'ok' poll: call response.commit() once its
+# articles are handled so the next poll may answer 304
+FeedResult = namedtuple('FeedResult', ['url', 'status', 'articles', 'feed', 'latency', 'error', 'response'],
+                        defaults=(None,))
+
+def make_session(pool_size=MAX_FEED_WORKERS):
+    """requests session whose connection pool is large enough for every poller thread."""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
+
+def parse_entries(feed):
+    """Turn parsed feed entries into article dicts."""
     articles = []
     
     # Loop through all the entries (articles) in the RSS feed
@@ -30,7 +55,7 @@ def scrape_rss_feed(feed_url):
         article_info = {
             'title': title,
             'link': link,
-            'summary': summary,
+            'content': summary,
             'published_date': published_date
         }
         
@@ -38,19 +63,86 @@ def scrape_rss_feed(feed_url):
     
     return articles
 
-def scrape_multiple_feeds(feed_urls):
+def poll_feed(feed_url, session=None, timeout=FEED_TIMEOUT):
+    """Fetch and parse one feed, returning a FeedResult instead of raising."""
+    start = time.perf_counter()
+    try:
+        # Conditional GET: a 304 means no new entries, so skip parsing entirely
+        response = cached_get(feed_url, session=session, timeout=timeout)
+        if response.not_modified:
+            return FeedResult(feed_url, 'not_modified', [], None, time.perf_counter() - start, None)
+        if response.status != 200:
+            return FeedResult(feed_url, 'http_error', [], None, time.perf_counter() - start,
+                              f"HTTP {response.status}")
+
+        # Parse the RSS feed
+        feed = feedparser.parse(response.content)
+        
+        # Check if the feed was successfully parsed
+        if feed.bozo:
+            return FeedResult(feed_url, 'parse_error', [], feed, time.perf_counter() - start,
+                              str(feed.get('bozo_exception')))
+
+        return FeedResult(feed_url, 'ok', parse_entries(feed), feed, time.perf_counter() - start, None, response)
+    except Exception as e:
+        return FeedResult(feed_url, 'error', [], None, time.perf_counter() - start, str(e))
+
+def scrape_rss_feed(feed_url, session=None, timeout=FEED_TIMEOUT):
+    # Validators are not committed here since the caller handles the articles only
+    # after this returns, so the feed is fetched in full again next time
+    result = poll_feed(feed_url, session=session, timeout=timeout)
+    if result.status == 'not_modified':
+        print(f"Feed unchanged since last poll: {feed_url}")
+    elif result.status != 'ok':
+        print(f"Error fetching or parsing the feed: {feed_url} ({result.error})")
+    return result.articles
+
+def poll_feeds(feed_urls, max_workers=MAX_FEED_WORKERS, timeout=FEED_TIMEOUT, session=None):
+    """
+    Poll feeds concurrently and yield a FeedResult for each one as it finishes,
+    so a poll cycle takes about as long as the slowest feed. Fetching and
+    parsing run in worker threads that share one connection pool.
+    """
+    feed_urls = list(feed_urls)
+    if not feed_urls:
+        return
+    max_workers = min(max_workers, len(feed_urls))
+    session = session or make_session(max_workers)
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = [executor.submit(poll_feed, url, session, timeout) for url in feed_urls]
+        for future in as_completed(futures):
+            yield future.result()
+
+def print_feed_stats(results):
+    """Print per-feed latency and outcome, slowest first, plus totals per status."""
+    print(f"\n{'Feed':<70} {'Status':<13} {'Entries':>7} {'Latency':>9}")
+    for result in sorted(results, key=lambda r: r.latency, reverse=True):
+        print(f"{result.url[:70]:<70} {result.status:<13} {len(result.articles):>7} {result.latency:>8.2f}s"
+              + (f"  {result.error}" if result.error else ""))
+    totals = Counter(result.status for result in results)
+    print("Totals: " + ", ".join(f"{status}={count}" for status, count in sorted(totals.items())))
+
+def scrape_multiple_feeds(feed_urls, handle=None, max_workers=MAX_FEED_WORKERS):
+    """
+    Scrape several feeds concurrently. If `handle` is given it is called with each
+    article as soon as its feed is parsed and nothing is returned; otherwise all
+    articles are returned as a list. Per-feed stats are printed at the end.
+    """
     all_articles = []
+    results = []
     
-    for feed_url in feed_urls:
-        articles = scrape_rss_feed(feed_url)
-        all_articles.extend(articles)
+    for result in poll_feeds(feed_urls, max_workers=max_workers):
+        results.append(result)
+        if handle is not None:
+            for article in result.articles:
+                handle(article)
+        else:
+            all_articles.extend(result.articles)
+        if result.response is not None:
+            result.response.commit()
     
-    return all_articles
-
-def save_to_json(data, filename):
-    # Save the article data to a JSON file
-    with open(filename, 'w', encoding='utf-8') as f:
-        json.dump(data, f, ensure_ascii=False, indent=4)
+    print_feed_stats(results)
+    return all_articles if handle is None else None
 
 if __name__ == "__main__":
     # List of RSS feed URLs
@@ -60,10 +152,37 @@ if __name__ == "__main__":
         "https://www.news18.com/commonfeeds/v1/eng/rss/india.xmll"  # Example: BBC News RSS feed
     ]
     
-    # Scrape the articles from multiple feeds
-    articles = scrape_multiple_feeds(rss_feed_urls)
-    
-    # Save the articles to a JSON file
-    save_to_json(articles, 'articles.json')
+    # Links already saved by earlier polls or runs (or by another feed carrying the
+    # same story) are skipped
+    frontier = URLFrontier('feed_frontier')
+    # The same syndicated story carried by several feeds under different links
+    near_dups = NearDuplicateIndex.load('feed_near_dups.pkl', max_items=50_000)
+
+    def save_new(writer, article):
+        if frontier.add(article['link']) and near_dups.add(article['link'], article_text(article)) is None:
+            writer.write(article)
+
+    if '--watch' in sys.argv:
+        # Keep polling, each feed at a rate learned from how often it publishes
+        scheduler = FeedScheduler(rss_feed_urls)
+        with ArticleWriter('feed_articles') as writer:
+            def handle_result(result):
+                written = writer.count
+                for article in result.articles:
+                    save_new(writer, article)
+                if writer.count > written:
+                    frontier.save()
+                    near_dups.save('feed_near_dups.pkl')
+                if result.response is not None:
+                    result.response.commit()
+                print(f"{result.url}: {result.status}, {len(result.articles)} entries, "
+                      f"next poll in {scheduler.state[result.url]['interval'] / 60:.0f} min")
+            scheduler.run(poll_feeds, handle_result)
+    else:
+        # Scrape the articles from multiple feeds, streaming them into rotated JSONL files
+        with ArticleWriter('feed_articles') as writer:
+            scrape_multiple_feeds(rss_feed_urls, handle=lambda article: save_new(writer, article))
+        frontier.close()
+        near_dups.save('feed_near_dups.pkl')
 
-    print(f"Scraped data from {len(rss_feed_urls)} feeds and saved to 'articles.json'.")
+        print(f"Scraped data from {len(rss_feed_urls)} feeds and saved {writer.count} articles to {', '.join(writer.paths) or 'no files'}.")
@@ -0,0 +1,167 @@
+import calendar
+import heapq
+import json
+import os
+import time
+
+MIN_INTERVAL = 60            # Never poll a feed more often than this (seconds)
+MAX_INTERVAL = 6 * 3600      # Never leave a feed unpolled for longer than this
+DEFAULT_INTERVAL = 600       # Starting interval for feeds with no history
+BACKOFF = 1.5                # Interval multiplier after a poll with nothing new
+ERROR_BACKOFF = 2.0          # Interval multiplier after a failed poll
+GAP_SMOOTHING = 0.3          # Weight of the newest publish-gap sample in the running average
+
+# sy:updatePeriod values in seconds; the period is divided by sy:updateFrequency
+UPDATE_PERIODS = {
+    'hourly': 3600,
+    'daily': 86400,
+    'weekly': 7 * 86400,
+    'monthly': 30 * 86400,
+    'yearly': 365 * 86400,
+}
+
+
+def _entry_timestamps(feed):
+    """Publish times of a parsed feed's entries as epoch seconds, newest first."""
+    timestamps = []
+    for entry in feed.entries:
+        parsed = entry.get('published_parsed') or entry.get('updated_parsed')
+        if parsed:
+            timestamps.append(calendar.timegm(parsed))
+    return sorted(timestamps, reverse=True)
+
+
+def _declared_interval(feed):
+    """Minimum polling interval the feed asks for via <ttl> or sy:updatePeriod, in seconds."""
+    interval = 0
+    channel = feed.get('feed', {})
+    try:
+        # <ttl> is in minutes
+        interval = max(interval, int(channel.get('ttl', 0)) * 60)
+    except (TypeError, ValueError):
+        pass
+    period = UPDATE_PERIODS.get(str(channel.get('sy_updateperiod', '')).strip().lower())
+    if period:
+        try:
+            frequency = max(int(channel.get('sy_updatefrequency', 1)), 1)
+        except (TypeError, ValueError):
+            frequency = 1
+        interval = max(interval, period // frequency)
+    return interval
+
+
+class FeedScheduler:
+    def __init__(self, feed_urls, state_path='feed_schedule.json',
+                 min_interval=MIN_INTERVAL, max_interval=MAX_INTERVAL):
+        """
+        Adaptive polling schedule: each feed's interval follows its observed
+        publish rate, backs off while it returns 304s or nothing new, and never
+        undercuts the feed's own <ttl> / sy:updatePeriod.
+        Args:
+            feed_urls: Feeds to schedule
+            state_path: JSON file the per-feed state is persisted to
+            min_interval: Lower bound on any feed's interval in seconds
+            max_interval: Upper bound on any feed's interval in seconds
+        """
+        self.state_path = state_path
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.state = self._load()
+        now = time.time()
+        for url in feed_urls:
+            self.state.setdefault(url, {
+                'interval': DEFAULT_INTERVAL,
+                'next_poll': now,
+                'publish_gap': None,
+                'newest_entry': None,
+                'declared_interval': 0,
+                'idle_polls': 0,
+            })
+        # Drop feeds that are no longer configured
+        for url in set(self.state) - set(feed_urls):
+            del self.state[url]
+        self.heap = [(feed['next_poll'], url) for url, feed in self.state.items()]
+        heapq.heapify(self.heap)
+
+    def _load(self):
+        if not os.path.exists(self.state_path):
+            return {}
+        with open(self.state_path, encoding='utf-8') as f:
+            return json.load(f)
+
+    def save(self):
+        tmp_path = self.state_path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.state, f, indent=2)
+        os.replace(tmp_path, self.state_path)
+
+    def next_due_time(self):
+        """Epoch time at which the next feed is due, or None if nothing is scheduled."""
+        return self.heap[0][0] if self.heap else None
+
+    def pop_due(self, now=None):
+        """Remove and return every feed whose poll time has come."""
+        now = now or time.time()
+        due = []
+        while self.heap and self.heap[0][0] <= now:
+            _, url = heapq.heappop(self.heap)
+            due.append(url)
+        return due
+
+    def update(self, result, now=None):
+        """Learn from a FeedResult (see feed.poll_feed) and schedule the feed's next poll."""
+        now = now or time.time()
+        feed = self.state[result.url]
+
+        if result.status == 'ok':
+            feed['declared_interval'] = _declared_interval(result.feed)
+            timestamps = _entry_timestamps(result.feed)
+            newest_seen = feed['newest_entry']
+            new = [ts for ts in timestamps if newest_seen is None or ts > newest_seen]
+            if len(timestamps) >= 2:
+                # Average gap between consecutive entries, smoothed across polls
+                window = timestamps[:max(len(new), 2) + 1]
+                gap = max((window[0] - window[-1]) / (len(window) - 1), 1)
+                previous = feed['publish_gap']
+                feed['publish_gap'] = gap if previous is None else \
+                    GAP_SMOOTHING * gap + (1 - GAP_SMOOTHING) * previous
+            if timestamps:
+                feed['newest_entry'] = max(timestamps[0], newest_seen or 0)
+
+            if new:
+                feed['idle_polls'] = 0
+                # Poll about twice per expected publish so new entries are picked up promptly
+                interval = feed['publish_gap'] / 2 if feed['publish_gap'] else feed['interval']
+            else:
+                feed['idle_polls'] += 1
+                interval = feed['interval'] * BACKOFF
+        elif result.status == 'not_modified':
+            feed['idle_polls'] += 1
+            interval = feed['interval'] * BACKOFF
+        else:
+            interval = feed['interval'] * ERROR_BACKOFF
+
+        interval = max(interval, feed['declared_interval'])
+        feed['interval'] = min(max(interval, self.min_interval), self.max_interval)
+        feed['next_poll'] = now + feed['interval']
+        heapq.heappush(self.heap, (feed['next_poll'], result.url))
+
+    def run(self, poll, handle, max_cycles=None):
+        """
+        Poll feeds forever (or for `max_cycles` cycles) as they come due.
+        Args:
+            poll: Function taking a list of feed URLs and yielding FeedResults
+            handle: Called with each FeedResult after the schedule is updated
+            max_cycles: Stop after this many poll cycles; None runs forever
+        """
+        cycles = 0
+        while self.heap and (max_cycles is None or cycles < max_cycles):
+            wait = self.next_due_time() - time.time()
+            if wait > 0:
+                time.sleep(wait)
+            due = self.pop_due()
+            for result in poll(due):
+                self.update(result)
+                handle(result)
+            self.save()
+            cycles += 1
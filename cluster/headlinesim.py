@@ -1,11 +1,33 @@
 import numpy as np
 from sentence_transformers import SentenceTransformer
-from sklearn.metrics.pairwise import cosine_similarity
 from typing import List, Dict
 import pandas as pd
 import json
 from datetime import datetime
+from email.utils import parsedate_to_datetime
 import os
+import sys
+
+# Shared crawler modules live in the repository root
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from article_store import iter_articles
+from near_dup import fold_near_duplicates
+from embedding_cache import EmbeddingCache
+from similarity_graph import similarity_graph, greedy_groups
+from online_cluster import OnlineClusterer
+
+def publish_timestamp(article: Dict):
+    """
+    Unix time an article was published, from feed.py's published_date (an RFC 822
+    feed date or '%Y-%m-%d %H:%M:%S'); None if it is missing or unreadable.
+    """
+    published = article.get('published_date') or ''
+    for parse in (parsedate_to_datetime, datetime.fromisoformat):
+        try:
+            return parse(published).timestamp()
+        except (TypeError, ValueError):
+            continue
+    return None
 
 class HeadlineClusteringPipeline:
     def __init__(self, model_name: str = "all-MiniLM-L6-v2", similarity_threshold: float = 0.6):
@@ -16,44 +38,42 @@ class HeadlineClusteringPipeline:
             similarity_threshold: Threshold for considering headlines similar (0 to 1)
         """
         self.encoder = SentenceTransformer(model_name)
+        # Headlines seen in earlier runs are read back from disk instead of re-encoded
+        self.embedding_cache = EmbeddingCache(model_name)
         self.similarity_threshold = similarity_threshold
 
     def cluster_headlines(self, articles: List[Dict]) -> Dict[int, List[Dict]]:
         """
         Cluster articles based on headline similarity.
         """
-        # Extract headlines
-        headlines = [article['title'] for article in articles]
+        # Near-duplicate copies of a story share their first copy's embedding, so
+        # each story is encoded only once
+        unique_articles, assignment = fold_near_duplicates(articles)
+        headlines = [article['title'] for article in unique_articles]
         
         # Generate embeddings for headlines
-        embeddings = self.encoder.encode(headlines)
+        embeddings = self.embedding_cache.encode(self.encoder, headlines)[assignment]
         
-        # Calculate similarity matrix
-        similarity_matrix = cosine_similarity(embeddings)
+        # Only pairs above the threshold are kept, as a sparse graph built block by
+        # block, so memory grows with the number of similar pairs rather than N^2
+        graph = similarity_graph(embeddings, self.similarity_threshold)
         
         # Initialize clusters
         clusters = {}
         processed = set()
         
-        # Create clusters based on similarity
-        for i in range(len(articles)):
-            if i in processed:
-                continue
-                
-            # Find similar headlines
-            similar_indices = np.where(similarity_matrix[i] > self.similarity_threshold)[0]
+        # Create clusters based on similarity: each ungrouped headline takes all of
+        # its ungrouped neighbours
+        for i, members, scores in greedy_groups(graph):
+            cluster_id = len(clusters)
+            clusters[cluster_id] = []
             
-            if len(similar_indices) > 0:
-                cluster_id = len(clusters)
-                clusters[cluster_id] = []
-                
-                # Add articles to cluster with their similarity scores
-                for idx in similar_indices:
-                    if idx not in processed:
-                        article_with_score = articles[idx].copy()
-                        article_with_score['similarity_score'] = similarity_matrix[i][idx]
-                        clusters[cluster_id].append(article_with_score)
-                        processed.add(idx)
+            # Add articles to cluster with their similarity scores
+            for idx, score in zip(members, scores):
+                article_with_score = articles[idx].copy()
+                article_with_score['similarity_score'] = score
+                clusters[cluster_id].append(article_with_score)
+                processed.add(idx)
         
         # Add remaining articles as singletons
         for i in range(len(articles)):
@@ -65,6 +85,35 @@ class HeadlineClusteringPipeline:
         
         return clusters
 
+    def update_clusters(self, articles: List[Dict], state_path: str = 'online_clusters.pkl') -> Dict[int, List[Dict]]:
+        """
+        Incrementally cluster articles: only articles not seen by earlier calls (or
+        runs) are encoded and assigned to the nearest live story, so each poll costs
+        time proportional to the new articles only. Returns every live cluster in
+        the same format as cluster_headlines.
+        """
+        clusterer = OnlineClusterer.load(state_path, threshold=self.similarity_threshold)
+        # Stories that went quiet are expired on every poll, not only every maintain_every articles
+        expired = clusterer.expire()
+        # Articles of expired stories count as seen too, or every poll would revive them
+        new_articles = [article for article in articles if not clusterer.seen(article['link'])]
+        if new_articles:
+            embeddings = self.embedding_cache.encode(self.encoder, [article['title'] for article in new_articles])
+            clusterer.add_batch([article['link'] for article in new_articles], embeddings,
+                                timestamps=[publish_timestamp(article) for article in new_articles],
+                                payloads=new_articles)
+        if new_articles or expired:
+            clusterer.save(state_path)
+        
+        clusters = {}
+        for cluster in clusterer.clusters.values():
+            similarities = np.stack(cluster.vectors) @ cluster.centroid
+            clusters[len(clusters)] = [
+                {**article, 'similarity_score': score}
+                for article, score in zip(cluster.payloads, similarities)
+            ]
+        return clusters
+
     def print_clusters(self, clusters: Dict):
         """Print clusters in a readable format."""
         print("\n=== HEADLINE-BASED NEWS CLUSTERS ===\n")
@@ -110,14 +159,16 @@ class HeadlineClusteringPipeline:
 
 def example_usage():
     # Sample articles
-    with open ('articles.json') as f:
-        articles = json.load(f)
+    articles = list(iter_articles('feed_articles-*.jsonl*', unique=True))
     
     # Initialize pipeline
     pipeline = HeadlineClusteringPipeline(similarity_threshold=0.6)
     
-    # Cluster articles
-    clusters = pipeline.cluster_headlines(articles)
+    # Cluster articles; with --incremental only articles new since the last run are processed
+    if '--incremental' in sys.argv:
+        clusters = pipeline.update_clusters(articles)
+    else:
+        clusters = pipeline.cluster_headlines(articles)
     
     # Print clusters
     pipeline.print_clusters(clusters)
@@ -0,0 +1,249 @@
+import os
+import pickle
+import time
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+DEFAULT_THRESHOLD = 0.6         # Minimum similarity to a centroid to join its cluster
+DEFAULT_WINDOW = 48 * 3600      # Clusters with no new article for this long are expired (seconds)
+MERGE_THRESHOLD = 0.8           # Clusters whose centroids are this similar are merged
+SPLIT_COHESION = 0.45           # Clusters whose members average less than this to the centroid are split
+MIN_SPLIT_SIZE = 6              # Smaller clusters are never split
+MAINTAIN_EVERY = 500            # Articles between merge/split/expiry passes
+FORGET_AFTER = 7 * 24 * 3600    # Keys of expired clusters are remembered this long (seconds)
+
+
+class StoryCluster:
+    def __init__(self, cluster_id: int, dim: int):
+        self.cluster_id = cluster_id
+        self.total = np.zeros(dim, dtype=np.float32)  # Sum of the unit-length member vectors
+        self.keys: List[Any] = []
+        self.vectors: List[np.ndarray] = []
+        self.payloads: List[Any] = []
+        self.last_update = 0.0
+
+    @property
+    def centroid(self) -> np.ndarray:
+        norm = np.linalg.norm(self.total)
+        return self.total / norm if norm else self.total
+
+    def add(self, key, vector: np.ndarray, payload, timestamp: float):
+        self.keys.append(key)
+        self.vectors.append(vector)
+        self.payloads.append(payload)
+        self.total += vector
+        self.last_update = max(self.last_update, timestamp)
+
+    def cohesion(self) -> float:
+        """Mean similarity of the members to the centroid."""
+        return float(np.mean(np.stack(self.vectors) @ self.centroid))
+
+
+class OnlineClusterer:
+    def __init__(self, threshold: float = DEFAULT_THRESHOLD, window: float = DEFAULT_WINDOW,
+                 merge_threshold: float = MERGE_THRESHOLD, split_cohesion: float = SPLIT_COHESION,
+                 maintain_every: int = MAINTAIN_EVERY, forget_after: float = FORGET_AFTER):
+        """
+        Streaming story clusterer. Each new embedding joins the most similar live
+        cluster centroid above `threshold` or starts a new cluster, so the cost of
+        an article depends on the number of live clusters (bounded by the time
+        window), not on the size of the corpus. Every `maintain_every` articles,
+        stale clusters are expired and similar clusters merged / loose ones split;
+        callers polling a feed also run expire() on each poll. Keys of expired
+        clusters are remembered for `forget_after` seconds, so a story still
+        listed by its feed is not clustered again as new.
+        Args:
+            threshold: Minimum cosine similarity to a centroid to join that cluster
+            window: Seconds without a new member after which a cluster is expired
+            merge_threshold: Centroid similarity at which two clusters are merged
+            split_cohesion: Clusters less cohesive than this are split in two
+            maintain_every: Articles between maintenance passes
+            forget_after: Seconds after expiry that a key still counts as seen
+        """
+        self.threshold = threshold
+        self.window = window
+        self.merge_threshold = merge_threshold
+        self.split_cohesion = split_cohesion
+        self.maintain_every = maintain_every
+        self.forget_after = forget_after
+        self.clusters: Dict[int, StoryCluster] = {}
+        self.assignments: Dict[Any, int] = {}  # Article key -> cluster id
+        self.expired: Dict[Any, float] = {}    # Key of an article whose cluster expired -> when
+        self.next_id = 0
+        self.since_maintenance = 0
+        # Stacked centroids of the live clusters, rebuilt lazily after structural changes
+        self._centroids: Optional[np.ndarray] = None
+        self._centroid_ids: List[int] = []
+
+    def __len__(self):
+        return len(self.clusters)
+
+    def _new_cluster(self, dim: int) -> StoryCluster:
+        cluster = StoryCluster(self.next_id, dim)
+        self.clusters[cluster.cluster_id] = cluster
+        self.next_id += 1
+        self._centroids = None
+        return cluster
+
+    def _centroid_matrix(self):
+        if self._centroids is None:
+            self._centroid_ids = list(self.clusters)
+            self._centroids = np.stack([self.clusters[cid].centroid for cid in self._centroid_ids]) \
+                if self._centroid_ids else None
+        return self._centroids
+
+    def seen(self, key) -> bool:
+        """Whether `key` was added before, including articles whose cluster has expired."""
+        return key in self.assignments or key in self.expired
+
+    def add(self, key, embedding: np.ndarray, timestamp: float = None, payload=None) -> Optional[int]:
+        """
+        Assign one article to a cluster and return the cluster id (None for an
+        article whose cluster already expired). `timestamp` is when the article
+        was published; it defaults to now.
+        """
+        timestamp = timestamp or time.time()
+        if key in self.assignments:
+            return self.assignments[key]
+        if key in self.expired:
+            return None
+        vector = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        vector = vector / norm if norm else vector
+
+        cluster = None
+        centroids = self._centroid_matrix()
+        if centroids is not None:
+            similarities = centroids @ vector
+            best = int(np.argmax(similarities))
+            if similarities[best] >= self.threshold:
+                cluster = self.clusters[self._centroid_ids[best]]
+        if cluster is None:
+            cluster = self._new_cluster(len(vector))
+            cluster.add(key, vector, payload, timestamp)
+            self._centroids = None
+        else:
+            cluster.add(key, vector, payload, timestamp)
+            # Only this cluster's row moved; refresh it in place
+            centroids[best] = cluster.centroid
+        self.assignments[key] = cluster.cluster_id
+
+        self.since_maintenance += 1
+        if self.since_maintenance >= self.maintain_every:
+            self.maintain()
+        return cluster.cluster_id
+
+    def add_batch(self, keys: List[Any], embeddings: np.ndarray, timestamps: List[float] = None,
+                  payloads: List[Any] = None) -> List[Optional[int]]:
+        timestamps = timestamps or [None] * len(keys)
+        payloads = payloads or [None] * len(keys)
+        return [self.add(key, embedding, timestamp, payload)
+                for key, embedding, timestamp, payload in zip(keys, embeddings, timestamps, payloads)]
+
+    def _remove_cluster(self, cluster_id: int):
+        cluster = self.clusters.pop(cluster_id)
+        for key in cluster.keys:
+            if self.assignments.get(key) == cluster_id:
+                del self.assignments[key]
+        self._centroids = None
+        return cluster
+
+    def expire(self, now: float = None) -> List[StoryCluster]:
+        """
+        Drop clusters that have not grown within the window, and forget keys that
+        expired more than `forget_after` ago; returns the expired clusters.
+        """
+        now = now or time.time()
+        cutoff = now - self.window
+        expired = [self._remove_cluster(cid) for cid, cluster in list(self.clusters.items())
+                   if cluster.last_update < cutoff]
+        forget_before = now - self.forget_after
+        self.expired = {key: expired_at for key, expired_at in self.expired.items()
+                        if expired_at >= forget_before}
+        for cluster in expired:
+            self.expired.update(dict.fromkeys(cluster.keys, now))
+        return expired
+
+    def merge(self):
+        """Fold clusters whose centroids drifted together into the larger of each pair."""
+        centroids = self._centroid_matrix()
+        if centroids is None or len(centroids) < 2:
+            return
+        similarities = centroids @ centroids.T
+        np.fill_diagonal(similarities, -1)
+        merged = set()
+        for i, j in zip(*np.nonzero(np.triu(similarities >= self.merge_threshold))):
+            a, b = self._centroid_ids[i], self._centroid_ids[j]
+            if a in merged or b in merged:
+                continue
+            keep, drop = (a, b) if len(self.clusters[a].keys) >= len(self.clusters[b].keys) else (b, a)
+            target = self.clusters[keep]
+            for key, vector, payload in zip(self.clusters[drop].keys, self.clusters[drop].vectors,
+                                            self.clusters[drop].payloads):
+                target.add(key, vector, payload, self.clusters[drop].last_update)
+                self.assignments[key] = keep
+            del self.clusters[drop]
+            merged.update((a, b))
+        if merged:
+            self._centroids = None
+
+    def split(self, iterations: int = 10):
+        """Split loose clusters in two with spherical 2-means over their members."""
+        for cluster_id, cluster in list(self.clusters.items()):
+            if len(cluster.keys) < MIN_SPLIT_SIZE or cluster.cohesion() >= self.split_cohesion:
+                continue
+            vectors = np.stack(cluster.vectors)
+            # Seed with the member least like the centroid and the one least like that member
+            first = vectors[np.argmin(vectors @ cluster.centroid)]
+            seeds = np.stack([first, vectors[np.argmin(vectors @ first)]])
+            for _ in range(iterations):
+                labels = np.argmax(vectors @ seeds.T, axis=1)
+                if labels.min() == labels.max():
+                    break
+                seeds = np.stack([vectors[labels == side].sum(axis=0) for side in (0, 1)])
+                seeds /= np.linalg.norm(seeds, axis=1, keepdims=True)
+            if labels.min() == labels.max():
+                continue
+
+            self._remove_cluster(cluster_id)
+            for side in (0, 1):
+                part = self._new_cluster(vectors.shape[1])
+                for idx in np.nonzero(labels == side)[0]:
+                    part.add(cluster.keys[idx], cluster.vectors[idx], cluster.payloads[idx], cluster.last_update)
+                    self.assignments[cluster.keys[idx]] = part.cluster_id
+
+    def maintain(self, now: float = None) -> List[StoryCluster]:
+        """Expire, merge and split; returns the expired clusters."""
+        expired = self.expire(now)
+        self.merge()
+        self.split()
+        self.since_maintenance = 0
+        return expired
+
+    def save(self, path: str):
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'wb') as f:
+            pickle.dump(self, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str, **kwargs) -> 'OnlineClusterer':
+        """
+        Load saved state, or start empty if `path` doesn't exist. `kwargs` (threshold,
+        window, ...) apply either way, overriding the saved settings.
+        """
+        if not os.path.exists(path):
+            return cls(**kwargs)
+        with open(path, 'rb') as f:
+            clusterer = pickle.load(f)
+        # State saved before expired keys were kept, or kept without their expiry time
+        clusterer.__dict__.setdefault('forget_after', FORGET_AFTER)
+        expired = clusterer.__dict__.setdefault('expired', {})
+        if isinstance(expired, set):
+            clusterer.expired = dict.fromkeys(expired, time.time())
+        for name, value in kwargs.items():
+            if not hasattr(clusterer, name):
+                raise TypeError(f"Unknown OnlineClusterer setting: {name}")
+            setattr(clusterer, name, value)
+        return clusterer
@@ -0,0 +1,140 @@
+import hashlib
+import json
+import os
+import sqlite3
+from typing import Dict, List, Sequence
+
+import spacy
+
+DEFAULT_MODEL = 'en_core_web_sm'
+DEFAULT_CACHE_PATH = 'preprocess_cache.db'
+BATCH_SIZE = 64
+PARALLEL_MIN_TEXTS = 1000   # Fewer uncached texts than this are processed in-process
+KEYWORD_ENTITY_LABELS = ('EVENT', 'ORG', 'PERSON', 'LOC', 'GPE')
+
+_models: Dict[str, 'spacy.language.Language'] = {}
+
+
+def load_nlp(model: str = DEFAULT_MODEL):
+    """The spaCy pipeline for `model`, loaded once per process."""
+    if model not in _models:
+        _models[model] = spacy.load(model)
+    return _models[model]
+
+
+# Feature extractors. Each takes a Doc and returns something JSON-serializable.
+
+def important_terms(doc) -> str:
+    """Named entities, noun phrases and non-stopword verb lemmas."""
+    terms = [ent.text for ent in doc.ents]
+    terms.extend(chunk.text for chunk in doc.noun_chunks)
+    terms.extend(token.lemma_ for token in doc if token.pos_ == "VERB" and not token.is_stop)
+    return " ".join(terms)
+
+
+def important_terms_with_objects(doc) -> str:
+    """Like important_terms, with the nouns attached to each verb after its lemma."""
+    terms = [ent.text for ent in doc.ents]
+    terms.extend(chunk.text for chunk in doc.noun_chunks)
+    for token in doc:
+        if token.pos_ == "VERB" and not token.is_stop:
+            terms.append(token.lemma_)
+            terms.extend(child.text for child in token.children if child.pos_ in ["NOUN", "PROPN"])
+    return " ".join(terms)
+
+
+def lead_sentences(doc, count: int = 3) -> str:
+    """The first `count` sentences."""
+    return ' '.join(sent.text for sent in list(doc.sents)[:count])
+
+
+def entity_counts(doc) -> List[List]:
+    """[entity text, count] for keyword-worthy entities, most frequent first."""
+    term_freq = {}
+    for ent in doc.ents:
+        if ent.label_ in KEYWORD_ENTITY_LABELS:
+            term_freq[ent.text] = term_freq.get(ent.text, 0) + 1
+    return [list(item) for item in sorted(term_freq.items(), key=lambda x: x[1], reverse=True)]
+
+
+# Pipeline components each extractor needs; everything else is disabled while it runs
+FEATURES: Dict[str, tuple] = {
+    'terms': (important_terms, ('tok2vec', 'tagger', 'parser', 'attribute_ruler', 'lemmatizer', 'ner')),
+    'terms_with_objects': (important_terms_with_objects,
+                           ('tok2vec', 'tagger', 'parser', 'attribute_ruler', 'lemmatizer', 'ner')),
+    'lead': (lead_sentences, ('tok2vec', 'parser')),
+    'entities': (entity_counts, ('tok2vec', 'ner')),
+}
+
+
+class PreprocessCache:
+    def __init__(self, path: str = DEFAULT_CACHE_PATH):
+        """SQLite store of extractor output keyed by model, feature set and text hash."""
+        self.conn = sqlite3.connect(path)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('CREATE TABLE IF NOT EXISTS results (key BLOB PRIMARY KEY, value TEXT NOT NULL) WITHOUT ROWID')
+        self.conn.commit()
+
+    @staticmethod
+    def key(model: str, features: str, text: str) -> bytes:
+        return hashlib.blake2b(f"{model}\0{features}\0{text}".encode('utf-8'), digest_size=16).digest()
+
+    def get_many(self, keys: Sequence[bytes]) -> Dict[bytes, object]:
+        found = {}
+        unique = list(set(keys))
+        for start in range(0, len(unique), 500):
+            chunk = unique[start:start + 500]
+            placeholders = ','.join('?' * len(chunk))
+            for key, value in self.conn.execute(
+                    f'SELECT key, value FROM results WHERE key IN ({placeholders})', chunk):
+                found[key] = json.loads(value)
+        return found
+
+    def put_many(self, items: Dict[bytes, object]):
+        self.conn.executemany('INSERT OR REPLACE INTO results (key, value) VALUES (?, ?)',
+                              ((key, json.dumps(value)) for key, value in items.items()))
+        self.conn.commit()
+
+
+_caches: Dict[str, PreprocessCache] = {}
+
+
+def preprocess_texts(texts: Sequence[str], features: str = 'terms', model: str = DEFAULT_MODEL,
+                     batch_size: int = BATCH_SIZE, n_process: int = None,
+                     cache_path: str = DEFAULT_CACHE_PATH) -> List:
+    """
+    Run one of the FEATURES extractors over many texts.
+    Results are cached per text, so only texts not seen before go through spaCy;
+    those are streamed through nlp.pipe in batches with the components the
+    extractor doesn't need disabled, using `n_process` worker processes
+    (by default one per CPU once there are enough texts to pay for the startup).
+    """
+    extract, needed = FEATURES[features]
+    if cache_path not in _caches:
+        _caches[cache_path] = PreprocessCache(cache_path)
+    cache = _caches[cache_path]
+
+    keys = [PreprocessCache.key(model, features, text) for text in texts]
+    results = cache.get_many(keys)
+
+    missing = {}
+    for key, text in zip(keys, texts):
+        if key not in results and key not in missing:
+            missing[key] = text
+    if missing:
+        nlp = load_nlp(model)
+        if n_process is None:
+            n_process = (os.cpu_count() or 1) if len(missing) >= PARALLEL_MIN_TEXTS else 1
+        disable = [name for name in nlp.pipe_names if name not in needed]
+        docs = nlp.pipe(missing.values(), batch_size=batch_size, n_process=n_process, disable=disable)
+        new_results = {key: extract(doc) for key, doc in zip(missing, docs)}
+        cache.put_many(new_results)
+        results.update(new_results)
+
+    return [results[key] for key in keys]
+
+
+def entity_keywords(texts: Sequence[str], top_n: int = 5, **kwargs) -> List[List[str]]:
+    """Most frequent keyword-worthy named entities of each text."""
+    return [[term for term, _ in counts[:top_n]]
+            for counts in preprocess_texts(texts, features='entities', **kwargs)]
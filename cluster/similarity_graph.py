@@ -0,0 +1,61 @@
+import numpy as np
+from scipy.sparse import csr_matrix
+
+BLOCK_ELEMENTS = 1 << 24   # Similarities computed per block (64 MB of float32)
+
+
+def normalize_rows(embeddings: np.ndarray) -> np.ndarray:
+    """float32 copy of the embeddings scaled to unit length; all-zero rows stay zero."""
+    embeddings = np.asarray(embeddings, dtype=np.float32)
+    norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+    norms[norms == 0] = 1
+    return embeddings / norms
+
+
+def similarity_graph(embeddings: np.ndarray, threshold: float, block_elements: int = BLOCK_ELEMENTS) -> csr_matrix:
+    """
+    Sparse graph of cosine similarities above `threshold` (self-loops included).
+    Rows are compared against the whole set one block at a time, so only the
+    edges that pass the threshold are ever kept; peak memory is one block of
+    `block_elements` similarities plus the edges themselves. Column indices in
+    each row are in ascending order.
+    """
+    vectors = normalize_rows(embeddings)
+    n = len(vectors)
+    block_rows = max(1, block_elements // max(n, 1))
+
+    indptr = [0]
+    indices, data = [], []
+    for start in range(0, n, block_rows):
+        sims = vectors[start:start + block_rows] @ vectors.T
+        rows, cols = np.nonzero(sims > threshold)
+        indices.append(cols.astype(np.int32))
+        data.append(sims[rows, cols])
+        counts = np.bincount(rows, minlength=len(sims))
+        indptr.extend(indptr[-1] + np.cumsum(counts))
+
+    if not n:
+        return csr_matrix((0, 0), dtype=np.float32)
+    return csr_matrix((np.concatenate(data), np.concatenate(indices), np.asarray(indptr)), shape=(n, n))
+
+
+def greedy_groups(graph: csr_matrix):
+    """
+    Greedy grouping over a similarity graph: each node not yet grouped starts a
+    group holding itself and all of its ungrouped neighbours. Yields
+    (seed, members, scores) with members in ascending order and scores being
+    each member's similarity to the seed. Nodes without any edge (not even a
+    self-loop) are never seeds and are left for the caller.
+    """
+    grouped = np.zeros(graph.shape[0], dtype=bool)
+    for i in range(graph.shape[0]):
+        if grouped[i]:
+            continue
+        start, end = graph.indptr[i], graph.indptr[i + 1]
+        if start == end:
+            continue
+        neighbours = graph.indices[start:end]
+        fresh = ~grouped[neighbours]
+        members = neighbours[fresh]
+        grouped[members] = True
+        yield i, members, graph.data[start:end][fresh]
@@ -0,0 +1,105 @@
+from collections import namedtuple
+from typing import List, Sequence
+
+import numpy as np
+from scipy import sparse
+from scipy.cluster.hierarchy import fcluster, linkage
+from scipy.spatial.distance import squareform
+from sklearn.cluster import DBSCAN
+from sklearn.metrics import silhouette_score
+from sklearn.metrics.pairwise import cosine_similarity
+from sklearn.preprocessing import normalize
+
+from cluster_format import mean_intra_similarity
+from similarity_graph import similarity_graph
+
+SILHOUETTE_SAMPLE = 2000   # Points the silhouette is estimated on for larger inputs
+_TINY = 1e-12              # Stand-in for zero distances, which a sparse graph can't store
+
+# One clustering of a sweep. labels use -1 for noise / unclustered points;
+# silhouette is None when there are fewer than two clusters
+SweepResult = namedtuple('SweepResult', ['threshold', 'labels', 'n_clusters', 'n_noise',
+                                         'silhouette', 'mean_intra_similarity'])
+
+
+def _unit_rows(features):
+    if sparse.issparse(features):
+        return normalize(features.tocsr())
+    return normalize(np.asarray(features, dtype=np.float32))
+
+
+def _score(threshold, labels, unit):
+    labels = np.asarray(labels)
+    clustered = labels >= 0
+    n_clusters = len(np.unique(labels[clustered]))
+    silhouette = None
+    if 2 <= n_clusters < clustered.sum():
+        silhouette = float(silhouette_score(
+            unit[np.nonzero(clustered)[0]], labels[clustered], metric='cosine',
+            sample_size=min(SILHOUETTE_SAMPLE, int(clustered.sum())), random_state=0))
+    return SweepResult(threshold, labels, n_clusters, int((~clustered).sum()), silhouette,
+                       mean_intra_similarity(unit, labels))
+
+
+def neighbor_graph(features, min_similarity: float) -> sparse.csr_matrix:
+    """Sparse graph of cosine similarities >= min_similarity, self-loops included."""
+    if sparse.issparse(features):
+        unit = _unit_rows(features)
+        graph = (unit @ unit.T).tocsr()
+        graph.data[graph.data < min_similarity] = 0
+        graph.eliminate_zeros()
+        return graph
+    return similarity_graph(features, min_similarity - 1e-9)
+
+
+def dbscan_sweep(features, thresholds: Sequence[float], min_samples: int = 2) -> List[SweepResult]:
+    """
+    DBSCAN at several minimum similarities (eps = 1 - similarity) from one
+    radius-neighbours graph built at the loosest threshold; each run just drops
+    the edges its eps excludes.
+    Args:
+        features: Dense embeddings or a sparse TF-IDF matrix, one row per article
+        thresholds: Minimum cosine similarities to sweep
+        min_samples: DBSCAN min_samples
+    """
+    unit = _unit_rows(features)
+    graph = neighbor_graph(features, min(thresholds))
+    distances = graph.copy()
+    distances.data = np.maximum(np.clip(1 - distances.data, 0, 2), _TINY)
+
+    results = []
+    for threshold in thresholds:
+        eps = 1 - threshold
+        within = distances.copy()
+        within.data[within.data > eps + 1e-9] = 0
+        within.eliminate_zeros()
+        labels = DBSCAN(eps=eps, min_samples=min_samples, metric='precomputed').fit(within).labels_
+        results.append(_score(threshold, labels, unit))
+    return results
+
+
+def agglomerative_sweep(features, thresholds: Sequence[float], method: str = 'complete',
+                        min_cluster_size: int = 1) -> List[SweepResult]:
+    """
+    Agglomerative clustering at several similarity thresholds from one linkage
+    tree: the tree is built once and cut at distance 1 - threshold for each.
+    Clusters smaller than `min_cluster_size` are labelled -1.
+    Args:
+        features: Dense embeddings or a sparse TF-IDF matrix, one row per article
+        thresholds: Similarity thresholds to cut the tree at
+        method: scipy linkage method ('complete', 'average', 'single', ...)
+        min_cluster_size: Smaller clusters count as unclustered
+    """
+    unit = _unit_rows(features)
+    distance_matrix = np.clip(1 - cosine_similarity(unit), 0, 2)
+    np.fill_diagonal(distance_matrix, 0)
+    tree = linkage(squareform(distance_matrix, checks=False), method=method)
+
+    results = []
+    for threshold in thresholds:
+        labels = fcluster(tree, t=1 - threshold, criterion='distance') - 1
+        if min_cluster_size > 1:
+            small = np.bincount(labels) < min_cluster_size
+            labels = np.where(small[labels], -1, labels)
+        results.append(_score(threshold, labels, unit))
+    return results
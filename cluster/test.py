@@ -2,9 +2,15 @@ import numpy as np
 from sklearn.feature_extraction.text import TfidfVectorizer
 from sklearn.cluster import DBSCAN
 from sklearn.metrics.pairwise import cosine_similarity
-import spacy
 import pandas as pd
-import json
+import os
+import sys
+
+# Shared crawler modules live in the repository root
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from article_store import iter_articles
+from cluster_format import group_items
+from preprocess import preprocess_texts, entity_keywords
 
 def cluster_news_articles(articles, min_similarity=0.3, min_articles=2):
     """
@@ -13,39 +19,19 @@ def cluster_news_articles(articles, min_similarity=0.3, min_articles=2):
      similarity using TF-IDF and DBSCAN.
     
     Parameters:
-    articles (list): List of dictionaries with 'title' and 'summary' keys
+    articles (list): List of dictionaries with 'title' and 'content' keys
     min_similarity (float): Minimum similarity threshold (0-1)
     min_articles (int): Minimum articles to form a cluster
     
     Returns:
     dict: Clustered articles with cluster labels and key terms
     """
-    # Load SpaCy model for NER and keyword extraction
-    nlp = spacy.load("en_core_web_sm")
-    
-    def preprocess_text(text):
-        """Remove stopwords and extract important entities/noun phrases"""
-        doc = nlp(text)
-        # Keep named entities, noun phrases, and important verbs
-        important_tokens = []
-        
-        # Add named entities
-        important_tokens.extend([ent.text for ent in doc.ents])
-        
-        # Add noun phrases
-        important_tokens.extend([chunk.text for chunk in doc.noun_chunks])
-        
-        # Add important verbs (excluding auxiliaries)
-        important_tokens.extend([token.lemma_ for token in doc 
-                               if token.pos_ == "VERB" and not token.is_stop])
-        
-        return " ".join(important_tokens)
-    
-    # Combine title and summary with more weight on title
-    processed_texts = [
-        preprocess_text(article['title'] + " " + article['title'] + " " + article['summary'])
+    # Combine title and summary with more weight on title; spaCy runs once per new text
+    # (batched, cached across calls and runs) in the shared preprocessing stage
+    processed_texts = preprocess_texts([
+        article['title'] + " " + article['title'] + " " + article['content']
         for article in articles
-    ]
+    ])
     
     # Create TF-IDF vectors
     vectorizer = TfidfVectorizer(
@@ -66,47 +52,17 @@ def cluster_news_articles(articles, min_similarity=0.3, min_articles=2):
         metric='precomputed'
     ).fit(1 - similarity_matrix)  # Convert similarity to distance
     
-    # Extract key terms for each cluster
-    def get_cluster_keywords(cluster_docs, top_n=5):
-        """Get most important terms for a cluster"""
-        if len(cluster_docs) == 0:
-            return []
-        
-        cluster_text = " ".join(cluster_docs)
-        doc = nlp(cluster_text)
-        
-        # Count term frequencies
-        term_freq = {}
-        for ent in doc.ents:
-            if ent.label_ in ['EVENT', 'ORG', 'PERSON', 'LOC', 'GPE']:
-                term_freq[ent.text] = term_freq.get(ent.text, 0) + 1
-                
-        # Sort by frequency
-        sorted_terms = sorted(term_freq.items(), key=lambda x: x[1], reverse=True)
-        return [term[0] for term in sorted_terms[:top_n]]
-    
     # Organize results
-    clusters = {}
-    for idx, label in enumerate(clustering.labels_):
-        if label == -1:  # Noise points
-            continue
-            
-        if label not in clusters:
-            clusters[label] = {
-                'articles': [],
-                'key_terms': []
-            }
-        
-        clusters[label]['articles'].append(articles[idx])
+    clusters = {label: {'articles': members, 'key_terms': []}  # Noise points (-1) are left out
+                for label, members in group_items(articles, clustering.labels_).items()}
     
-    # Add key terms for each cluster
-    for label in clusters:
-        cluster_texts = [art['summary'] for art in clusters[label]['articles']]
-        clusters[label]['key_terms'] = get_cluster_keywords(cluster_texts)
+    # Add key terms for each cluster; all clusters go through NER in one batch
+    cluster_texts = [" ".join(art['content'] for art in clusters[label]['articles']) for label in clusters]
+    for label, key_terms in zip(clusters, entity_keywords(cluster_texts)):
+        clusters[label]['key_terms'] = key_terms
     
     return clusters
-with open('articles.json') as f:
-    sample_articles = json.load(f)
+sample_articles = list(iter_articles('feed_articles-*.jsonl*', unique=True))
 
 
 clustered_news = cluster_news_articles(sample_articles)
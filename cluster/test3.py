@@ -1,150 +1,91 @@
 import numpy as np
 from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.cluster import DBSCAN
-from sklearn.metrics.pairwise import cosine_similarity
-import spacy
 import pandas as pd
-import json
+import os
+import sys
 
-def cluster_news_articles(articles, min_similarity=0.5, min_articles=2):
-    """
-    Cluster news articles based on content similarity using TF-IDF and DBSCAN.
-    
-    Parameters:
-    articles (list): List of dictionaries with 'title' and 'content' keys
-    min_similarity (float): Minimum similarity threshold (0-1)
-    min_articles (int): Minimum articles to form a cluster
-    
-    Returns:
-    dict: Clustered articles with cluster labels and key terms
-    """
-    # Load SpaCy model for NER and keyword extraction
-    nlp = spacy.load("en_core_web_sm")
-    
-    def preprocess_text(text):
-        """Remove stopwords and extract important entities/noun phrases"""
-        doc = nlp(text)
-        # Keep named entities, noun phrases, and important verbs
-        important_tokens = []
-        
-        # Add named entities
-        important_tokens.extend([ent.text for ent in doc.ents])
-        
-        # Add noun phrases
-        important_tokens.extend([chunk.text for chunk in doc.noun_chunks])
-        
-        # Add important verbs (excluding auxiliaries)
-        important_tokens.extend([token.lemma_ for token in doc 
-                               if token.pos_ == "VERB" and not token.is_stop])
-        
-        return " ".join(important_tokens)
-    
-    # Combine title and content with more weight on title
-    processed_texts = [
-        preprocess_text(article['title'] + " " + article['title'] + " " + article['content'])
+# Shared crawler modules live in the repository root
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from article_store import iter_articles
+from cluster_format import group_items
+from preprocess import preprocess_texts, entity_keywords
+from sweep import dbscan_sweep
+
+def article_features(articles):
+    """TF-IDF vectors of the articles' important terms"""
+    # Combine title and content with more weight on title; spaCy runs once per new text
+    # (batched, cached across calls and runs) in the shared preprocessing stage
+    processed_texts = preprocess_texts([
+        article['title'] + " " + article['title'] + " " + article['content']
         for article in articles
-    ]
-    
+    ])
+
     # Create TF-IDF vectors
     vectorizer = TfidfVectorizer(
         max_features=1000,
         stop_words='english',
         ngram_range=(1, 2)
     )
-    tfidf_matrix = vectorizer.fit_transform(processed_texts)
-    
-    # Calculate similarity matrix
-    similarity_matrix = cosine_similarity(tfidf_matrix)
-    
-    # Convert similarity to distance (ensuring non-negative values)
-    # Using the fact that cosine similarity ranges from -1 to 1
-    # We rescale it to ensure all distances are non-negative
-    distance_matrix = np.clip((1 - similarity_matrix), 0, 2)
-    
-    print("Distance Matrix (sample):")
-    print(np.round(distance_matrix[:5, :5], 2))  # Print first 5x5 for debugging
-    
-    # Cluster using DBSCAN
-    clustering = DBSCAN(
-        eps=1 - min_similarity,  # Distance threshold
-        min_samples=min_articles,
-        metric='precomputed'
-    ).fit(distance_matrix)
-    
-    print("\nClustering Labels:", clustering.labels_)
-    
-    # Extract key terms for each cluster
-    def get_cluster_keywords(cluster_docs, top_n=5):
-        """Get most important terms for a cluster"""
-        if len(cluster_docs) == 0:
-            return []
-        
-        cluster_text = " ".join(cluster_docs)
-        doc = nlp(cluster_text)
-        
-        # Count term frequencies
-        term_freq = {}
-        for ent in doc.ents:
-            if ent.label_ in ['EVENT', 'ORG', 'PERSON', 'LOC', 'GPE']:
-                term_freq[ent.text] = term_freq.get(ent.text, 0) + 1
-                
-        # Sort by frequency
-        sorted_terms = sorted(term_freq.items(), key=lambda x: x[1], reverse=True)
-        return [term[0] for term in sorted_terms[:top_n]]
-    
+    return vectorizer.fit_transform(processed_texts)
+
+def organize_clusters(articles, labels):
+    """Group articles by cluster label and add key terms for each cluster"""
+    print("\nClustering Labels:", labels)
+
     # Organize results
-    clusters = {}
-    unclustered_articles = []
-    
-    for idx, label in enumerate(clustering.labels_):
-        if label == -1:  # Noise points
-            unclustered_articles.append(articles[idx])
-            continue
-            
-        if label not in clusters:
-            clusters[label] = {
-                'articles': [],
-                'key_terms': []
-            }
-        
-        clusters[label]['articles'].append(articles[idx])
-    
-    # Add key terms for each cluster
-    for label in clusters:
-        cluster_texts = [art['content'] for art in clusters[label]['articles']
-]
-        clusters[label]['key_terms'] = get_cluster_keywords(cluster_texts)
-    
+    clusters = {label: {'articles': members, 'key_terms': []}
+                for label, members in group_items(articles, labels).items()}
+    unclustered_articles = [articles[idx] for idx in np.nonzero(np.asarray(labels) == -1)[0]]  # Noise points
+
+    # Add key terms for each cluster; all clusters go through NER in one batch
+    cluster_texts = [" ".join(art['content'] for art in clusters[label]['articles']) for label in clusters]
+    for label, key_terms in zip(clusters, entity_keywords(cluster_texts)):
+        clusters[label]['key_terms'] = key_terms
+
     # Print summary statistics
     print(f"\nTotal articles: {len(articles)}")
     print(f"Number of clusters: {len(clusters)}")
     print(f"Unclustered articles: {len(unclustered_articles)}")
-    
+
     return clusters, unclustered_articles
 
+def cluster_news_articles(articles, min_similarity=0.5, min_articles=2):
+    """
+    Cluster news articles based on content similarity using TF-IDF and DBSCAN.
+
+    Parameters:
+    articles (list): List of dictionaries with 'title' and 'content' keys
+    min_similarity (float): Minimum similarity threshold (0-1)
+    min_articles (int): Minimum articles to form a cluster
+
+    Returns:
+    dict: Clustered articles with cluster labels and key terms
+    """
+    result = dbscan_sweep(article_features(articles), [min_similarity], min_samples=min_articles)[0]
+    return organize_clusters(articles, result.labels)
+
 # Read and process articles
-with open('articles.json') as f:
-    sample_articles = json.load(f)
+sample_articles = list(iter_articles('feed_articles-*.jsonl*', unique=True))
 
-# Try with different similarity thresholds
-for similarity in [0.3, 0.5, 0.7]:
-    print(f"\n\nTrying with minimum similarity: {similarity}")
+# Try with different similarity thresholds; features and the neighbour graph are
+# computed once and every threshold reuses them
+features = article_features(sample_articles)
+for result in dbscan_sweep(features, [0.3, 0.5, 0.7], min_samples=2):
+    print(f"\n\nTrying with minimum similarity: {result.threshold}")
     print("-" * 50)
-    
-    clustered_news, unclustered = cluster_news_articles(
-        sample_articles, 
-        min_similarity=similarity
-    )
-    
+    print(f"Silhouette: {result.silhouette}, mean intra-cluster similarity: {result.mean_intra_similarity}")
+
+    clustered_news, unclustered = organize_clusters(sample_articles, result.labels)
+
     # Print clustered articles
     print("\nClustered Articles:")
     for cluster_label, cluster_data in clustered_news.items():
         print(f"\nCluster {cluster_label} - Key terms: {cluster_data['key_terms']}")
         for article in cluster_data['articles']:
             print(f"\t{article['title']}")
-    
+
     # Print unclustered articles
     if unclustered:
         print("\nUnclustered Articles:")
         for article in unclustered:
-            print(f"\t{article['title']}")
\ No newline at end of file
+            print(f"\t{article['title']}")
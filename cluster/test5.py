@@ -1,56 +1,23 @@
 import numpy as np
 from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.cluster import DBSCAN
-from sklearn.metrics.pairwise import cosine_similarity
-import spacy
-import json
+import os
+import sys
 
-def cluster_news_articles(articles, min_similarity=0.3, min_articles=2):
-    """
-    A generalized approach to cluster news articles based on content similarity.
-    
-    Parameters:
-    articles (list): List of dictionaries with 'title' and 'content' keys
-    min_similarity (float): Minimum similarity threshold (0-1)
-    min_articles (int): Minimum articles to form a cluster
-    
-    Returns:
-    tuple: (clusters dict, unclustered articles list)
-    """
-    nlp = spacy.load("en_core_web_sm")
-    
-    def preprocess_text(title, content):
-        """Extract meaningful features from text while maintaining generality"""
-        # Process full text
-        full_text = f"{title} {title} {content}"  # Weight title by repeating it
-        doc = nlp(full_text)
-        
-        # Extract meaningful words and phrases
-        important_terms = []
-        
-        # Get named entities
-        important_terms.extend([ent.text for ent in doc.ents])
-        
-        # Get noun phrases
-        important_terms.extend([chunk.text for chunk in doc.noun_chunks])
-        
-        # Get main verbs and their associated nouns
-        for token in doc:
-            if token.pos_ == "VERB" and not token.is_stop:
-                important_terms.append(token.lemma_)
-                
-                # Include associated nouns
-                for child in token.children:
-                    if child.pos_ in ["NOUN", "PROPN"]:
-                        important_terms.append(child.text)
-        
-        return " ".join(important_terms)
-    
-    # Process all articles
-    processed_texts = [
-        preprocess_text(article['title'], article['content'])
+# Shared crawler modules live in the repository root
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from article_store import iter_articles
+from cluster_format import group_items
+from preprocess import preprocess_texts
+from sweep import dbscan_sweep
+
+def article_features(articles):
+    """TF-IDF vectors of the articles' entities, noun phrases and verbs"""
+    # Entities, noun phrases and verbs with their nouns, extracted once per new text
+    # (batched, cached across calls and runs) in the shared preprocessing stage
+    processed_texts = preprocess_texts([
+        f"{article['title']} {article['title']} {article['content']}"  # Weight title by repeating it
         for article in articles
-    ]
+    ], features='terms_with_objects')
     
     # Convert text to TF-IDF vectors
     vectorizer = TfidfVectorizer(
@@ -60,52 +27,47 @@ def cluster_news_articles(articles, min_similarity=0.3, min_articles=2):
         stop_words='english'
     )
     
-    tfidf_matrix = vectorizer.fit_transform(processed_texts)
-    
-    # Calculate similarity and convert to distance
-    similarity_matrix = cosine_similarity(tfidf_matrix)
-    distance_matrix = np.clip((1 - similarity_matrix), 0, 2)
-    
-    # Cluster using DBSCAN
-    clustering = DBSCAN(
-        eps=1 - min_similarity,
-        min_samples=min_articles,
-        metric='precomputed'
-    ).fit(distance_matrix)
+    return vectorizer.fit_transform(processed_texts)
+
+def organize_clusters(articles, labels):
+    """Split articles into clusters and unclustered ones by their labels"""
+    clusters = group_items(articles, labels)
+    unclustered = [articles[idx] for idx in np.nonzero(np.asarray(labels) == -1)[0]]
     
-    # Organize results
-    clusters = {}
-    unclustered = []
+    return clusters, unclustered
+
+def cluster_news_articles(articles, min_similarity=0.3, min_articles=2):
+    """
+    A generalized approach to cluster news articles based on content similarity.
     
-    for idx, label in enumerate(clustering.labels_):
-        if label == -1:
-            unclustered.append(articles[idx])
-            continue
-            
-        if label not in clusters:
-            clusters[label] = []
-        clusters[label].append(articles[idx])
+    Parameters:
+    articles (list): List of dictionaries with 'title' and 'content' keys
+    min_similarity (float): Minimum similarity threshold (0-1)
+    min_articles (int): Minimum articles to form a cluster
     
-    return clusters, unclustered
+    Returns:
+    tuple: (clusters dict, unclustered articles list)
+    """
+    # Cluster using DBSCAN
+    result = dbscan_sweep(article_features(articles), [min_similarity], min_samples=min_articles)[0]
+    return organize_clusters(articles, result.labels)
 
 # Example usage
 if __name__ == "__main__":
     # Load articles
-    with open('articles.json') as f:
-        sample_articles = json.load(f)
+    sample_articles = list(iter_articles('feed_articles-*.jsonl*', unique=True))
 
     print(f"Total articles: {len(sample_articles)}")
     
-    # Try different similarity thresholds to find optimal clustering
-    for similarity in [0.2, 0.3, 0.4, 0.5]:
-        print(f"\nTrying similarity threshold: {similarity}")
+    # Try different similarity thresholds to find optimal clustering; features and
+    # the neighbour graph are computed once and every threshold reuses them
+    features = article_features(sample_articles)
+    for result in dbscan_sweep(features, [0.2, 0.3, 0.4, 0.5], min_samples=2):
+        print(f"\nTrying similarity threshold: {result.threshold}")
         print("-" * 40)
+        print(f"Silhouette: {result.silhouette}, mean intra-cluster similarity: {result.mean_intra_similarity}")
         
-        clusters, unclustered = cluster_news_articles(
-            sample_articles,
-            min_similarity=similarity,
-            min_articles=2
-        )
+        clusters, unclustered = organize_clusters(sample_articles, result.labels)
         
         # Print results
         print(f"\nFound {len(clusters)} clusters")
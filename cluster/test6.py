@@ -1,11 +1,46 @@
 import numpy as np
 from sentence_transformers import SentenceTransformer
-from sklearn.cluster import AgglomerativeClustering
-from sklearn.metrics.pairwise import cosine_similarity
-import spacy
-import json
 from scipy.cluster.hierarchy import dendrogram, linkage
 import matplotlib.pyplot as plt
+import os
+import sys
+
+# Shared crawler modules live in the repository root
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from article_store import iter_articles
+from cluster_format import group_indices, member_similarity
+from embedding_cache import EmbeddingCache
+from preprocess import preprocess_texts
+from sweep import agglomerative_sweep
+
+def article_embeddings(articles):
+    """Sentence embeddings of each article's title and lead"""
+    # Load models
+    model = SentenceTransformer('all-MiniLM-L6-v2')  # Lightweight, fast model
+    
+    # Prepare texts: title weighted by repetition plus the first 3 sentences of the
+    # content, split by the shared preprocessing stage (parser only, batched, cached)
+    leads = preprocess_texts([article['content'] for article in articles], features='lead')
+    texts = [f"{article['title']} {article['title']} {lead}" for article, lead in zip(articles, leads)]
+    
+    # Generate embeddings; texts encoded by earlier runs come from the on-disk cache
+    return EmbeddingCache('all-MiniLM-L6-v2').encode(model, texts, show_progress_bar=True)
+
+def organize_clusters(articles, labels, embeddings):
+    """Group articles by label, each cluster sorted by average similarity to its other members"""
+    # Clusters below min_cluster_size were already labelled -1 by the sweep
+    avg_similarity = member_similarity(embeddings, labels)
+    clusters = {}
+    for label, members in group_indices(labels).items():
+        # Sort articles within each cluster by similarity
+        members = members[np.argsort(-avg_similarity[members], kind='stable')]
+        clusters[label] = {
+            'articles': [articles[i] for i in members],
+            'avg_similarity': avg_similarity[members].tolist()
+        }
+    unclustered = [articles[i] for i in np.nonzero(np.asarray(labels) == -1)[0]]
+    
+    return clusters, unclustered
 
 def cluster_news_articles(articles, similarity_threshold=0.5, min_cluster_size=2):
     """
@@ -19,76 +54,12 @@ def cluster_news_articles(articles, similarity_threshold=0.5, min_cluster_size=2
     Returns:
     tuple: (clusters dict, unclustered articles list)
     """
-    # Load models
-    model = SentenceTransformer('all-MiniLM-L6-v2')  # Lightweight, fast model
-    nlp = spacy.load("en_core_web_sm")
-    
-    def prepare_text(title, content):
-        """Prepare text for embedding"""
-        # Combine title and first few sentences of content
-        doc = nlp(content)
-        first_sentences = list(doc.sents)[:3]  # Take first 3 sentences
-        important_content = ' '.join([sent.text for sent in first_sentences])
-        
-        # Weighted combination of title and content
-        return f"{title} {title} {important_content}"
-    
-    # Prepare texts
-    texts = [prepare_text(article['title'], article['content']) for article in articles]
-    
-    # Generate embeddings
-    embeddings = model.encode(texts, show_progress_bar=True)
-    
-    # Calculate similarity matrix
-    similarity_matrix = cosine_similarity(embeddings)
-    
-    # Convert similarity to distance
-    distance_matrix = 1 - similarity_matrix
+    embeddings = article_embeddings(articles)
     
     # Perform hierarchical clustering
-    clustering = AgglomerativeClustering(
-        n_clusters=None,
-        distance_threshold=1 - similarity_threshold,
-        metric='precomputed',
-        linkage='complete'
-    )
-    
-    cluster_labels = clustering.fit_predict(distance_matrix)
-    
-    # Organize results
-    clusters = {}
-    unclustered = []
-    
-    # Count articles per cluster
-    from collections import Counter
-    cluster_counts = Counter(cluster_labels)
-    
-    # Assign articles to clusters or unclustered
-    for idx, label in enumerate(cluster_labels):
-        # If cluster is too small, mark as unclustered
-        if cluster_counts[label] < min_cluster_size:
-            unclustered.append(articles[idx])
-            continue
-            
-        if label not in clusters:
-            clusters[label] = {
-                'articles': [],
-                'avg_similarity': []
-            }
-        
-        # Calculate average similarity with other articles in cluster
-        cluster_indices = np.where(cluster_labels == label)[0]
-        avg_sim = np.mean([similarity_matrix[idx][j] for j in cluster_indices if j != idx])
-        
-        clusters[label]['articles'].append(articles[idx])
-        clusters[label]['avg_similarity'].append(avg_sim)
-    
-    # Sort articles within each cluster by similarity
-    for label in clusters:
-        sorted_indices = np.argsort(clusters[label]['avg_similarity'])[::-1]
-        clusters[label]['articles'] = [clusters[label]['articles'][i] for i in sorted_indices]
-    
-    return clusters, unclustered
+    result = agglomerative_sweep(embeddings, [similarity_threshold], method='complete',
+                                 min_cluster_size=min_cluster_size)[0]
+    return organize_clusters(articles, result.labels, embeddings)
 
 def visualize_clustering(similarity_matrix, labels):
     """Visualize the clustering results"""
@@ -102,21 +73,19 @@ def visualize_clustering(similarity_matrix, labels):
 # Example usage
 if __name__ == "__main__":
     # Load articles
-    with open('articles.json') as f:
-        sample_articles = json.load(f)
+    sample_articles = list(iter_articles('feed_articles-*.jsonl*', unique=True))
 
     print(f"Total articles: {len(sample_articles)}")
     
-    # Try different similarity thresholds
-    for threshold in [0.3, 0.5, 0.7]:
-        print(f"\nTrying similarity threshold: {threshold}")
+    # Try different similarity thresholds; the articles are embedded and the linkage
+    # tree is built once, then cut at each threshold
+    embeddings = article_embeddings(sample_articles)
+    for result in agglomerative_sweep(embeddings, [0.3, 0.5, 0.7], method='complete', min_cluster_size=2):
+        print(f"\nTrying similarity threshold: {result.threshold}")
         print("-" * 50)
+        print(f"Silhouette: {result.silhouette}, mean intra-cluster similarity: {result.mean_intra_similarity}")
         
-        clusters, unclustered = cluster_news_articles(
-            sample_articles,
-            similarity_threshold=threshold,
-            min_cluster_size=2
-        )
+        clusters, unclustered = organize_clusters(sample_articles, result.labels, embeddings)
         
         # Print results
         print(f"\nFound {len(clusters)} clusters")
@@ -0,0 +1,82 @@
+import asyncio
+import os
+from concurrent.futures import ProcessPoolExecutor
+from fetcher import Fetcher
+from profiles import extract_for_url
+from extractor import charset_from_headers
+
+DEFAULT_QUEUE_SIZE = 64  # Downloaded pages waiting to be parsed before fetching pauses
+
+
+def parse_article_page(url, content, encoding=None):
+    """Parse one downloaded article page; runs inside a worker process."""
+    article = extract_for_url(url, content, encoding)
+    return {
+        'title': article['title'],
+        'author': article['author'] or 'Unknown',
+        'description': article['description'],
+        'text': article['text'],
+        'link': url,
+        'published_date': article['published_date'],
+        'image_link': article['image_link']
+    }
+
+
+async def _run_pipeline(urls, handle, parse, workers, queue_size, fetcher_kwargs):
+    loop = asyncio.get_running_loop()
+    pages = asyncio.Queue(maxsize=queue_size)
+
+    async def fetch_stage(fetcher):
+        async for result in fetcher.iter_fetch(urls):
+            if result.status != 200:
+                if result.status is not None:
+                    print(f"Failed to fetch {result.url}. Status code: {result.status}")
+                continue
+            # Blocks while the parse stage is behind, which in turn stops iter_fetch
+            # from scheduling more requests
+            await pages.put(result)
+        for _ in range(workers):
+            await pages.put(None)
+
+    async def parse_stage(pool):
+        while True:
+            result = await pages.get()
+            if result is None:
+                return
+            try:
+                article = await loop.run_in_executor(pool, parse, result.url, result.content,
+                                                     charset_from_headers(result.headers))
+            except Exception as e:
+                print(f"Error parsing {result.url}: {e}")
+                continue
+            if article is None:
+                continue
+            try:
+                handle(article)
+            except Exception as e:
+                # One bad article must not stop this parse task and stall the pipeline
+                print(f"Error handling {result.url}: {e}")
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        async with Fetcher(**fetcher_kwargs) as fetcher:
+            # One parse task per worker process keeps every core busy without queuing
+            # more pages in the pool than it can work on
+            await asyncio.gather(fetch_stage(fetcher), *(parse_stage(pool) for _ in range(workers)))
+
+
+def crawl_and_parse(urls, handle, parse=parse_article_page, workers=None,
+                    queue_size=DEFAULT_QUEUE_SIZE, **fetcher_kwargs):
+    """
+    Two-stage crawl: the async fetch engine downloads raw pages into a bounded
+    queue and a process pool parses them, so parse CPU and network wait overlap.
+    Args:
+        urls: Iterable of URLs to crawl (may be a generator)
+        handle: Called in the main process with each parsed article
+        parse: Picklable function (url, content, encoding) -> article dict or None;
+               encoding is the HTTP charset or None
+        workers: Parse processes; defaults to the number of CPUs
+        queue_size: Maximum downloaded pages waiting to be parsed
+        fetcher_kwargs: Passed to Fetcher (per_host_limit, total_limit, cache, ...)
+    """
+    workers = workers or os.cpu_count() or 1
+    asyncio.run(_run_pipeline(urls, handle, parse, workers, queue_size, fetcher_kwargs))
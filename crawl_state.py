@@ -0,0 +1,95 @@
+import hashlib
+import sqlite3
+import threading
+import time
+
+
+def content_hash(content):
+    """Stable hash of article content (str, bytes or None) used to detect changes."""
+    if content is None:
+        # Pages without extractable text (video/photo pages) still get a state row
+        content = b''
+    if isinstance(content, str):
+        content = content.encode('utf-8')
+    return hashlib.sha1(content).hexdigest()
+
+
+class CrawlState:
+    def __init__(self, db_path='crawl_state.db', refetch_after=None):
+        """
+        Persistent per-URL crawl state so a run only fetches new or changed URLs.
+        Args:
+            db_path: Path to the SQLite database file
+            refetch_after: Seconds after which a URL without a newer <lastmod> is
+                           fetched again anyway; None means never
+        """
+        self.refetch_after = refetch_after
+        # Shared between the fetch engine's feeder thread and the event loop thread
+        self._lock = threading.RLock()
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('PRAGMA synchronous=NORMAL')
+        self.conn.execute('''
+            CREATE TABLE IF NOT EXISTS crawl_state (
+                url TEXT PRIMARY KEY,
+                lastmod TEXT,
+                content_hash TEXT,
+                fetched_at REAL NOT NULL
+            )
+        ''')
+        self.conn.commit()
+
+    def get(self, url):
+        """Return (lastmod, content_hash, fetched_at) for a URL, or None if never fetched."""
+        with self._lock:
+            return self.conn.execute(
+                'SELECT lastmod, content_hash, fetched_at FROM crawl_state WHERE url = ?', (url,)
+            ).fetchone()
+
+    def should_fetch(self, url, lastmod=None):
+        """
+        Decide whether a URL needs fetching: it is new, the sitemap reports a
+        different <lastmod> than last time, or it is older than `refetch_after`.
+        """
+        row = self.get(url)
+        if row is None:
+            return True
+
+        stored_lastmod, _, fetched_at = row
+        if lastmod and lastmod != stored_lastmod:
+            return True
+        if self.refetch_after is not None and time.time() - fetched_at > self.refetch_after:
+            return True
+        return False
+
+    def record(self, url, content, lastmod=None):
+        """
+        Record a fetch of `url`. Returns True if the content is new or changed
+        since the previous fetch, False if it is identical.
+        """
+        new_hash = content_hash(content)
+        with self._lock:
+            row = self.get(url)
+            # Keep the previous lastmod when the caller has none (e.g. links found on section pages)
+            if lastmod is None and row is not None:
+                lastmod = row[0]
+
+            self.conn.execute('''
+                INSERT INTO crawl_state (url, lastmod, content_hash, fetched_at) VALUES (?, ?, ?, ?)
+                ON CONFLICT (url) DO UPDATE
+                SET lastmod = excluded.lastmod, content_hash = excluded.content_hash,
+                    fetched_at = excluded.fetched_at
+            ''', (url, lastmod, new_hash, time.time()))
+            self.conn.commit()
+        return row is None or row[1] != new_hash
+
+    def mark_unchanged(self, url, lastmod=None):
+        """Record that `url` was checked and found unchanged (e.g. a 304) without new content."""
+        with self._lock:
+            self.conn.execute('''
+                UPDATE crawl_state SET lastmod = COALESCE(?, lastmod), fetched_at = ? WHERE url = ?
+            ''', (lastmod, time.time(), url))
+            self.conn.commit()
+
+    def close(self):
+        self.conn.close()
@@ -0,0 +1,279 @@
+import codecs
+import re
+from collections import namedtuple
+from html.parser import HTMLParser
+
+# Elements that never have content or a closing tag
+VOID_TAGS = {'area', 'base', 'br', 'col', 'embed', 'hr', 'img', 'input', 'link', 'meta',
+             'param', 'source', 'track', 'wbr'}
+# Elements whose contents are not text
+SKIP_TAGS = {'script', 'style', 'template', 'noscript'}
+# Block elements that implicitly close an open <p>
+P_CLOSERS = {'address', 'article', 'aside', 'blockquote', 'div', 'dl', 'fieldset', 'figure',
+             'footer', 'form', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'header', 'hr', 'main',
+             'nav', 'ol', 'p', 'pre', 'section', 'table', 'ul'}
+
+_COMPOUND_RE = re.compile(r'''
+    (?P<tag>[a-zA-Z][\w-]*|\*)?
+    (?P<rest>(?:\.[\w-]+|\#[\w-]+|\[[\w:-]+(?:=(?:"[^"]*"|'[^']*'|[^\]]*))?\])*)$
+''', re.VERBOSE)
+_META_CHARSET_RE = re.compile(rb'''<meta[^>]+?charset\s*=\s*["']?\s*([\w.:-]+)''', re.IGNORECASE)
+_CONTENT_TYPE_CHARSET_RE = re.compile(r'''charset\s*=\s*["']?([\w.:-]+)''', re.IGNORECASE)
+_BOMS = ((codecs.BOM_UTF8, 'utf-8-sig'), (codecs.BOM_UTF16_LE, 'utf-16'), (codecs.BOM_UTF16_BE, 'utf-16'))
+_PART_RE = re.compile(r'''\.([\w-]+)|\#([\w-]+)|\[([\w:-]+)(?:=("[^"]*"|'[^']*'|[^\]]*))?\]''')
+
+
+class Field(namedtuple('Field', ['name', 'selector', 'attr', 'multiple', 'separator', 'strip', 'default'])):
+    """
+    One value to extract from a page.
+    Args:
+        name: Key in the extracted dict
+        selector: CSS selector, or a list of selectors in priority order. Supports tag,
+                  .class, #id, [attr] and [attr=value] compounds joined by descendant spaces;
+                  a trailing @name reads that attribute for this selector only
+        attr: Attribute to read from the matched element; None reads its text
+        multiple: Collect every match (joined with `separator`) instead of the first one
+        separator: String used to join multiple matches
+        strip: Strip whitespace from text values
+        default: Value used when nothing matches
+    """
+    __slots__ = ()
+
+    def __new__(cls, name, selector, attr=None, multiple=False, separator=' ', strip=True, default=None):
+        return super().__new__(cls, name, selector, attr, multiple, separator, strip, default)
+
+
+def charset_from_headers(headers):
+    """charset parameter of a response's Content-Type header, or None."""
+    for name, value in (headers or {}).items():
+        if name.lower() == 'content-type':
+            match = _CONTENT_TYPE_CHARSET_RE.search(value or '')
+            return match.group(1) if match else None
+    return None
+
+
+def decode_html(html, encoding=None):
+    """
+    Decode a page the way browsers do: a byte order mark wins, then the HTTP
+    charset (`encoding`), then a <meta charset> near the top. Undeclared pages
+    are read as UTF-8, falling back to windows-1252 when they are not valid UTF-8.
+    """
+    for bom, bom_encoding in _BOMS:
+        if html.startswith(bom):
+            return html.decode(bom_encoding, errors='replace')
+    if encoding is None:
+        match = _META_CHARSET_RE.search(html[:4096])
+        encoding = match.group(1).decode('ascii') if match else None
+    if encoding is not None:
+        try:
+            return html.decode(encoding, errors='replace')
+        except LookupError:
+            pass  # Unknown charset name; sniff instead
+    try:
+        return html.decode('utf-8')
+    except UnicodeDecodeError:
+        return html.decode('cp1252', errors='replace')
+
+
+class _Compound:
+    """A compiled simple selector such as div.article-body or meta[name=description]."""
+    __slots__ = ('tag', 'classes', 'attrs')
+
+    def __init__(self, text):
+        match = _COMPOUND_RE.match(text)
+        if not match or not text:
+            raise ValueError(f"Unsupported selector: {text!r}")
+        tag = match.group('tag')
+        self.tag = tag.lower() if tag and tag != '*' else None
+        self.classes = set()
+        self.attrs = []
+        for cls, id_, attr, value in _PART_RE.findall(match.group('rest')):
+            if cls:
+                self.classes.add(cls)
+            elif id_:
+                self.attrs.append(('id', id_))
+            else:
+                value = value.strip('"\'') if value else None
+                self.attrs.append((attr.lower(), value))
+
+    def matches(self, tag, classes, attrs):
+        if self.tag is not None and self.tag != tag:
+            return False
+        if self.classes and not self.classes <= classes:
+            return False
+        for name, value in self.attrs:
+            if name not in attrs or (value is not None and attrs[name] != value):
+                return False
+        return True
+
+
+def compile_selector(selector):
+    """Compile a selector string into a chain of compounds, outermost first."""
+    return [_Compound(part) for part in selector.split()]
+
+
+class ArticleExtractor:
+    def __init__(self, fields):
+        """
+        Extract several fields from an HTML page in a single parse.
+        Selectors are compiled once here and indexed by tag name, so each start
+        tag is only checked against the selectors that can match it.
+        Args:
+            fields: List of Field definitions
+        """
+        self.fields = list(fields)
+        self._by_tag = {}
+        self._any_tag = []
+        for field_idx, field in enumerate(self.fields):
+            selectors = [field.selector] if isinstance(field.selector, str) else field.selector
+            for priority, selector in enumerate(selectors):
+                selector, _, attr = selector.partition('@')
+                chain = compile_selector(selector)
+                rule = (field_idx, priority, chain, attr or field.attr)
+                if chain[-1].tag is None:
+                    self._any_tag.append(rule)
+                else:
+                    self._by_tag.setdefault(chain[-1].tag, []).append(rule)
+
+    def _rules_for(self, tag):
+        rules = self._by_tag.get(tag)
+        if rules is None:
+            return self._any_tag
+        return rules + self._any_tag if self._any_tag else rules
+
+    def extract(self, html, encoding=None):
+        """
+        Extract every field from an HTML document (str or bytes) in one traversal.
+        Bytes are decoded with decode_html; pass the HTTP charset as `encoding`.
+        """
+        if isinstance(html, bytes):
+            html = decode_html(html, encoding)
+        parser = _ExtractionParser(self)
+        parser.feed(html)
+        parser.close()
+        return parser.result()
+
+
+class _ExtractionParser(HTMLParser):
+    def __init__(self, extractor):
+        super().__init__(convert_charrefs=True)
+        self.extractor = extractor
+        self.fields = extractor.fields
+        # values[field][priority] -> list of matched values
+        self.values = [{} for _ in self.fields]
+        self.stack = []      # Open elements as (tag, classes, attrs)
+        self.captures = []   # Active text captures as [field, priority, depth, parts]
+        self.skipping = None
+
+    def _done(self, field_idx, priority):
+        return not self.fields[field_idx].multiple and priority in self.values[field_idx]
+
+    def _record(self, field_idx, priority, value):
+        field = self.fields[field_idx]
+        if field.strip and value is not None:
+            value = value.strip()
+        if field.multiple:
+            self.values[field_idx].setdefault(priority, []).append(value)
+        elif priority not in self.values[field_idx]:
+            self.values[field_idx][priority] = [value]
+
+    def handle_starttag(self, tag, attrs):
+        self._start(tag, attrs, self_closing=False)
+
+    def handle_startendtag(self, tag, attrs):
+        self._start(tag, attrs, self_closing=True)
+
+    def _start(self, tag, attrs, self_closing):
+        if self.skipping:
+            return
+        if tag in P_CLOSERS and self.stack and self.stack[-1][0] == 'p':
+            self._close_from(len(self.stack) - 1)
+
+        attrs = {name: (value if value is not None else '') for name, value in attrs}
+        classes = set(attrs.get('class', '').split())
+        for field_idx, priority, chain, attr in self.extractor._rules_for(tag):
+            if self._done(field_idx, priority) or not chain[-1].matches(tag, classes, attrs):
+                continue
+            if len(chain) > 1 and not self._ancestors_match(chain):
+                continue
+            if attr is not None:
+                self._record(field_idx, priority, attrs.get(attr))
+            elif not (self_closing or tag in VOID_TAGS):
+                if not any(c[0] == field_idx and c[1] == priority for c in self.captures) \
+                        or self.fields[field_idx].multiple:
+                    self.captures.append([field_idx, priority, len(self.stack), []])
+
+        if tag in SKIP_TAGS and not self_closing:
+            self.skipping = tag
+        elif tag not in VOID_TAGS and not self_closing:
+            self.stack.append((tag, classes, attrs))
+
+    def _ancestors_match(self, chain):
+        pos = len(chain) - 2
+        for tag, classes, attrs in reversed(self.stack):
+            if chain[pos].matches(tag, classes, attrs):
+                pos -= 1
+                if pos < 0:
+                    return True
+        return False
+
+    def handle_endtag(self, tag):
+        if self.skipping:
+            if tag == self.skipping:
+                self.skipping = None
+            return
+        # Pop back to the nearest open element with this tag; stray end tags are ignored
+        for depth in range(len(self.stack) - 1, -1, -1):
+            if self.stack[depth][0] == tag:
+                self._close_from(depth)
+                return
+
+    def _close_from(self, depth):
+        del self.stack[depth:]
+        still_open = []
+        for capture in self.captures:
+            if capture[2] >= depth:
+                self._record(capture[0], capture[1], ''.join(capture[3]))
+            else:
+                still_open.append(capture)
+        self.captures = still_open
+
+    def handle_data(self, data):
+        if self.skipping:
+            return
+        for capture in self.captures:
+            capture[3].append(data)
+
+    def result(self):
+        # Elements left open at the end of the document still count
+        self._close_from(0)
+        extracted = {}
+        for field, values in zip(self.fields, self.values):
+            if not values:
+                # Multiple fields join to '' when nothing matched, like an empty match list
+                extracted[field.name] = '' if field.multiple and field.default is None else field.default
+                continue
+            matches = values[min(values)]
+            if field.multiple:
+                extracted[field.name] = field.separator.join(v for v in matches if v is not None)
+            else:
+                extracted[field.name] = matches[0] if matches[0] is not None else field.default
+        return extracted
+
+
+# Fields scraped from article pages by test2 / test3
+ARTICLE_FIELDS = [
+    Field('title', 'h1'),
+    Field('author', '.author_name', default='Unknown'),
+    Field('description', 'meta[name=description]', attr='content'),
+    Field('text', 'p', multiple=True, strip=False),
+    Field('published_date', 'time', attr='datetime'),
+    Field('image_link', 'img.featured-image', attr='src'),
+]
+
+article_extractor = ArticleExtractor(ARTICLE_FIELDS)
+
+
+def extract_article(html, encoding=None):
+    """Extract title, author, description, text, date and image from an article page."""
+    return article_extractor.extract(html, encoding)
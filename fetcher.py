@@ -0,0 +1,182 @@
+import asyncio
+from collections import namedtuple
+
+import aiohttp
+
+from politeness import MAX_RETRIES
+
+# Default limits for the fetch engine
+DEFAULT_PER_HOST_LIMIT = 8   # Requests in flight against a single host
+DEFAULT_TOTAL_LIMIT = 100    # Requests in flight across all hosts
+DEFAULT_TIMEOUT = 30         # Seconds per request
+
+_END = object()
+
+
+class FetchResult(namedtuple('FetchResult', ['url', 'status', 'content', 'headers', 'cache'], defaults=(None,))):
+    """
+    Result of a single fetch; status is None when the request failed outright.
+    The validators of a 200 are saved by commit(), which callers run once the
+    page has been fully handled, so a crash in between refetches it instead of
+    getting a 304 for a page that was never recorded.
+    """
+    __slots__ = ()
+
+    def commit(self):
+        if self.status == 200 and self.cache is not None:
+            self.cache.store(self.url, self.headers)
+
+
+class Fetcher:
+    def __init__(self, per_host_limit=DEFAULT_PER_HOST_LIMIT, total_limit=DEFAULT_TOTAL_LIMIT,
+                 timeout=DEFAULT_TIMEOUT, headers=None, cache=None, politeness=None,
+                 max_retries=MAX_RETRIES, conditional=None):
+        """
+        Async HTTP fetcher with pooled keep-alive connections.
+        Args:
+            per_host_limit: Maximum number of requests in flight per host
+            total_limit: Maximum number of requests in flight overall
+            timeout: Total timeout in seconds for a single request
+            headers: Extra headers sent with every request
+            cache: Optional HTTPCache; when set, requests are conditional and a
+                   304 comes back with status 304 and no content. Validators of a
+                   200 are only stored by FetchResult.commit()
+            conditional: Optional predicate url -> bool; cached validators are only
+                         sent for URLs it accepts (e.g. ones the caller has a record
+                         of), so a 304 never arrives for a page it cannot reuse
+            politeness: Optional Politeness; when set, robots.txt is honoured, every
+                        request waits for its host's rate limit, and throttled or
+                        failed requests are retried up to `max_retries` times
+            max_retries: Retries per URL when `politeness` is set
+        """
+        self.per_host_limit = per_host_limit
+        self.total_limit = total_limit
+        self.timeout = aiohttp.ClientTimeout(total=timeout)
+        self.headers = headers or {}
+        self.cache = cache
+        self.conditional = conditional
+        self.politeness = politeness
+        self.max_retries = max_retries
+        self.session = None
+        if politeness is not None:
+            self.headers.setdefault('User-Agent', politeness.user_agent)
+
+    async def __aenter__(self):
+        # One connector for the whole crawl so connections are reused across URLs
+        connector = aiohttp.TCPConnector(
+            limit=self.total_limit,
+            limit_per_host=self.per_host_limit,
+            keepalive_timeout=60,
+            ttl_dns_cache=300
+        )
+        self.session = aiohttp.ClientSession(connector=connector, timeout=self.timeout,
+                                             headers=self.headers)
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.session.close()
+        self.session = None
+
+    async def fetch(self, url, headers=None):
+        """Fetch a single URL; the connector holds it until its host has a free slot."""
+        if self.cache is not None and (self.conditional is None or self.conditional(url)):
+            headers = {**self.cache.conditional_headers(url), **(headers or {})}
+        if self.politeness is None:
+            return await self._get(url, headers)
+
+        if not await self.politeness.allowed_async(url):
+            print(f"Disallowed by robots.txt: {url}")
+            return FetchResult(url, None, None, {})
+        for attempt in range(self.max_retries + 1):
+            await self.politeness.wait_async(url)
+            result = await self._get(url, headers)
+            if not await self.politeness.record_async(url, result.status, result.headers) \
+                    or attempt == self.max_retries:
+                return result
+
+    async def _get(self, url, headers):
+        try:
+            async with self.session.get(url, headers=headers) as response:
+                if response.status == 304:
+                    return FetchResult(url, 304, None, dict(response.headers))
+                content = await response.read()
+                return FetchResult(url, response.status, content, dict(response.headers),
+                                   self.cache if response.status == 200 else None)
+        except (aiohttp.ClientError, asyncio.TimeoutError, ValueError) as e:
+            print(f"Error fetching {url}: {e}")
+            return FetchResult(url, None, None, {})
+
+    async def iter_fetch(self, urls):
+        """
+        Fetch URLs concurrently and yield results as they complete.
+        URLs are pulled lazily in a worker thread, so `urls` may be a generator that
+        does blocking I/O (e.g. a streamed sitemap). At most a bounded window of
+        results is in flight or waiting to be consumed at any time; an exception
+        raised by `urls` is re-raised once the requests already started are drained.
+        """
+        loop = asyncio.get_running_loop()
+        urls = iter(urls)
+        slots = asyncio.Semaphore(self.total_limit * 2)
+        results = asyncio.Queue()
+        tasks = set()
+
+        async def fetch_into_queue(url):
+            await results.put(await self.fetch(url))
+
+        async def feed():
+            try:
+                while True:
+                    await slots.acquire()
+                    url = await loop.run_in_executor(None, next, urls, _END)
+                    if url is _END:
+                        break
+                    task = asyncio.ensure_future(fetch_into_queue(url))
+                    tasks.add(task)
+                    task.add_done_callback(tasks.discard)
+            finally:
+                await asyncio.gather(*tasks, return_exceptions=True)
+                await results.put(_END)
+
+        feeder = asyncio.ensure_future(feed())
+        try:
+            while True:
+                result = await results.get()
+                if result is _END:
+                    break
+                slots.release()
+                yield result
+        finally:
+            if not feeder.done():
+                feeder.cancel()
+                for task in list(tasks):
+                    task.cancel()
+        await feeder
+
+
+async def _fetch_many(urls, handle, **fetcher_kwargs):
+    async with Fetcher(**fetcher_kwargs) as fetcher:
+        async for result in fetcher.iter_fetch(urls):
+            handle(result)
+
+
+def fetch_many(urls, handle=None, **fetcher_kwargs):
+    """
+    Fetch many URLs concurrently from synchronous code.
+    If `handle` is given it is called with each FetchResult as soon as it
+    arrives (in completion order) and nothing is returned. Otherwise all
+    results are returned as a list in the same order as `urls`.
+    """
+    if handle is not None:
+        asyncio.run(_fetch_many(urls, handle, **fetcher_kwargs))
+        return None
+
+    urls = list(urls)
+    results = {}
+    asyncio.run(_fetch_many(urls, lambda result: results.__setitem__(result.url, result),
+                            **fetcher_kwargs))
+    return [results[url] for url in urls]
+
+
+def fetch_one(url, **fetcher_kwargs):
+    """Fetch a single URL through the fetch engine."""
+    return fetch_many([url], **fetcher_kwargs)[0]
@@ -0,0 +1,199 @@
+import hashlib
+import math
+import os
+import sqlite3
+import struct
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+# Query parameters that only track where a click came from
+TRACKING_PARAMS = {'fbclid', 'gclid', 'dclid', 'msclkid', 'yclid', 'mc_cid', 'mc_eid', 'igshid',
+                   'ref', 'ref_src', 'ref_url', 'cmpid', 'ito', 'ncid', 'amp', 'outputtype', 'fromamp'}
+TRACKING_PREFIXES = ('utm_', 'pk_', 'at_', 'ga_')
+DEFAULT_PORTS = {'http': 80, 'https': 443}
+
+
+def canonicalize_url(url):
+    """
+    Normalize a URL so variants of the same page compare equal: https scheme,
+    lowercase host without www./amp. prefixes or default port, no fragment,
+    tracking parameters dropped and the rest sorted, AMP path segments removed
+    and no trailing slash.
+    """
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+    if scheme == 'http':
+        scheme = 'https'
+
+    host = (parts.hostname or '').lower()
+    for prefix in ('www.', 'amp.'):
+        if host.startswith(prefix):
+            host = host[len(prefix):]
+    if parts.port and parts.port != DEFAULT_PORTS.get(scheme):
+        host = f"{host}:{parts.port}"
+
+    # AMP variants: /amp/story/..., /story/.../amp, /story/.../amp/1, article.ece/amp
+    segments = [segment for segment in parts.path.split('/') if segment]
+    if segments and segments[0] == 'amp':
+        segments = segments[1:]
+    if len(segments) >= 2 and segments[-2] == 'amp' and segments[-1].isdigit():
+        segments = segments[:-2]
+    elif segments and segments[-1] in ('amp', 'amp.html'):
+        segments = segments[:-1]
+    if segments and segments[-1].endswith('.amp'):
+        segments[-1] = segments[-1][:-len('.amp')]
+    path = '/' + '/'.join(segments)
+
+    query = sorted(
+        (key, value) for key, value in parse_qsl(parts.query, keep_blank_values=True)
+        if key.lower() not in TRACKING_PARAMS and not key.lower().startswith(TRACKING_PREFIXES)
+    )
+    return urlunsplit((scheme, host, path, urlencode(query), ''))
+
+
+def url_digest(url):
+    """16-byte digest of a canonical URL; used as the Bloom filter key and the exact-set key."""
+    return hashlib.blake2b(url.encode('utf-8'), digest_size=16).digest()
+
+
+class BloomFilter:
+    def __init__(self, capacity, error_rate, bits=None, count=0):
+        """
+        Fixed-size Bloom filter over 16-byte digests.
+        Args:
+            capacity: Number of items it is sized for
+            error_rate: False-positive rate at `capacity` items
+        """
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.num_bits = max(8, int(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.num_hashes = max(1, round(self.num_bits / capacity * math.log(2)))
+        self.bits = bits if bits is not None else bytearray((self.num_bits + 7) // 8)
+        self.count = count
+
+    def _positions(self, digest):
+        # Double hashing: the two halves of the digest generate all k positions
+        h1, h2 = struct.unpack('<QQ', digest)
+        return [(h1 + i * h2) % self.num_bits for i in range(self.num_hashes)]
+
+    def __contains__(self, digest):
+        return all(self.bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(digest))
+
+    def add(self, digest):
+        for pos in self._positions(digest):
+            self.bits[pos >> 3] |= 1 << (pos & 7)
+        self.count += 1
+
+    @property
+    def full(self):
+        return self.count >= self.capacity
+
+
+class ScalableBloomFilter:
+    GROWTH = 2          # Each new stage holds twice as many items...
+    TIGHTENING = 0.5    # ...at half the false-positive rate, so the total stays bounded
+
+    def __init__(self, initial_capacity=1_000_000, error_rate=0.001):
+        """
+        Bloom filter that adds stages as it fills, so memory grows with the number
+        of URLs seen while the overall false-positive rate stays under `error_rate`.
+        """
+        self.initial_capacity = initial_capacity
+        self.error_rate = error_rate
+        self.stages = []
+
+    def _add_stage(self):
+        n = len(self.stages)
+        self.stages.append(BloomFilter(
+            self.initial_capacity * self.GROWTH ** n,
+            self.error_rate * (1 - self.TIGHTENING) * self.TIGHTENING ** n
+        ))
+
+    def __contains__(self, digest):
+        return any(digest in stage for stage in self.stages)
+
+    def __len__(self):
+        return sum(stage.count for stage in self.stages)
+
+    def add(self, digest):
+        if not self.stages or self.stages[-1].full:
+            self._add_stage()
+        self.stages[-1].add(digest)
+
+    def save(self, path):
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'wb') as f:
+            f.write(struct.pack('<QdI', self.initial_capacity, self.error_rate, len(self.stages)))
+            for stage in self.stages:
+                f.write(struct.pack('<QdQQ', stage.capacity, stage.error_rate, stage.count, len(stage.bits)))
+                f.write(stage.bits)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        with open(path, 'rb') as f:
+            initial_capacity, error_rate, num_stages = struct.unpack('<QdI', f.read(struct.calcsize('<QdI')))
+            bloom = cls(initial_capacity, error_rate)
+            for _ in range(num_stages):
+                capacity, stage_error, count, size = struct.unpack('<QdQQ', f.read(struct.calcsize('<QdQQ')))
+                bloom.stages.append(BloomFilter(capacity, stage_error, bytearray(f.read(size)), count))
+        return bloom
+
+
+class URLFrontier:
+    def __init__(self, path='frontier', initial_capacity=1_000_000, error_rate=0.001):
+        """
+        Global record of every URL discovered across sitemaps, sections, feeds and runs.
+        A scalable Bloom filter answers most lookups in memory; only its "maybe"
+        answers are confirmed against the exact set of digests in SQLite.
+        Args:
+            path: Path prefix for the .bloom and .db files
+            initial_capacity: URLs the first Bloom stage is sized for
+            error_rate: Target false-positive rate of the Bloom filter
+        """
+        self.bloom_path = path + '.bloom'
+        self.conn = sqlite3.connect(path + '.db', check_same_thread=False)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('PRAGMA synchronous=NORMAL')
+        self.conn.execute('CREATE TABLE IF NOT EXISTS seen (digest BLOB PRIMARY KEY) WITHOUT ROWID')
+        self.conn.commit()
+
+        stored = self.conn.execute('SELECT COUNT(*) FROM seen').fetchone()[0]
+        self.bloom = ScalableBloomFilter.load(self.bloom_path) if os.path.exists(self.bloom_path) else None
+        if self.bloom is None or len(self.bloom) != stored:
+            # The filter was never saved or is behind the exact set (e.g. after a crash).
+            # A stale filter would give false negatives, so rebuild it from the digests
+            self.bloom = ScalableBloomFilter(initial_capacity, error_rate)
+            for (digest,) in self.conn.execute('SELECT digest FROM seen'):
+                self.bloom.add(digest)
+        self._unsaved = 0
+
+    def seen(self, url):
+        """Whether the canonical form of `url` was already added."""
+        digest = url_digest(canonicalize_url(url))
+        if digest not in self.bloom:
+            return False
+        return self.conn.execute('SELECT 1 FROM seen WHERE digest = ?', (digest,)).fetchone() is not None
+
+    def add(self, url):
+        """Add a URL; returns True if it was new, False if it (or a variant of it) was seen before."""
+        digest = url_digest(canonicalize_url(url))
+        if digest in self.bloom and \
+                self.conn.execute('SELECT 1 FROM seen WHERE digest = ?', (digest,)).fetchone():
+            return False
+        self.conn.execute('INSERT OR IGNORE INTO seen (digest) VALUES (?)', (digest,))
+        self.bloom.add(digest)
+        self._unsaved += 1
+        if self._unsaved >= 1000:
+            self.save()
+        return True
+
+    def save(self):
+        if not self._unsaved:
+            return
+        self.conn.commit()
+        self.bloom.save(self.bloom_path)
+        self._unsaved = 0
+
+    def close(self):
+        self.save()
+        self.conn.close()
@@ -0,0 +1,135 @@
+import hashlib
+import json
+import os
+import time
+from collections import namedtuple
+
+import requests
+
+from politeness import polite_get
+
+DEFAULT_CACHE_DIR = '.http_cache'
+
+class CachedResponse(namedtuple('CachedResponse', ['url', 'status', 'content', 'not_modified', 'headers', 'cache'])):
+    """
+    Response from cached_get; not_modified is True when the server answered 304.
+    Validators of a 200 that cached_get did not store itself are saved by
+    commit(), which callers run once they have fully processed the body, so a
+    crash in between refetches the document instead of getting a 304 for it.
+    """
+    __slots__ = ()
+
+    def commit(self):
+        if self.status == 200 and self.cache is not None:
+            self.cache.store(self.url, self.headers, self.content)
+
+
+class HTTPCache:
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR):
+        """
+        On-disk store of HTTP validators (ETag / Last-Modified) and response bodies.
+        Args:
+            cache_dir: Directory the cache entries are written to
+        """
+        self.cache_dir = cache_dir
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def _path(self, url, suffix):
+        key = hashlib.sha1(url.encode('utf-8')).hexdigest()
+        return os.path.join(self.cache_dir, key[:2], key + suffix)
+
+    def get(self, url):
+        """Return the stored validators for a URL, or None if it was never cached."""
+        try:
+            with open(self._path(url, '.json'), encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def conditional_headers(self, url):
+        """Build If-None-Match / If-Modified-Since headers for a URL."""
+        entry = self.get(url)
+        headers = {}
+        if entry:
+            if entry.get('etag'):
+                headers['If-None-Match'] = entry['etag']
+            if entry.get('last_modified'):
+                headers['If-Modified-Since'] = entry['last_modified']
+        return headers
+
+    def store(self, url, headers, content=None):
+        """
+        Record the validators from a 200 response. The body is kept only when
+        given, so callers that stream large documents can store validators alone.
+        """
+        headers = {key.lower(): value for key, value in headers.items()}
+        entry = {
+            'url': url,
+            'etag': headers.get('etag'),
+            'last_modified': headers.get('last-modified'),
+            'stored_at': time.time(),
+            'has_body': content is not None
+        }
+        # Without validators there is nothing to send next time, so skip the write
+        if not entry['etag'] and not entry['last_modified']:
+            return
+
+        meta_path = self._path(url, '.json')
+        os.makedirs(os.path.dirname(meta_path), exist_ok=True)
+        body_path = self._path(url, '.body')
+        if content is not None:
+            _atomic_write(body_path, content)
+        elif os.path.exists(body_path):
+            # A body from an older response would not match the new validators
+            os.remove(body_path)
+        _atomic_write(meta_path, json.dumps(entry).encode('utf-8'))
+
+    def has_body(self, url):
+        """Whether a response body is stored for a URL."""
+        return os.path.exists(self._path(url, '.body'))
+
+    def load_body(self, url):
+        """Return the cached body for a URL, or None if only validators were stored."""
+        try:
+            with open(self._path(url, '.body'), 'rb') as f:
+                return f.read()
+        except OSError:
+            return None
+
+
+def _atomic_write(path, data):
+    # Write to a temp file first so a crash never leaves a half-written entry
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+
+def cached_get(url, cache=None, session=None, timeout=30, load_body=False, politeness=None):
+    """
+    GET a URL with conditional headers taken from the cache.
+    On 304 the returned content is None unless `load_body` is set, in which
+    case the cached body is read back from disk. With a Politeness the request
+    goes through politeness.polite_get (robots.txt, rate limit, backoff).
+    With `load_body` a 200 is stored right away, since a later 304 still hands
+    the body back; otherwise its validators are only saved by response.commit().
+    """
+    cache = cache or HTTPCache()
+    headers = cache.conditional_headers(url)
+    if load_body and not cache.has_body(url):
+        # A 304 would leave nothing to return, so ask for the full body instead
+        headers = {}
+    if politeness is not None:
+        response = polite_get(url, politeness, session=session, headers=headers, timeout=timeout)
+    else:
+        response = (session or requests).get(url, headers=headers, timeout=timeout)
+
+    if response.status_code == 304:
+        content = cache.load_body(url) if load_body else None
+        return CachedResponse(url, 304, content, True, response.headers, None)
+
+    result = CachedResponse(url, response.status_code, response.content, False, response.headers, cache)
+    if load_body:
+        result.commit()
+        return result._replace(cache=None)
+    return result
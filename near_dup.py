@@ -0,0 +1,168 @@
+import os
+import pickle
+import re
+import zlib
+from collections import OrderedDict
+
+import numpy as np
+
+DEFAULT_THRESHOLD = 0.8   # Estimated Jaccard similarity at which two articles are the same story
+DEFAULT_NUM_PERM = 128    # MinHash permutations per signature
+DEFAULT_BANDS = 16        # LSH bands; rows per band = num_perm / bands
+SHINGLE_SIZE = 4          # Words per shingle
+
+_PRIME = (1 << 31) - 1    # Shingle hashes are reduced mod this, so a * x + b fits in 64 bits
+_WORD_RE = re.compile(r'\w+')
+
+# Body fields used by the different scrapers, in order of preference
+TEXT_FIELDS = ('text', 'full_text', 'content', 'summary', 'description')
+
+
+def article_text(article):
+    """Title plus the first non-empty body field of an article dict."""
+    body = next((article[field] for field in TEXT_FIELDS if article.get(field)), '')
+    return f"{article.get('title') or ''} {body}"
+
+
+def shingle_hashes(text, size=SHINGLE_SIZE):
+    """Distinct 32-bit hashes of the text's overlapping word `size`-grams."""
+    words = _WORD_RE.findall(text.lower())
+    if len(words) < size:
+        grams = [' '.join(words)] if words else []
+    else:
+        grams = [' '.join(words[i:i + size]) for i in range(len(words) - size + 1)]
+    return np.unique(np.fromiter((zlib.crc32(gram.encode('utf-8')) for gram in grams),
+                                 dtype=np.uint64, count=len(grams)))
+
+
+class MinHasher:
+    def __init__(self, num_perm=DEFAULT_NUM_PERM, seed=1):
+        # The same seed gives the same permutations, so signatures stay comparable across runs
+        rng = np.random.RandomState(seed)
+        self.num_perm = num_perm
+        self.a = rng.randint(1, _PRIME, size=num_perm).astype(np.uint64)
+        self.b = rng.randint(0, _PRIME, size=num_perm).astype(np.uint64)
+
+    def signature(self, text):
+        """MinHash signature (uint32 array of length num_perm) of a text."""
+        hashes = shingle_hashes(text) % _PRIME
+        if not len(hashes):
+            return np.full(self.num_perm, _PRIME, dtype=np.uint32)
+        # All permutations of all shingles in one vectorized pass
+        return ((np.outer(self.a, hashes) + self.b[:, None]) % _PRIME).min(axis=1).astype(np.uint32)
+
+
+def jaccard_estimate(sig1, sig2):
+    return float(np.mean(sig1 == sig2))
+
+
+class NearDuplicateIndex:
+    def __init__(self, threshold=DEFAULT_THRESHOLD, num_perm=DEFAULT_NUM_PERM, bands=DEFAULT_BANDS,
+                 max_items=None):
+        """
+        MinHash-LSH index of article texts. Candidates sharing any LSH band are
+        confirmed against `threshold` with the full signature.
+        Args:
+            threshold: Estimated Jaccard similarity above which texts are near-duplicates
+            num_perm: MinHash permutations per signature
+            bands: LSH bands; more bands find lower-similarity candidates
+            max_items: Forget the oldest texts beyond this many (None keeps everything)
+        """
+        if num_perm % bands:
+            raise ValueError("num_perm must be a multiple of bands")
+        self.threshold = threshold
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.max_items = max_items
+        self.hasher = MinHasher(num_perm)
+        self.signatures = OrderedDict()          # key -> signature, oldest first
+        self.buckets = [{} for _ in range(bands)]  # band -> {band bytes: [keys]}
+
+    def __len__(self):
+        return len(self.signatures)
+
+    def _band_keys(self, signature):
+        return [signature[i * self.rows:(i + 1) * self.rows].tobytes() for i in range(self.bands)]
+
+    def query(self, text=None, signature=None, exclude=None):
+        """Key of the most similar indexed text at or above the threshold, or None; `exclude` is never returned."""
+        if signature is None:
+            signature = self.hasher.signature(text)
+        candidates = set()
+        for bucket, band in zip(self.buckets, self._band_keys(signature)):
+            candidates.update(bucket.get(band, ()))
+        candidates.discard(exclude)
+        best, best_score = None, self.threshold
+        for key in candidates:
+            score = jaccard_estimate(signature, self.signatures[key])
+            if score >= best_score:
+                best, best_score = key, score
+        return best
+
+    def insert(self, key, text=None, signature=None):
+        if signature is None:
+            signature = self.hasher.signature(text)
+        if key in self.signatures:
+            self.remove(key)
+        self.signatures[key] = signature
+        for bucket, band in zip(self.buckets, self._band_keys(signature)):
+            bucket.setdefault(band, []).append(key)
+        if self.max_items is not None and len(self.signatures) > self.max_items:
+            self.remove(next(iter(self.signatures)))
+
+    def remove(self, key):
+        signature = self.signatures.pop(key)
+        for bucket, band in zip(self.buckets, self._band_keys(signature)):
+            keys = bucket[band]
+            keys.remove(key)
+            if not keys:
+                del bucket[band]
+
+    def add(self, key, text):
+        """
+        Index a text unless it near-duplicates one already indexed under another key;
+        a changed text for an indexed key replaces its old entry.
+        Returns the key of the earlier copy for a duplicate, otherwise None.
+        Texts without words are never indexed, since they all share one signature.
+        """
+        if not _WORD_RE.search(text):
+            return None
+        signature = self.hasher.signature(text)
+        duplicate_of = self.query(signature=signature, exclude=key)
+        if duplicate_of is None:
+            self.insert(key, signature=signature)
+        return duplicate_of
+
+    def save(self, path):
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'wb') as f:
+            pickle.dump(self, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path, **kwargs):
+        """Load a saved index, or create a new one with `kwargs` if `path` doesn't exist."""
+        if not os.path.exists(path):
+            return cls(**kwargs)
+        with open(path, 'rb') as f:
+            return pickle.load(f)
+
+
+def fold_near_duplicates(articles, text=article_text, threshold=DEFAULT_THRESHOLD):
+    """
+    Collapse near-duplicate articles before expensive per-article work (embedding,
+    topic modelling). Returns (representatives, assignment) where representatives
+    is the first copy of each story and assignment[i] is the index into
+    representatives standing in for articles[i].
+    """
+    index = NearDuplicateIndex(threshold=threshold)
+    representatives = []
+    assignment = np.empty(len(articles), dtype=np.int64)
+    for i, article in enumerate(articles):
+        duplicate_of = index.add(len(representatives), text(article))
+        if duplicate_of is None:
+            assignment[i] = len(representatives)
+            representatives.append(article)
+        else:
+            assignment[i] = duplicate_of
+    return representatives, assignment
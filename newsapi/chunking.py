@@ -0,0 +1,150 @@
+from collections import namedtuple
+
+import nltk
+from nltk.tokenize import sent_tokenize
+
+DEFAULT_MAX_TOKENS = 1024  # Used when the tokenizer doesn't report its model's limit
+MIN_TOKENS = 64            # A shorter final chunk takes sentences from the one before it
+BUCKET_WIDTH = 128
+
+# One chunk of document `doc`; `tokens` is its length in model tokens
+Chunk = namedtuple('Chunk', ['doc', 'index', 'text', 'tokens'])
+
+
+def _ensure_punkt():
+    # Newer NLTK releases read the punkt_tab tables instead of the punkt pickles
+    for resource in ('punkt', 'punkt_tab'):
+        try:
+            nltk.data.find(f'tokenizers/{resource}')
+        except LookupError:
+            nltk.download(resource)
+
+
+def token_budget(tokenizer, max_tokens=None):
+    """Input tokens left for text once the model's special tokens are added."""
+    if max_tokens is None:
+        max_tokens = getattr(tokenizer, 'model_max_length', DEFAULT_MAX_TOKENS)
+        if max_tokens > 100000:  # Tokenizers without a limit report a huge sentinel
+            max_tokens = DEFAULT_MAX_TOKENS
+    if tokenizer is not None:
+        max_tokens -= tokenizer.num_special_tokens_to_add()
+    return max_tokens
+
+
+def token_ids(texts, tokenizer):
+    """Token ids of every text in one batched tokenizer call (words without a tokenizer)."""
+    if tokenizer is None:
+        return [text.split() for text in texts]
+    if not texts:
+        return []
+    return tokenizer(list(texts), add_special_tokens=False, truncation=False)['input_ids']
+
+
+def _split_long(sentence_ids, budget, tokenizer):
+    # A sentence over the budget is cut into budget-sized token windows
+    # instead of being truncated by the model
+    for start in range(0, len(sentence_ids), budget):
+        window = sentence_ids[start:start + budget]
+        text = ' '.join(window) if tokenizer is None else tokenizer.decode(window).strip()
+        yield text, len(window)
+
+
+def _pack(sentences, lengths, budget, overlap, min_tokens):
+    """
+    Greedily pack (sentence, length) pairs into chunks of at most `budget` tokens.
+    A final chunk shorter than `min_tokens` is rebalanced by moving trailing
+    sentences of the chunk before it into it.
+    """
+    spans = []  # (first, end) sentence range of each chunk
+    start, total = 0, 0
+    for i, length in enumerate(lengths):
+        if i > start and total + length > budget:
+            spans.append((start, i))
+            # Carry trailing sentences of up to `overlap` tokens into the next chunk
+            carried_start, carried = i, 0
+            while carried_start > start and carried + lengths[carried_start - 1] <= overlap and \
+                    carried + lengths[carried_start - 1] + length <= budget:
+                carried_start -= 1
+                carried += lengths[carried_start]
+            start, total = carried_start, carried
+        total += length
+    if start < len(lengths):
+        spans.append((start, len(lengths)))
+
+    if len(spans) > 1:
+        # The greedy pass closes a chunk only when the next sentence would not fit, so the
+        # tail can never simply be merged back; shift the boundary instead, one sentence at
+        # a time, while the tail is short and the previous chunk stays long enough
+        (prev_start, prev_end), (tail_start, tail_end) = spans[-2], spans[-1]
+        prev_tokens = sum(lengths[prev_start:prev_end])
+        tail_tokens = sum(lengths[tail_start:tail_end])
+        while tail_tokens < min_tokens and prev_end - 1 > prev_start and tail_start - 1 >= prev_start \
+                and tail_tokens + lengths[tail_start - 1] <= budget \
+                and prev_tokens - lengths[prev_end - 1] >= min_tokens:
+            tail_start -= 1
+            prev_end -= 1
+            tail_tokens += lengths[tail_start]
+            prev_tokens -= lengths[prev_end]
+        spans[-2:] = [(prev_start, prev_end), (tail_start, tail_end)]
+
+    return [(' '.join(sentences[first:end]), sum(lengths[first:end])) for first, end in spans]
+
+
+def split_sentences(text):
+    """Sentences of a text; a paragraph break (blank line) always ends a sentence."""
+    return [sentence for paragraph in text.split('\n\n') for sentence in sent_tokenize(paragraph)]
+
+
+def chunk_texts(texts, tokenizer, max_tokens=None, overlap=0, min_tokens=MIN_TOKENS):
+    """
+    Split documents into chunks that fit the model's input.
+    Sentences of all documents are counted with the model's tokenizer in one
+    batched call, then packed greedily up to the token budget across paragraph
+    boundaries; a sentence longer than the budget is split on token boundaries.
+    Args:
+        texts: Documents to chunk
+        tokenizer: The summarization model's tokenizer (None counts words)
+        max_tokens: Input limit including special tokens; defaults to the model's
+        overlap: Tokens of trailing sentences repeated at the start of the next chunk
+        min_tokens: A shorter final chunk takes trailing sentences from the previous one
+    Returns:
+        A list of Chunk lists, one per document
+    """
+    _ensure_punkt()
+    budget = token_budget(tokenizer, max_tokens)
+    sentences = [split_sentences(text) for text in texts]
+    # Leading space so counts match the sentence's tokens inside a joined chunk
+    ids = iter(token_ids([' ' + sentence for doc in sentences for sentence in doc], tokenizer))
+
+    result = []
+    for doc, doc_sentences in enumerate(sentences):
+        pieces, lengths = [], []
+        for sentence in doc_sentences:
+            sentence_ids = next(ids)
+            if len(sentence_ids) > budget:
+                for text, length in _split_long(sentence_ids, budget, tokenizer):
+                    pieces.append(text)
+                    lengths.append(length)
+            else:
+                pieces.append(sentence)
+                lengths.append(len(sentence_ids))
+        result.append([Chunk(doc, index, text, length) for index, (text, length)
+                       in enumerate(_pack(pieces, lengths, budget, overlap, min_tokens))])
+    return result
+
+
+def chunk_text(text, tokenizer, max_tokens=None, overlap=0, min_tokens=MIN_TOKENS):
+    """The chunk strings of one document (see chunk_texts)."""
+    return [chunk.text for chunk in chunk_texts([text], tokenizer, max_tokens, overlap, min_tokens)[0]]
+
+
+def length_buckets(chunks, bucket_width=BUCKET_WIDTH):
+    """
+    Chunks (flattened across documents) sorted by token length and grouped
+    into buckets of `bucket_width` tokens, shortest bucket first, so similar
+    lengths can be batched together with little padding.
+    """
+    buckets = {}
+    for chunk in sorted((chunk for doc in chunks for chunk in doc), key=lambda chunk: chunk.tokens):
+        buckets.setdefault(chunk.tokens // bucket_width, []).append(chunk)
+    return list(buckets.values())
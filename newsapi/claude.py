@@ -1,48 +1,30 @@
-from transformers import pipeline
-import nltk
-from nltk.tokenize import sent_tokenize
 import textwrap
 
+from chunking import chunk_text, chunk_texts
+from mapreduce import MAX_CALLS, SummaryCache, mapreduce_summarize
+from summarization_service import get_service
+
 class TextSummarizer:
     def __init__(self, model_name="facebook/bart-large-cnn"):
         """
         Initialize the summarizer with a specified model.
         Default is BART, which is good for news article summarization.
         """
-        self.summarizer = pipeline("summarization", model=model_name)
-        # Download necessary NLTK data
-        try:
-            nltk.data.find('tokenizers/punkt')
-        except LookupError:
-            nltk.download('punkt')
+        # Shared, batching model service: loaded once per process for all summarizers
+        self.service = get_service(model_name)
+        self.summarizer = self.service.summarizer
+        # Chunk summaries for mode='mapreduce', opened on first use
+        self.summary_cache = None
 
-    def chunk_text(self, text, max_chunk_size=1024):
+    def chunk_text(self, text, max_chunk_size=None):
         """
         Split text into smaller chunks that won't exceed the model's token limit.
-        Uses sentence tokenization to avoid cutting sentences in the middle.
+        Uses sentence tokenization to avoid cutting sentences in the middle and
+        counts sentences with the model's own tokenizer.
         """
-        sentences = sent_tokenize(text)
-        chunks = []
-        current_chunk = []
-        current_size = 0
-        
-        for sentence in sentences:
-            sentence_size = len(sentence)
-            if current_size + sentence_size <= max_chunk_size:
-                current_chunk.append(sentence)
-                current_size += sentence_size
-            else:
-                if current_chunk:
-                    chunks.append(' '.join(current_chunk))
-                current_chunk = [sentence]
-                current_size = sentence_size
-        
-        if current_chunk:
-            chunks.append(' '.join(current_chunk))
-        
-        return chunks
+        return chunk_text(text, self.service.tokenizer, max_tokens=max_chunk_size)
 
-    def summarize(self, text, max_length=60, min_length=50):
+    def summarize(self, text, max_length=60, min_length=50, mode='chunks', max_calls=MAX_CALLS):
         """
         Summarize the input text.
         
@@ -50,20 +32,31 @@ class TextSummarizer:
             text (str): Input text to summarize
             max_length (int): Maximum length of the summary in words
             min_length (int): Minimum length of the summary in words
+            mode (str): 'chunks' joins one summary per chunk; 'mapreduce'
+                re-summarizes the chunk summaries until one summary is left
+            max_calls (int): Cap on chunk summaries (cached ones included) in 'mapreduce' mode
             
         Returns:
             str: Generated summary
         """
+        if mode == 'mapreduce':
+            if self.summary_cache is None:
+                self.summary_cache = SummaryCache()
+            result = mapreduce_summarize(text, self.service, self.service.model_name,
+                                         max_length=max_length, min_length=min_length,
+                                         max_calls=max_calls, cache=self.summary_cache)
+            return textwrap.fill(result.summary, width=80)
+        
         # Split text into chunks if it's too long
-        chunks = self.chunk_text(text)
-        summaries = []
+        chunks = chunk_texts([text], self.service.tokenizer)[0]
         
-        for chunk in chunks:
-            summary = self.summarizer(chunk, 
-                                    max_length=max_length, 
-                                    min_length=min_length, 
-                                    do_sample=False)
-            summaries.append(summary[0]['summary_text'])
+        # All chunks are queued together and summarized in batches
+        futures = [self.service.submit(chunk.text, token_count=chunk.tokens,
+                                       max_length=max_length,
+                                       min_length=min_length,
+                                       do_sample=False)
+                   for chunk in chunks]
+        summaries = [future.result() for future in futures]
         
         # Combine all summaries
         final_summary = ' '.join(summaries)
@@ -84,7 +77,8 @@ def main():
         summary = summarizer.summarize(
         sample_text,
         max_length=150,  # Adjust these parameters based on your needs
-        min_length=50
+        min_length=50,
+        mode='mapreduce'  # One summary for the whole text, however long
     )
     
     print("Original text length:", len(sample_text.split()))
@@ -1,12 +1,17 @@
 import json
+import os
+import sys
+
+# Shared crawler modules live in the repository root
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from article_store import iter_articles
 
 def clean_text(text):
     # Your cleaning logic here
     return text.strip()
 
-# Read the JSON file
-with open('articles.json', 'r') as json_file:
-    data = json.load(json_file)
+# Stream cluster/feed.py's articles lazily, once per link; pass another file or glob to override
+data = iter_articles(sys.argv[1] if len(sys.argv) > 1 else 'feed_articles-*.jsonl*', unique=True)
 
 cleaned_texts = []
 
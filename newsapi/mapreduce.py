@@ -0,0 +1,138 @@
+import hashlib
+import json
+import sqlite3
+from collections import namedtuple
+
+from chunking import chunk_texts, token_budget
+
+DEFAULT_CACHE_PATH = 'summary_cache.db'
+MAX_CALLS = 64   # Model calls one document may use across all levels
+
+# summary: final text; levels: map/reduce rounds run; calls: model calls made
+# (cache hits excluded); cache_hits: chunk summaries read from the cache.
+# calls + cache_hits is what counts against max_calls
+MapReduceResult = namedtuple('MapReduceResult', ['summary', 'levels', 'calls', 'cache_hits'])
+
+
+class SummaryCache:
+    def __init__(self, path=DEFAULT_CACHE_PATH):
+        """SQLite store of chunk summaries keyed by model, generation settings and chunk hash."""
+        self.conn = sqlite3.connect(path)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('CREATE TABLE IF NOT EXISTS summaries (key BLOB PRIMARY KEY, summary TEXT NOT NULL) WITHOUT ROWID')
+        self.conn.commit()
+
+    @staticmethod
+    def key(model, settings, text):
+        payload = f"{model}\0{json.dumps(settings, sort_keys=True)}\0{text}"
+        return hashlib.blake2b(payload.encode('utf-8'), digest_size=16).digest()
+
+    def get(self, key):
+        row = self.conn.execute('SELECT summary FROM summaries WHERE key = ?', (key,)).fetchone()
+        return row[0] if row else None
+
+    def put_many(self, items):
+        self.conn.executemany('INSERT OR REPLACE INTO summaries (key, summary) VALUES (?, ?)', items.items())
+        self.conn.commit()
+
+
+def _spread(items, count):
+    # `count` items spread evenly over the list, always keeping the first (the lead)
+    if count >= len(items):
+        return items
+    step = len(items) / count
+    return [items[int(i * step)] for i in range(count)]
+
+
+def _tree_calls(leaves, fan_in):
+    # Summaries needed to reduce `leaves` chunk summaries to one, `fan_in` per chunk per level
+    calls = 0
+    while leaves > 1:
+        calls += leaves
+        leaves = -(-leaves // fan_in)
+    return calls + 1
+
+
+def _affordable_chunks(count, remaining, fan_in):
+    # Most of `count` chunks whose whole reduction tree fits in `remaining` calls
+    best = 1
+    for leaves in range(2, count + 1):
+        if _tree_calls(leaves, fan_in) > remaining:
+            break
+        best = leaves
+    return best
+
+
+def mapreduce_summarize(text, service, model_name='', max_length=60, min_length=30,
+                        map_max_length=None, map_min_length=None, max_tokens=None,
+                        max_calls=MAX_CALLS, cache=None):
+    """
+    Summarize a long document hierarchically.
+    The text is chunked to the model's input size and every chunk is
+    summarized at once (the service batches them); the joined chunk summaries
+    become the next level's text. This repeats until the text fits one chunk,
+    which gets the final summary, so the number of sequential rounds grows
+    with log(length).
+    Args:
+        text: Document to summarize
+        service: SummarizationService running the model
+        model_name: Part of the cache key; use the service's model name
+        max_length, min_length: Length of the final summary in tokens
+        map_max_length, map_min_length: Length of intermediate chunk summaries
+            (default to the final lengths)
+        max_tokens: Chunk size limit; defaults to the model's input limit
+        max_calls: Most chunk summaries for the whole document, cached ones
+            included, so the result does not depend on what is cached. When a
+            level's reduction tree (this level plus every level above it) needs
+            more than what is left, an evenly spread subset including the lead
+            is summarized, sized so the levels above still fit; if not even two
+            chunks fit, the lead chunk is summarized as the final one.
+        cache: SummaryCache for chunk summaries, or None to disable caching
+    Returns:
+        MapReduceResult
+    """
+    map_settings = {'max_length': map_max_length or max_length,
+                    'min_length': map_min_length or min_length, 'do_sample': False}
+    final_settings = {'max_length': max_length, 'min_length': min_length, 'do_sample': False}
+    calls = cache_hits = levels = 0
+    # Intermediate summaries (plus a joining space) that fit in one chunk of the next level
+    fan_in = max(2, token_budget(service.tokenizer, max_tokens) // (map_settings['max_length'] + 1))
+
+    while True:
+        chunks = chunk_texts([text], service.tokenizer, max_tokens=max_tokens)[0]
+        if not chunks:
+            return MapReduceResult('', levels, calls, cache_hits)
+        final = len(chunks) == 1
+        if not final:
+            count = _affordable_chunks(len(chunks), max_calls - calls - cache_hits, fan_in)
+            if count == 1:
+                # No budget for another round: the lead chunk gets the final summary
+                chunks, final = chunks[:1], True
+            else:
+                chunks = _spread(chunks, count)
+        settings = final_settings if final else map_settings
+        levels += 1
+
+        # Cached chunk summaries are reused; the rest are all queued at once
+        keys = [SummaryCache.key(model_name, settings, chunk.text) for chunk in chunks]
+        summaries = {}
+        futures = {}
+        for key, chunk in zip(keys, chunks):
+            if key in summaries or key in futures:
+                continue
+            cached = cache.get(key) if cache is not None else None
+            if cached is not None:
+                summaries[key] = cached
+                cache_hits += 1
+            else:
+                futures[key] = service.submit(chunk.text, token_count=chunk.tokens, **settings)
+        new_summaries = {key: future.result() for key, future in futures.items()}
+        calls += len(new_summaries)
+        if cache is not None and new_summaries:
+            cache.put_many(new_summaries)
+        summaries.update(new_summaries)
+
+        level_summaries = [summaries[key] for key in keys]
+        if final:
+            return MapReduceResult(level_summaries[0], levels, calls, cache_hits)
+        text = ' '.join(level_summaries)
@@ -1,30 +1,43 @@
-import json
-from transformers import pipeline
+import os
+import sys
 
-def load_articles(json_file):
-    with open(json_file, 'r') as file:
-        articles = json.load(file)
-    return articles
+# Shared crawler modules live in the repository root
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from article_store import iter_articles
+from chunking import chunk_texts, length_buckets
+from summarization_service import PIPELINE_DEFAULT_MODEL, get_service
 
-def summarize_article(text, chunk_size=1000):
-    summarizer = pipeline('summarization')
-    summaries = []
-    
-    # Split text into chunks
-    for i in range(0, len(text), chunk_size):
-        chunk = text[i:i+chunk_size]
-        summary = summarizer(chunk, max_length=60, min_length=40, do_sample=False)
-        summaries.append(summary[0]['summary_text'])
-    
-    return summaries
+def load_articles(source):
+    # Lazily yields articles from JSONL parts, a directory, or a legacy .json file,
+    # once per link
+    return iter_articles(source, unique=True)
+
+def submit_chunks(chunks, service):
+    # Queue chunks with the shared summarization service; returns their futures
+    return [service.submit(chunk.text, token_count=chunk.tokens, max_length=60, min_length=40, do_sample=False)
+            for chunk in chunks]
+
+def summarize_article(text, max_tokens=None, service=None):
+    # The model is loaded once per process and chunks are batched with other callers';
+    # chunks follow sentence boundaries and are sized in model tokens
+    service = service or get_service(PIPELINE_DEFAULT_MODEL)
+    chunks = chunk_texts([text], service.tokenizer, max_tokens=max_tokens)[0]
+    return [future.result() for future in submit_chunks(chunks, service)]
 
 if __name__ == "__main__":
-    json_file = "./articles.json"
-    articles = load_articles(json_file)
+    # cluster/feed.py output (articles with 'content'); pass another file or glob to override
+    articles = list(load_articles(sys.argv[1] if len(sys.argv) > 1 else "feed_articles-*.jsonl*"))
+    service = get_service(PIPELINE_DEFAULT_MODEL)
+    
+    # Chunk every article in one tokenizer pass and queue the chunks shortest first,
+    # so chunks of similar length from different articles share batches
+    chunks = chunk_texts([article['content'] for article in articles], service.tokenizer)
+    futures = {}
+    for bucket in length_buckets(chunks):
+        for chunk, future in zip(bucket, submit_chunks(bucket, service)):
+            futures[chunk.doc, chunk.index] = future
     
-    for i, article in enumerate(articles):
+    for i, article_chunks in enumerate(chunks):
         print(f"\nSummarizing article {i+1}...")
-        text = article['content']
-        summaries = summarize_article(text)
+        summaries = [futures[chunk.doc, chunk.index].result() for chunk in article_chunks]
         print(f"Summaries: {summaries}")
-
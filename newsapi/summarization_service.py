@@ -0,0 +1,203 @@
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+
+from transformers import pipeline
+
+DEFAULT_MODEL = "facebook/bart-large-cnn"
+PIPELINE_DEFAULT_MODEL = "sshleifer/distilbart-cnn-12-6"  # What pipeline("summarization") loads with no model
+MAX_BATCH_SIZE = 16        # Requests per model call at most
+MAX_BATCH_TOKENS = 8192    # ... and at most this many (padded) input tokens
+MAX_WAIT = 0.05            # Seconds a request may wait for its batch to fill up
+BUCKET_WIDTH = 128         # Inputs are batched with others of similar token length
+
+
+class _Request:
+    __slots__ = ('text', 'length', 'future', 'enqueued_at')
+
+    def __init__(self, text, length):
+        self.text = text
+        self.length = length
+        self.future = Future()
+        self.enqueued_at = time.monotonic()
+
+
+class SummarizationService:
+    def __init__(self, model_name=DEFAULT_MODEL, summarizer=None, max_batch_size=MAX_BATCH_SIZE,
+                 max_batch_tokens=MAX_BATCH_TOKENS, max_wait=MAX_WAIT, bucket_width=BUCKET_WIDTH):
+        """
+        Long-lived summarization model that batches requests from many callers.
+        submit() returns a Future right away; a background thread groups pending
+        requests by generation settings and input length, and runs a batch as
+        soon as it is full or its oldest request has waited `max_wait` seconds.
+        Args:
+            model_name: Hugging Face summarization model, loaded once
+            summarizer: An already loaded summarization pipeline to use instead
+            max_batch_size: Most requests per model call
+            max_batch_tokens: Most padded input tokens per model call
+            max_wait: Seconds a request may wait for its batch to fill up
+            bucket_width: Token length range of one batching bucket
+        """
+        self.model_name = model_name
+        self.summarizer = summarizer or pipeline("summarization", model=model_name)
+        self.tokenizer = getattr(self.summarizer, 'tokenizer', None)
+        self.max_input_tokens = getattr(self.tokenizer, 'model_max_length', 1024)
+        if self.max_input_tokens > 100000:  # Tokenizers without a limit report a huge sentinel
+            self.max_input_tokens = 1024
+        self.max_batch_size = max_batch_size
+        self.max_batch_tokens = max_batch_tokens
+        self.max_wait = max_wait
+        self.bucket_width = bucket_width
+
+        # (generation settings, length bucket) -> pending requests, oldest first
+        self.pending = {}
+        self.condition = threading.Condition()
+        self.closed = False
+        self.batches = 0
+        self.in_flight = []  # Requests taken off the queue by the worker and not yet answered
+        self.worker = threading.Thread(target=self._run, name='summarization-service', daemon=True)
+        self.worker.start()
+
+    def token_length(self, text):
+        """Input length in model tokens (words if the pipeline has no tokenizer), capped at the model limit."""
+        if self.tokenizer is None:
+            return len(text.split())
+        return min(len(self.tokenizer(text, truncation=False)['input_ids']), self.max_input_tokens)
+
+    def submit(self, text, token_count=None, **generate_kwargs):
+        """
+        Queue `text` for summarization; the Future resolves to the summary string.
+        Pass `token_count` when the caller already tokenized the text (e.g. a Chunk).
+        """
+        length = self.token_length(text) if token_count is None else min(token_count, self.max_input_tokens)
+        request = _Request(text, length)
+        key = (tuple(sorted(generate_kwargs.items())), request.length // self.bucket_width)
+        with self.condition:
+            if self.closed:
+                raise RuntimeError("SummarizationService is closed")
+            if not self.worker.is_alive():
+                raise RuntimeError("SummarizationService worker thread has stopped")
+            self.pending.setdefault(key, deque()).append(request)
+            self.condition.notify()
+        return request.future
+
+    def summarize_many(self, texts, **generate_kwargs):
+        """Summaries of all `texts`, submitted together so they share batches."""
+        futures = [self.submit(text, **generate_kwargs) for text in texts]
+        return [future.result() for future in futures]
+
+    def _take_batch(self, queue):
+        # Longest input in the bucket sets the padded size of every row
+        batch = []
+        longest = 0
+        while queue and len(batch) < self.max_batch_size:
+            longest = max(longest, queue[0].length)
+            if batch and longest * (len(batch) + 1) > self.max_batch_tokens:
+                break
+            batch.append(queue.popleft())
+        return batch
+
+    def _next_batch(self):
+        """Block until some bucket is full or past its deadline; None once closed and drained."""
+        with self.condition:
+            while True:
+                now = time.monotonic()
+                next_deadline = None
+                for key, queue in sorted(self.pending.items(), key=lambda item: item[1][0].enqueued_at):
+                    deadline = queue[0].enqueued_at + self.max_wait
+                    full = len(queue) >= self.max_batch_size or \
+                        queue[0].length * len(queue) >= self.max_batch_tokens
+                    if full or deadline <= now or self.closed:
+                        batch = self._take_batch(queue)
+                        if not queue:
+                            del self.pending[key]
+                        return key[0], batch
+                    next_deadline = deadline if next_deadline is None else min(next_deadline, deadline)
+                if self.closed:
+                    return None
+                self.condition.wait(None if next_deadline is None else next_deadline - now)
+
+    def _run(self):
+        try:
+            self._serve()
+        except BaseException as e:
+            # Nothing will run the queued requests any more: fail them instead of leaving callers hanging
+            with self.condition:
+                self.closed = True
+                pending, self.pending = self.pending, {}
+            for request in self.in_flight:
+                if not request.future.done():
+                    request.future.set_exception(e)
+            for queue in pending.values():
+                for request in queue:
+                    if request.future.set_running_or_notify_cancel():
+                        request.future.set_exception(e)
+            raise
+
+    def _serve(self):
+        while True:
+            item = self._next_batch()
+            if item is None:
+                return
+            settings, batch = item
+            batch = [request for request in batch if request.future.set_running_or_notify_cancel()]
+            self.in_flight = batch
+            if not batch:
+                continue
+            if self._dispatch(settings, batch) or len(batch) == 1:
+                continue
+            # Retry a failed batch one request at a time so one bad input only fails its own future
+            for request in batch:
+                self._dispatch(settings, [request])
+
+    def _dispatch(self, settings, batch):
+        """Run one model call; returns False if it failed (a lone request gets the exception)."""
+        try:
+            outputs = self.summarizer([request.text for request in batch], batch_size=len(batch),
+                                      truncation=True, **dict(settings))
+            summaries = [output['summary_text'] for output in outputs]
+            if len(summaries) != len(batch):
+                raise RuntimeError(f"Summarizer returned {len(summaries)} outputs for {len(batch)} inputs")
+        except Exception as e:
+            if len(batch) == 1:
+                batch[0].future.set_exception(e)
+            return False
+        self.batches += 1
+        for request, summary in zip(batch, summaries):
+            request.future.set_result(summary)
+        return True
+
+    def close(self):
+        """Finish the queued requests and stop the worker thread."""
+        with self.condition:
+            self.closed = True
+            self.condition.notify()
+        self.worker.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+_services = {}
+_services_lock = threading.Lock()
+
+
+def get_service(model_name=DEFAULT_MODEL, **kwargs):
+    """
+    The process-wide service for `model_name`, started on first use (and again if
+    it was closed). Raises ValueError if `kwargs` differ from the running service's.
+    """
+    with _services_lock:
+        service, service_kwargs = _services.get(model_name, (None, None))
+        if service is not None and not service.closed and service.worker.is_alive():
+            if kwargs and kwargs != service_kwargs:
+                raise ValueError(f"Summarization service for {model_name} is already running with "
+                                 f"{service_kwargs}, not {kwargs}")
+            return service
+        service = SummarizationService(model_name, **kwargs)
+        _services[model_name] = (service, kwargs)
+        return service
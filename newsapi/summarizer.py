@@ -1,59 +1,32 @@
-import nltk
-from transformers import pipeline
+from chunking import chunk_text
+from summarization_service import PIPELINE_DEFAULT_MODEL, get_service
 
-# Download the necessary NLTK data
-nltk.download('punkt')
-nltk.download('punkt_tab')
+def submit_text(text, service):
+    return service.submit(text, max_length=130, min_length=30, do_sample=False)
 
-def split_into_paragraphs(text):
-    return text.split('\n\n')
-
-def split_into_chunks(text, max_length=1024):
-    sentences = nltk.tokenize.sent_tokenize(text)
-    chunks = []
-    current_chunk = []
-    current_length = 0
-
-    for sentence in sentences:
-        sentence_length = len(nltk.tokenize.word_tokenize(sentence))
-        if current_length + sentence_length <= max_length:
-            current_chunk.append(sentence)
-            current_length += sentence_length
-        else:
-            chunks.append(' '.join(current_chunk))
-            current_chunk = [sentence]
-            current_length = sentence_length
-
-    if current_chunk:
-        chunks.append(' '.join(current_chunk))
-
-    return chunks
-
-def summarize_text(text, summarizer):
+def summarize_text(text, future):
     try:
-        summary = summarizer(text, max_length=130, min_length=30, do_sample=False)
-        return summary[0]['summary_text']
+        return future.result()
     except Exception as e:
-        return text  # Return the original text if an error occurs
+        # Keep the chunk's original text so the output stays complete, but say so
+        print(f"Failed to summarize a chunk, keeping its original text: {e!r}")
+        return text
 
 def main():
-    # Initialize the summarizer
-    summarizer = pipeline("summarization")
+    # The process-wide summarizer; loads the model once and batches chunk requests
+    service = get_service(PIPELINE_DEFAULT_MODEL)
 
     # Read the long text from a file
     with open('long_text.txt', 'r') as file:
         long_text = file.read()
 
-    # Split the text into paragraphs
-    paragraphs = split_into_paragraphs(long_text)
-
-    # Split paragraphs into smaller chunks
-    chunks = []
-    for paragraph in paragraphs:
-        chunks.extend(split_into_chunks(paragraph))
+    # Pack sentences into chunks across paragraph boundaries, so short paragraphs
+    # share a chunk instead of each becoming its own small model call
+    chunks = chunk_text(long_text, service.tokenizer)
 
-    # Summarize each chunk
-    summarized_chunks = [summarize_text(chunk, summarizer) for chunk in chunks]
+    # Summarize each chunk; all are queued first so they run in batches
+    futures = [submit_text(chunk, service) for chunk in chunks]
+    summarized_chunks = [summarize_text(chunk, future) for chunk, future in zip(chunks, futures)]
 
     # Combine the summarized chunks
     summarized_text = '\n\n'.join(summarized_chunks)
@@ -1,17 +1,16 @@
-import json
 from transformers import pipeline
+from article_store import iter_articles
 
-# Load the JSON file
-with open('articles.json', 'r') as file:
-    data = json.load(file)
+# Stream articles lazily from test2's JSONL sink, once per link across runs
+data = iter_articles('aajtak_articles-*.jsonl*', unique=True)
 
 # Load the question-answering pipeline
 qa_pipeline = pipeline("question-answering", model="distilbert-base-cased-distilled-squad")
 
 # Iterate over each article and process the context
 for article in data:
-    # Combine 'description' and 'full_text' for context
-    context = f"{article['description']} {article['full_text']}"
+    # Combine 'description' and 'text' for context
+    context = f"{article['description']} {article['text']}"
     
     print(f"\nTitle: {article['title']}")
     print(f"Link: {article['link']}")
@@ -0,0 +1,268 @@
+import asyncio
+import random
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from email.utils import parsedate_to_datetime
+from urllib import robotparser
+from urllib.parse import urlsplit
+
+import requests
+
+USER_AGENT = 'vishalstuff-crawler/1.0'
+DEFAULT_RATE = 2.0          # Requests per second per host
+DEFAULT_BURST = 4           # Requests a host may receive back to back after being idle
+ROBOTS_TTL = 24 * 3600      # Seconds a fetched robots.txt is trusted
+ROBOTS_ERROR_TTL = 600      # Retry an unreachable robots.txt after this many seconds
+BACKOFF_BASE = 2.0          # First backoff after a throttled/failed request, in seconds
+MAX_BACKOFF = 600           # Cap on a single backoff, in seconds
+MAX_RETRIES = 3             # Retries of a throttled/failed request before giving up
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+class DisallowedByRobots(requests.RequestException):
+    """Raised by polite_get for URLs the host's robots.txt does not allow."""
+
+
+def _host(url):
+    parts = urlsplit(url)
+    return f"{parts.scheme}://{parts.netloc}".lower()
+
+
+def parse_retry_after(value):
+    """Seconds to wait from a Retry-After header (delta-seconds or HTTP date), or None."""
+    if not value:
+        return None
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        return max(parsedate_to_datetime(value).timestamp() - time.time(), 0.0)
+    except (TypeError, ValueError):
+        return None
+
+
+class Politeness:
+    def __init__(self, db_path='politeness.db', user_agent=USER_AGENT, rate=DEFAULT_RATE,
+                 burst=DEFAULT_BURST, robots_ttl=ROBOTS_TTL, max_backoff=MAX_BACKOFF):
+        """
+        Per-host crawl etiquette shared by every fetcher, thread and process that
+        opens the same database: cached robots.txt rules, a token bucket per host
+        (slowed further by Crawl-delay), and backoff after 429/5xx responses that
+        honours Retry-After.
+        Args:
+            db_path: SQLite file holding robots.txt bodies and per-host bucket state
+            user_agent: Agent name matched against robots.txt rules
+            rate: Sustained requests per second per host
+            burst: Requests allowed back to back before the rate applies
+            robots_ttl: Seconds before robots.txt is fetched again
+            max_backoff: Upper bound on a single backoff in seconds
+        """
+        self.db_path = db_path
+        self.user_agent = user_agent
+        self.rate = rate
+        self.burst = burst
+        self.robots_ttl = robots_ttl
+        self.max_backoff = max_backoff
+        self._local = threading.local()
+        self._robots = {}   # host -> (expires_at, RobotFileParser) parsed in this process
+        self._robots_lock = threading.Lock()
+        self._host_locks = {}  # host -> Lock, so one thread fetches a host's robots.txt
+        with self._transaction() as conn:
+            conn.execute('''CREATE TABLE IF NOT EXISTS hosts (
+                host TEXT PRIMARY KEY,
+                tat REAL NOT NULL DEFAULT 0,
+                blocked_until REAL NOT NULL DEFAULT 0,
+                failures INTEGER NOT NULL DEFAULT 0,
+                crawl_delay REAL NOT NULL DEFAULT 0
+            )''')
+            conn.execute('''CREATE TABLE IF NOT EXISTS robots (
+                host TEXT PRIMARY KEY,
+                body TEXT,
+                status INTEGER,
+                fetched_at REAL NOT NULL
+            )''')
+
+    def _conn(self):
+        # One connection per thread; processes coordinate through SQLite's file locks
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+        return conn
+
+    @contextmanager
+    def _transaction(self):
+        conn = self._conn()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            yield conn
+            conn.execute('COMMIT')
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+
+    # robots.txt
+
+    def _cached_robots(self, host):
+        with self._robots_lock:
+            cached = self._robots.get(host)
+        if cached and time.time() < cached[0]:
+            return cached[1]
+        return None
+
+    def _load_robots(self, host):
+        """robots.txt for a host, from this process, the shared table, or the network."""
+        parser = self._cached_robots(host)
+        if parser is not None:
+            return parser
+        with self._robots_lock:
+            host_lock = self._host_locks.setdefault(host, threading.Lock())
+        with host_lock:
+            # Another thread may have loaded it while this one waited
+            return self._cached_robots(host) or self._fetch_robots(host)
+
+    def _fetch_robots(self, host):
+        now = time.time()
+        row = self._conn().execute('SELECT body, status, fetched_at FROM robots WHERE host = ?',
+                                   (host,)).fetchone()
+        if row is None or now - row[2] >= self._robots_ttl(row[1]):
+            try:
+                response = requests.get(host + '/robots.txt', timeout=15,
+                                        headers={'User-Agent': self.user_agent})
+                body, status = response.text, response.status_code
+            except requests.RequestException as e:
+                print(f"Failed to fetch {host}/robots.txt: {e}")
+                body, status = None, None
+            with self._transaction() as conn:
+                conn.execute('INSERT OR REPLACE INTO robots (host, body, status, fetched_at) VALUES (?, ?, ?, ?)',
+                             (host, body, status, now))
+            row = (body, status, now)
+
+        body, status, fetched_at = row
+        parser = robotparser.RobotFileParser()
+        delay = 0
+        if status is None or status >= 500:
+            # Unreachable robots.txt: assume nothing is allowed until it can be read
+            parser.disallow_all = True
+        elif status >= 400:
+            # No robots.txt: everything is allowed
+            parser.allow_all = True
+        else:
+            parser.parse(body.splitlines())
+            delay = parser.crawl_delay(self.user_agent) or 0
+        # Written even when there is none, so a Crawl-delay dropped from robots.txt stops applying
+        with self._transaction() as conn:
+            conn.execute('INSERT OR IGNORE INTO hosts (host) VALUES (?)', (host,))
+            conn.execute('UPDATE hosts SET crawl_delay = ? WHERE host = ?', (float(delay), host))
+        with self._robots_lock:
+            self._robots[host] = (fetched_at + self._robots_ttl(status), parser)
+        return parser
+
+    def _robots_ttl(self, status):
+        return self.robots_ttl if status is not None and status < 500 else ROBOTS_ERROR_TTL
+
+    def allowed(self, url):
+        """Whether robots.txt lets this crawler fetch `url` (fetches robots.txt if needed)."""
+        return self._load_robots(_host(url)).can_fetch(self.user_agent, url)
+
+    async def allowed_async(self, url):
+        parser = self._cached_robots(_host(url))
+        if parser is not None:
+            return parser.can_fetch(self.user_agent, url)
+        # Only the first lookup for a host does blocking I/O, so only it leaves the loop
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, self.allowed, url)
+
+    # Rate limiting
+
+    def reserve(self, url):
+        """
+        Claim the host's next request slot and return how long to wait for it.
+        The bucket is kept as a theoretical arrival time (GCRA), so every caller gets
+        its own slot in one atomic update, whichever thread or process it runs in.
+        """
+        host = _host(url)
+        now = time.time()
+        with self._transaction() as conn:
+            conn.execute('INSERT OR IGNORE INTO hosts (host) VALUES (?)', (host,))
+            tat, blocked_until, crawl_delay = conn.execute(
+                'SELECT tat, blocked_until, crawl_delay FROM hosts WHERE host = ?', (host,)).fetchone()
+            interval = max(1.0 / self.rate, crawl_delay)
+            # Crawl-delay asks for spacing between every request, so it allows no burst
+            burst = 1 if crawl_delay else self.burst
+            start = max(now, blocked_until)
+            tat = max(tat, start) + interval
+            slot = max(start, tat - burst * interval)
+            conn.execute('UPDATE hosts SET tat = ? WHERE host = ?', (tat, host))
+        return slot - now
+
+    def wait(self, url):
+        delay = self.reserve(url)
+        if delay > 0:
+            time.sleep(delay)
+
+    async def wait_async(self, url):
+        # reserve() can block on another process's write lock, so it runs off the event loop
+        loop = asyncio.get_running_loop()
+        delay = await loop.run_in_executor(None, self.reserve, url)
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    def record(self, url, status, headers=None):
+        """
+        Feed back a response (status None for a network error). Throttling and
+        server errors block the host for Retry-After or an exponential backoff with
+        jitter; a success resets the backoff. Returns True if the request is worth retrying.
+        """
+        host = _host(url)
+        if status is not None and status not in RETRY_STATUSES:
+            # Most successes follow successes, so the write lock is only taken to clear a backoff
+            row = self._conn().execute('SELECT failures FROM hosts WHERE host = ?', (host,)).fetchone()
+            if row and row[0]:
+                with self._transaction() as conn:
+                    conn.execute('UPDATE hosts SET failures = 0 WHERE host = ? AND failures > 0', (host,))
+            return False
+
+        retry_after = parse_retry_after((headers or {}).get('Retry-After'))
+        with self._transaction() as conn:
+            conn.execute('INSERT OR IGNORE INTO hosts (host) VALUES (?)', (host,))
+            failures, blocked_until = conn.execute(
+                'SELECT failures, blocked_until FROM hosts WHERE host = ?', (host,)).fetchone()
+            # Full jitter keeps workers that were throttled together from retrying together
+            backoff = random.uniform(0.5, 1.0) * min(self.max_backoff, BACKOFF_BASE * 2 ** failures)
+            delay = max(backoff, retry_after or 0)
+            conn.execute('UPDATE hosts SET failures = ?, blocked_until = ? WHERE host = ?',
+                         (failures + 1, max(blocked_until, time.time() + delay), host))
+        print(f"Backing off {host} for {delay:.1f}s after status {status}")
+        return True
+
+    async def record_async(self, url, status, headers=None):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, self.record, url, status, headers)
+
+
+def polite_get(url, politeness, session=None, max_retries=MAX_RETRIES, **kwargs):
+    """
+    requests GET that checks robots.txt, waits for the host's rate limit and retries
+    throttled or failed requests after backing off. Raises DisallowedByRobots for
+    URLs robots.txt does not allow; network errors on the last attempt are re-raised.
+    """
+    if not politeness.allowed(url):
+        raise DisallowedByRobots(f"Disallowed by robots.txt: {url}")
+    headers = {'User-Agent': politeness.user_agent, **(kwargs.pop('headers', None) or {})}
+    for attempt in range(max_retries + 1):
+        politeness.wait(url)
+        try:
+            response = (session or requests).get(url, headers=headers, **kwargs)
+        except requests.RequestException:
+            if not politeness.record(url, None) or attempt == max_retries:
+                raise
+            continue
+        if not politeness.record(url, response.status_code, response.headers) or attempt == max_retries:
+            return response
+        response.close()
@@ -0,0 +1,77 @@
+from urllib.parse import urlparse
+from extractor import ARTICLE_FIELDS, ArticleExtractor, Field
+
+# Per-domain extraction profiles. Each profile lists the same fields so callers get a
+# uniform dict whatever the source; selectors are tried in priority order and the
+# OpenGraph / article meta tags act as fallbacks when a site changes its markup.
+# A missing author is left as None so each caller picks its own placeholder.
+
+def _article_fields(title, author, text, published_date, image_link):
+    return [
+        Field('title', title + ['meta[property=og:title]@content']),
+        Field('author', author + ['meta[name=author]@content']),
+        Field('description', ['meta[name=description]@content', 'meta[property=og:description]@content']),
+        Field('text', text, multiple=True, separator='\n'),
+        Field('published_date', published_date + ['meta[property=article:published_time]@content']),
+        Field('image_link', image_link + ['meta[property=og:image]@content']),
+    ]
+
+PROFILES = {
+    'aajtak.in': _article_fields(
+        title=['h1.headline', 'h1'],
+        author=['.author_name', 'span.author-name', 'span.author'],
+        text=['div.story-with-main-sec p', 'div.article-body p', 'p'],
+        published_date=['time@datetime', 'time.publish-date@datetime'],
+        image_link=['img.featured-image@src']
+    ),
+    'ndtv.com': _article_fields(
+        title=['h1.sp-ttl', 'h1'],
+        author=['span.pst-by_lnk', 'a.pst-by_lnk'],
+        text=['div.sp-cn p', 'div.Art-exp_wr p'],
+        published_date=['meta[name=publish-date]@content', 'span.pst-by_lnk time@datetime'],
+        image_link=['div.ins_instory_dv_cont img@src']
+    ),
+    'thehindu.com': _article_fields(
+        title=['h1.title', 'h1'],
+        author=['a.person-name', 'div.author-name'],
+        text=['div.articlebodycontent p', 'div#content-body p'],
+        published_date=['meta[name=publish-date]@content', 'p.publish-time@datetime'],
+        image_link=['div.picture img@src']
+    ),
+    'news18.com': _article_fields(
+        title=['h1.article_heading', 'h1'],
+        author=['div.article_byline a', 'span.author'],
+        text=['div.article_content p', 'div#article_body p'],
+        published_date=['meta[itemprop=datePublished]@content', 'time@datetime'],
+        image_link=['div.article_limg img@src']
+    ),
+}
+
+# Selectors are compiled once, at import time, for every profile
+EXTRACTORS = {domain: ArticleExtractor(fields) for domain, fields in PROFILES.items()}
+DEFAULT_EXTRACTOR = ArticleExtractor(
+    field._replace(default=None) if field.name == 'author' else field for field in ARTICLE_FIELDS
+)
+
+
+def extractor_for_url(url):
+    """
+    Pick the extraction profile for a URL by its host.
+    www./m./amp. prefixes and other subdomains fall back to the registered parent
+    domain; hosts without a profile get the generic extractor.
+    """
+    host = urlparse(url).hostname or ''
+    while host:
+        extractor = EXTRACTORS.get(host)
+        if extractor is not None:
+            return extractor
+        _, _, host = host.partition('.')
+    return DEFAULT_EXTRACTOR
+
+
+def extract_for_url(url, html, encoding=None):
+    """
+    Extract the standard article fields from a page using the profile for its host.
+    `encoding` is the charset from the HTTP Content-Type, if any.
+    """
+    return extractor_for_url(url).extract(html, encoding)
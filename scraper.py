@@ -1,24 +1,89 @@
 import requests
-import xml.etree.ElementTree as ET
+import socket
+import os
+import threading
 from bs4 import BeautifulSoup
 from datetime import datetime
+from fetcher import fetch_many, fetch_one
+from http_cache import HTTPCache, cached_get
+from crawl_state import CrawlState
+from sitemap_stream import iter_sitemap
+from profiles import extract_for_url
+from extractor import charset_from_headers
+from politeness import Politeness
 
-def get_scraping_task():
-    """Request scraping task from the central system."""
-    response = requests.get('http://localhost:5000/get_scraping_task')  # Change URL to your central system
+CENTRAL_URL = 'http://localhost:5000'  # Change URL to your central system
+WORKER_ID = f"{socket.gethostname()}-{os.getpid()}"
+VISIBILITY_TIMEOUT = 300  # Seconds a lease lasts without a heartbeat
+
+# Validators from earlier runs, so unchanged feeds, sitemaps and articles come back as 304
+http_cache = HTTPCache()
+
+# Per-URL lastmod / content hash from earlier runs, so unchanged articles are never refetched
+crawl_state = CrawlState()
+
+# robots.txt, per-host rate limits and backoff, shared with every other worker on this machine
+politeness = Politeness()
+
+def checkout_scraping_tasks(batch_size=10, visibility_timeout=VISIBILITY_TIMEOUT):
+    """Lease a batch of scraping tasks from the central system."""
+    response = requests.post(f'{CENTRAL_URL}/tasks/checkout', json={
+        'worker_id': WORKER_ID,
+        'batch_size': batch_size,
+        'visibility_timeout': visibility_timeout
+    })
     if response.status_code == 200:
-        return response.json()
+        return response.json()['tasks']
     else:
-        print("Error fetching scraping task.")
-        return None
+        print("Error fetching scraping tasks.")
+        return []
+
+def extend_scraping_tasks(task_ids, visibility_timeout=VISIBILITY_TIMEOUT):
+    """Heartbeat: extend the leases of tasks this worker has not finished yet."""
+    if not task_ids:
+        return
+    try:
+        response = requests.post(f'{CENTRAL_URL}/tasks/extend', json={
+            'worker_id': WORKER_ID,
+            'task_ids': task_ids,
+            'visibility_timeout': visibility_timeout
+        })
+    except requests.RequestException as e:
+        print(f"Error extending leases for tasks {task_ids}: {e}")
+        return
+    if response.status_code != 200:
+        print(f"Error extending leases for tasks {task_ids}.")
+
+def settle_scraping_tasks(task_ids, success):
+    """Ack finished tasks or nack failed ones so the central system can re-queue them."""
+    if not task_ids:
+        return
+    endpoint = 'ack' if success else 'nack'
+    response = requests.post(f'{CENTRAL_URL}/tasks/{endpoint}', json={
+        'worker_id': WORKER_ID,
+        'task_ids': task_ids
+    })
+    if response.status_code != 200:
+        print(f"Error sending {endpoint} for tasks {task_ids}.")
 
 def scrape_rss_feed(url):
     """Scrape RSS feed and extract title, link, description, author, publish date, and full text."""
     print(f"Scraping RSS feed from {url}")
-    response = requests.get(url)
-    if response.status_code == 200:
+    response = cached_get(url, cache=http_cache, politeness=politeness)
+    if response.not_modified:
+        print(f"RSS feed unchanged since last run: {url}")
+        return True
+    if response.status == 200:
         soup = BeautifulSoup(response.content, 'xml')
         items = soup.find_all('item')
+        links = [item.find('link').text for item in items if item.find('link')]
+
+        # Fetch every linked article concurrently instead of one at a time. No conditional
+        # requests here: nothing is kept between runs, so a 304 would leave no full text
+        full_texts = {}
+        for result in fetch_many(links, politeness=politeness):
+            full_texts[result.url] = handle_article_response(result)
+
         for item in items:
             title = item.find('title').text if item.find('title') else None
             link = item.find('link').text if item.find('link') else None
@@ -27,9 +92,7 @@ def scrape_rss_feed(url):
             pub_date = item.find('pubDate').text if item.find('pubDate') else None
 
             # Extract full text from the linked article if necessary
-            full_text = None
-            if link:
-                full_text = scrape_article_details(link)
+            full_text = full_texts.get(link) if link else None
 
             # Print out or store the extracted information
             print(f"Title: {title}")
@@ -39,66 +102,121 @@ def scrape_rss_feed(url):
             print(f"Published on: {pub_date}")
             print(f"Full Text: {full_text}")
             print('-' * 50)
+        # Only now is a 304 for this feed safe to treat as "nothing new"
+        response.commit()
+        return True
     else:
         print(f"Failed to retrieve the RSS feed from {url}")
+        return False
 
 def scrape_sitemap(url):
     """Scrape sitemap.xml and extract all URLs."""
     print(f"Scraping sitemap from {url}")
-    response = requests.get(url)
-    if response.status_code == 200:
-        tree = ET.ElementTree(ET.fromstring(response.content))
-        root = tree.getroot()
-        for url in root.findall('.//url/loc'):
-            article_url = url.text
+    lastmods = {}
+    # Sitemap validators, saved only after every listed article was handled
+    sitemaps = []
+
+    def article_urls():
+        for article_url, lastmod in iter_sitemap(url, cache=http_cache, politeness=politeness, deferred=sitemaps):
+            # Skip articles whose <lastmod> has not moved since they were last scraped
+            if not crawl_state.should_fetch(article_url, lastmod):
+                continue
             print(f"Found URL: {article_url}")
-            scrape_article_details(article_url)
+            lastmods[article_url] = lastmod
+            yield article_url
+
+    def handle(result):
+        lastmod = lastmods.pop(result.url, None)
+        details = handle_article_response(result)
+        if details:
+            crawl_state.record(result.url, details['full_text'], lastmod)
+            # Validators are saved only once the article is recorded
+            result.commit()
+        elif result.status == 304:
+            crawl_state.mark_unchanged(result.url, lastmod)
+
+    # The sitemap is streamed and the fetch engine pulls URLs lazily, so articles are
+    # fetched (and parsed as each response arrives) while the sitemap is still being read
+    try:
+        # Validators are only sent for articles with a crawl_state row; a 304 for any
+        # other article (e.g. after a crash before recording it) could never be parsed
+        fetch_many(article_urls(), handle=handle, cache=http_cache, politeness=politeness,
+                   conditional=lambda article_url: crawl_state.get(article_url) is not None)
+        for sitemap in sitemaps:
+            sitemap.commit()
+        return True
+    except requests.RequestException as e:
+        print(f"Failed to retrieve the sitemap from {url}: {e}")
+        return False
+
+def parse_article_details(url, content, encoding=None):
+    """Extract full text, author and publish date from an article page."""
+    # Selectors come from the extraction profile registered for the URL's host
+    article = extract_for_url(url, content, encoding)
+
+    # Return the scraped details
+    return {
+        'full_text': article['text'] or 'No full text available',
+        'author': article['author'] or 'Unknown Author',
+        'publish_date': article['published_date'] or 'Unknown Date'
+    }
+
+def handle_article_response(result):
+    """Turn a FetchResult from the fetch engine into article details."""
+    print(f"Scraping article details from {result.url}")
+    if result.status == 304:
+        # Unchanged since the last run, nothing to parse
+        print(f"Article unchanged since last run: {result.url}")
+        return None
+    if result.status == 200:
+        return parse_article_details(result.url, result.content, charset_from_headers(result.headers))
     else:
-        print(f"Failed to retrieve the sitemap from {url}")
+        print(f"Failed to retrieve the article from {result.url}")
+        return None
 
 def scrape_article_details(url):
     """Scrape the full details of an article: full text, author, publish date."""
-    print(f"Scraping article details from {url}")
-    response = requests.get(url)
-    if response.status_code == 200:
-        soup = BeautifulSoup(response.content, 'html.parser')
-        
-        # Example: Extracting text from the article
-        article_text = soup.find('div', class_='article-body')  # Adjust selector based on website's structure
-        full_text = article_text.text.strip() if article_text else 'No full text available'
-
-        # Example: Extracting author name (adjust the selector based on the site)
-        author = soup.find('span', class_='author-name')  # Adjust selector based on website's structure
-        author_name = author.text.strip() if author else 'Unknown Author'
-
-        # Example: Extracting publish date
-        pub_date = soup.find('time', class_='publish-date')  # Adjust selector based on website's structure
-        publish_date = pub_date['datetime'] if pub_date else 'Unknown Date'
-
-        # Return the scraped details
-        return {
-            'full_text': full_text,
-            'author': author_name,
-            'publish_date': publish_date
-        }
-    else:
-        print(f"Failed to retrieve the article from {url}")
-        return None
+    return handle_article_response(fetch_one(url, politeness=politeness))
 
-def scraper():
-    task = get_scraping_task()
-    if not task:
-        return
-    
+def run_task(task):
+    """Run one scraping task; returns True on success."""
     url = task['url']
     scrape_type = task['scrape_type']
-
-    if scrape_type == 'rss':
-        scrape_rss_feed(url)
-    elif scrape_type == 'sitemap':
-        scrape_sitemap(url)
-    else:
+    try:
+        if scrape_type == 'rss':
+            return scrape_rss_feed(url)
+        if scrape_type == 'sitemap':
+            return scrape_sitemap(url)
         print(f"Unknown scrape type: {scrape_type}")
+    except Exception as e:
+        print(f"Error running task {task['task_id']}: {e}")
+    return False
+
+def heartbeat(held, stop, visibility_timeout=VISIBILITY_TIMEOUT):
+    """Keep the leases in `held` alive until `stop` is set, well before they run out."""
+    while not stop.wait(visibility_timeout / 3):
+        # copy() is atomic, so this never races the main thread discarding finished tasks
+        extend_scraping_tasks(list(held.copy()), visibility_timeout)
+
+def scraper(batch_size=10, visibility_timeout=VISIBILITY_TIMEOUT):
+    tasks = checkout_scraping_tasks(batch_size, visibility_timeout)
+    if not tasks:
+        return
+
+    # A batch of sitemap crawls can outlast one lease, so the leases of tasks not
+    # yet run are extended in the background and each task is settled as it finishes
+    held = {task['task_id'] for task in tasks}
+    stop = threading.Event()
+    threading.Thread(target=heartbeat, args=(held, stop, visibility_timeout), daemon=True).start()
+    try:
+        for task in tasks:
+            success = run_task(task)
+            held.discard(task['task_id'])
+            settle_scraping_tasks([task['task_id']], success=success)
+    finally:
+        stop.set()
+        # Anything left (e.g. after Ctrl-C) goes straight back to the queue
+        settle_scraping_tasks(list(held), success=False)
 
 if __name__ == "__main__":
     scraper()
@@ -1,14 +1,69 @@
-from flask import Flask, jsonify
+from flask import Flask, jsonify, request
+from task_queue import TaskQueue, DEFAULT_VISIBILITY_TIMEOUT
 
 app = Flask(__name__)
 
+# Durable queue of sitemap/rss tasks shared by every worker
+task_queue = TaskQueue('tasks.db')
+
+DEFAULT_TASK = {"url": "https://www.aajtak.in/rssfeeds/sitemap.xml", "scrape_type": "sitemap"}
+
+# Seed the queue with the default sitemap task; a restart must not re-queue it
+# once it exists (finished tasks are re-queued explicitly via POST /tasks)
+task_queue.seed(DEFAULT_TASK['url'], DEFAULT_TASK['scrape_type'])
+
 @app.route('/get_scraping_task', methods=['GET'])
 def get_scraping_task():
-    # This is an example response from your central system
-    return jsonify({
-        "url": "https://www.aajtak.in/rssfeeds/sitemap.xml",
-        "scrape_type": "sitemap"
-    })
+    # Kept for older workers, which never ack: the task is handed out without a lease
+    # (so it is never retried or failed on their behalf), and there is always one
+    return jsonify(task_queue.take_unleased() or DEFAULT_TASK)
+
+@app.route('/tasks', methods=['POST'])
+def add_tasks():
+    # Accepts a list of {"url": ..., "scrape_type": "sitemap" | "rss"}
+    tasks = request.get_json(force=True)
+    for task in tasks:
+        if task.get('scrape_type') not in ('sitemap', 'rss') or not task.get('url'):
+            return jsonify({"error": f"Invalid task: {task}"}), 400
+    for task in tasks:
+        task_queue.enqueue(task['url'], task['scrape_type'])
+    return jsonify({"queued": len(tasks)})
+
+@app.route('/tasks/checkout', methods=['POST'])
+def checkout_tasks():
+    # Lease a batch of tasks to one worker in a single round trip
+    body = request.get_json(force=True)
+    tasks = task_queue.checkout(
+        body['worker_id'],
+        batch_size=int(body.get('batch_size', 1)),
+        visibility_timeout=float(body.get('visibility_timeout', DEFAULT_VISIBILITY_TIMEOUT))
+    )
+    return jsonify({"tasks": tasks})
+
+@app.route('/tasks/extend', methods=['POST'])
+def extend_tasks():
+    # Heartbeat from a worker still working through its leased tasks
+    body = request.get_json(force=True)
+    extended = task_queue.extend(
+        body['task_ids'],
+        body['worker_id'],
+        visibility_timeout=float(body.get('visibility_timeout', DEFAULT_VISIBILITY_TIMEOUT))
+    )
+    return jsonify({"extended": extended})
+
+@app.route('/tasks/ack', methods=['POST'])
+def ack_tasks():
+    body = request.get_json(force=True)
+    return jsonify({"acked": task_queue.ack(body['task_ids'], body['worker_id'])})
+
+@app.route('/tasks/nack', methods=['POST'])
+def nack_tasks():
+    body = request.get_json(force=True)
+    return jsonify({"released": task_queue.nack(body['task_ids'], body['worker_id'])})
+
+@app.route('/tasks/stats', methods=['GET'])
+def task_stats():
+    return jsonify(task_queue.stats())
 
 if __name__ == '__main__':
     app.run(debug=True)
@@ -1,36 +1,53 @@
+import os
 import requests
-import xml.etree.ElementTree as ET
+from http_cache import HTTPCache
+from sitemap_stream import iter_sitemap
+from politeness import Politeness
 
 # Function to fetch and parse sitemap XML
-def fetch_sitemap(url):
-    response = requests.get(url)
-    
-    # Check if the request was successful
-    if response.status_code == 200:
-        # Parse the XML content
-        root = ET.fromstring(response.content)
-        
-        # Find all <loc> tags in the sitemap and extract their URLs
-        urls = [url.text for url in root.findall(".//{http://www.sitemaps.org/schemas/sitemap/0.9}loc")]
-        
-        return urls
-    else:
-        print(f"Failed to fetch sitemap. HTTP Status code: {response.status_code}")
+def fetch_sitemap(url, deferred, unchanged):
+    # Stream the sitemap (following nested sitemap indexes) and yield links as they are read.
+    # Sitemaps answering 304 yield nothing and are listed in `unchanged`; validators are
+    # only saved (via `deferred`) once the links have been written out
+    try:
+        for loc, lastmod in iter_sitemap(url, cache=HTTPCache(), politeness=Politeness(),
+                                         deferred=deferred, unchanged=unchanged):
+            yield loc
+    except requests.RequestException as e:
+        print(f"Failed to fetch sitemap: {e}")
+
+def read_links(path):
+    try:
+        with open(path) as f:
+            return [line.rstrip('\n') for line in f if line.strip()]
+    except OSError:
         return []
 
 # Define the URL of the sitemap
 sitemap_url = 'https://www.aajtak.in/rssfeeds/sitemap.xml'
 
-# Call the function to fetch and parse the sitemap
-links = fetch_sitemap(sitemap_url)
-
-# Print the list of links
+# Stream links into a temp file so the saved list is only replaced once it is complete
 print("Links found in sitemap:")
-for link in links:
-    print(link)
-
-# Save the list of links to a file (optional)
-with open('sitemap_links.txt', 'w') as f:
-    for link in links:
+deferred, unchanged = [], []
+found = set()
+with open('sitemap_links.txt.tmp', 'w') as f:
+    for link in fetch_sitemap(sitemap_url, deferred, unchanged):
+        print(link)
         f.write(link + '\n')
+        found.add(link)
+
+    # Unchanged sitemaps listed nothing this run, so their links are carried over
+    # from the saved list rather than dropped
+    if unchanged:
+        for link in read_links('sitemap_links.txt'):
+            if link not in found:
+                f.write(link + '\n')
+                found.add(link)
 
+if found:
+    os.replace('sitemap_links.txt.tmp', 'sitemap_links.txt')
+    for sitemap in deferred:
+        sitemap.commit()
+else:
+    os.remove('sitemap_links.txt.tmp')
+    print("No links found, keeping the existing sitemap_links.txt.")
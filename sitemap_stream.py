@@ -0,0 +1,187 @@
+import gzip
+import io
+import xml.etree.ElementTree as ET
+from collections import deque, namedtuple
+
+import requests
+
+from http_cache import CachedResponse
+from politeness import polite_get
+
+SITEMAP_NS = '{http://www.sitemaps.org/schemas/sitemap/0.9}'
+LOC_TAGS = {SITEMAP_NS + 'loc', 'loc'}
+LASTMOD_TAGS = {SITEMAP_NS + 'lastmod', 'lastmod'}
+ENTRY_TAGS = {SITEMAP_NS + 'url': 'url', 'url': 'url',
+              SITEMAP_NS + 'sitemap': 'sitemap', 'sitemap': 'sitemap'}
+
+GZIP_MAGIC = b'\x1f\x8b'
+MAX_INDEX_BODY = 5 * 1024 * 1024  # Sitemap index bodies up to this size are kept for 304s
+
+# One <url> or <sitemap> entry; kind is 'url' for pages and 'sitemap' for nested sitemaps
+SitemapEntry = namedtuple('SitemapEntry', ['kind', 'loc', 'lastmod'])
+
+
+def parse_sitemap_stream(stream):
+    """
+    Incrementally parse a sitemap or sitemap index from a binary file-like object.
+    Entries are yielded as soon as their closing tag is read and then dropped
+    from the tree, so memory stays flat however large the document is.
+    """
+    context = ET.iterparse(stream, events=('start', 'end'))
+    _, root = next(context)
+
+    loc = lastmod = None
+    for event, elem in context:
+        if event != 'end':
+            continue
+        # Only sitemap-namespace tags count; image:loc and news:* children are skipped
+        if elem.tag in LOC_TAGS:
+            loc = (elem.text or '').strip()
+        elif elem.tag in LASTMOD_TAGS:
+            lastmod = (elem.text or '').strip() or None
+        elif elem.tag in ENTRY_TAGS:
+            if loc:
+                yield SitemapEntry(ENTRY_TAGS[elem.tag], loc, lastmod)
+            loc = lastmod = None
+            root.clear()
+
+
+class _PrefixedStream:
+    """Binary stream that replays a few already-read bytes before the rest of `raw`."""
+
+    def __init__(self, prefix, raw):
+        self.prefix = prefix
+        self.raw = raw
+
+    def read(self, size=-1):
+        if not self.prefix:
+            return self.raw.read(size)
+        if size is None or size < 0:
+            data, self.prefix = self.prefix + self.raw.read(), b''
+            return data
+        data, self.prefix = self.prefix[:size], self.prefix[size:]
+        if len(data) < size:
+            data += self.raw.read(size - len(data))
+        return data
+
+
+class _RecordingStream:
+    """Binary stream that keeps a copy of what was read, up to `limit` bytes."""
+
+    def __init__(self, raw, limit):
+        self.raw = raw
+        self.limit = limit
+        self.chunks = []
+        self.size = 0
+
+    def read(self, size=-1):
+        data = self.raw.read(size)
+        if self.size <= self.limit:
+            self.chunks.append(data)
+            self.size += len(data)
+        return data
+
+    def getvalue(self):
+        """The bytes read so far, or None once more than `limit` were read."""
+        return b''.join(self.chunks) if self.size <= self.limit else None
+
+
+def _open_stream(response):
+    """Return a binary stream over the response body, gunzipping .xml.gz files on the fly."""
+    # decode_content handles Content-Encoding: gzip; .xml.gz files are served as plain
+    # gzip bodies instead, so those are detected from the magic bytes
+    response.raw.decode_content = True
+    head = response.raw.read(len(GZIP_MAGIC))
+    stream = _PrefixedStream(head, response.raw)
+    if head == GZIP_MAGIC:
+        return gzip.GzipFile(fileobj=stream)
+    return stream
+
+
+def iter_sitemap(url, cache=None, session=None, timeout=30, max_depth=5, politeness=None, deferred=None,
+                 unchanged=None):
+    """
+    Stream (loc, lastmod) pairs for every page reachable from a sitemap URL.
+    Nested <sitemapindex> entries are followed up to `max_depth` levels. With
+    an HTTPCache, page sitemaps answering 304 are skipped without being parsed;
+    the (small) body of an index is cached, so an unchanged index still has
+    its children visited, each with its own conditional GET.
+    With a Politeness, every sitemap request is checked against robots.txt and
+    rate limited per host.
+    With a `deferred` list, validators are not stored as each sitemap ends:
+    a CachedResponse is appended instead, to be commit()ed once the caller has
+    handled the pages it listed.
+    With an `unchanged` list, the URL of every sitemap that answered 304 (and
+    so listed nothing) is appended to it.
+    Raises requests.HTTPError if the top-level sitemap cannot be fetched.
+    """
+    session = session or requests.Session()
+    pending = deque([(url, 0)])
+    seen = {url}
+
+    def queue_child(entry, depth):
+        if depth < max_depth and entry.loc not in seen:
+            seen.add(entry.loc)
+            pending.append((entry.loc, depth + 1))
+
+    while pending:
+        sitemap_url, depth = pending.popleft()
+        headers = cache.conditional_headers(sitemap_url) if cache else {}
+        try:
+            if politeness is not None:
+                response = polite_get(sitemap_url, politeness, session=session, headers=headers,
+                                      stream=True, timeout=timeout)
+            else:
+                response = session.get(sitemap_url, headers=headers, stream=True, timeout=timeout)
+        except requests.RequestException as e:
+            if depth == 0:
+                raise
+            print(f"Failed to fetch sitemap {sitemap_url}: {e}")
+            continue
+
+        with response:
+            if response.status_code == 304:
+                print(f"Sitemap unchanged since last run: {sitemap_url}")
+                if unchanged is not None:
+                    unchanged.append(sitemap_url)
+                # The index may be unchanged while its child sitemaps are not
+                body = cache.load_body(sitemap_url) if cache else None
+                if body is not None:
+                    try:
+                        for entry in parse_sitemap_stream(io.BytesIO(body)):
+                            if entry.kind == 'sitemap':
+                                queue_child(entry, depth)
+                    except ET.ParseError as e:
+                        print(f"Failed to parse cached sitemap index {sitemap_url}: {e}")
+                continue
+            if response.status_code != 200:
+                if depth == 0:
+                    response.raise_for_status()
+                    raise requests.HTTPError(f"Unexpected status {response.status_code}", response=response)
+                print(f"Failed to fetch sitemap {sitemap_url}. HTTP Status code: {response.status_code}")
+                continue
+
+            stream = _RecordingStream(_open_stream(response), MAX_INDEX_BODY)
+            is_index = False
+            try:
+                for entry in parse_sitemap_stream(stream):
+                    if entry.kind == 'url':
+                        yield entry.loc, entry.lastmod
+                    else:
+                        # Child sitemaps are queued and fetched after this one is closed
+                        is_index = True
+                        queue_child(entry, depth)
+            except (ET.ParseError, OSError, EOFError) as e:
+                print(f"Failed to parse sitemap {sitemap_url}: {e}")
+                continue
+
+            # Validators are recorded only once the whole document was read. Page
+            # sitemaps keep no body (it was never held in memory); an index keeps
+            # its body so a 304 can still list its children
+            if cache and not (is_index and stream.getvalue() is None):
+                stored = CachedResponse(sitemap_url, 200, stream.getvalue() if is_index else None,
+                                        False, response.headers, cache)
+                if deferred is not None:
+                    deferred.append(stored)
+                else:
+                    stored.commit()
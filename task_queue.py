@@ -0,0 +1,181 @@
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+# Task states
+QUEUED = 'queued'
+LEASED = 'leased'
+DONE = 'done'
+FAILED = 'failed'
+
+DEFAULT_VISIBILITY_TIMEOUT = 300  # Seconds a worker may hold a task before it is re-queued
+DEFAULT_MAX_ATTEMPTS = 5          # Leases handed out before a task is marked failed
+
+
+class TaskQueue:
+    def __init__(self, db_path='tasks.db', max_attempts=DEFAULT_MAX_ATTEMPTS):
+        """
+        Durable queue of scraping tasks backed by SQLite.
+        Args:
+            db_path: Path to the SQLite database file
+            max_attempts: Number of leases after which a task is given up on
+        """
+        self.max_attempts = max_attempts
+        self._lock = threading.Lock()
+        # isolation_level=None: transactions are opened explicitly with BEGIN IMMEDIATE
+        self.conn = sqlite3.connect(db_path, isolation_level=None, check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('''
+            CREATE TABLE IF NOT EXISTS tasks (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                url TEXT NOT NULL,
+                scrape_type TEXT NOT NULL,
+                state TEXT NOT NULL,
+                worker_id TEXT,
+                lease_expires REAL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                updated_at REAL NOT NULL,
+                UNIQUE (url, scrape_type)
+            )
+        ''')
+        self.conn.execute('CREATE INDEX IF NOT EXISTS tasks_state ON tasks (state, lease_expires)')
+
+    @contextmanager
+    def _transaction(self):
+        # The lock serializes server threads sharing this connection; BEGIN IMMEDIATE takes
+        # the database write lock up front so two processes never lease the same task
+        with self._lock:
+            self.conn.execute('BEGIN IMMEDIATE')
+            try:
+                yield self.conn
+            except BaseException:
+                self.conn.execute('ROLLBACK')
+                raise
+            self.conn.execute('COMMIT')
+
+    def enqueue(self, url, scrape_type):
+        """Add a task, or re-queue it if it already finished. Leased tasks are left alone."""
+        now = time.time()
+        with self._transaction() as conn:
+            conn.execute('''
+                INSERT INTO tasks (url, scrape_type, state, updated_at) VALUES (?, ?, ?, ?)
+                ON CONFLICT (url, scrape_type) DO UPDATE
+                SET state = excluded.state, attempts = 0, worker_id = NULL,
+                    lease_expires = NULL, updated_at = excluded.updated_at
+                WHERE tasks.state IN (?, ?)
+            ''', (url, scrape_type, QUEUED, now, DONE, FAILED))
+
+    def seed(self, url, scrape_type):
+        """Add a task only if none exists for it yet, whatever its state. Returns True if added."""
+        with self._transaction() as conn:
+            cursor = conn.execute('''
+                INSERT INTO tasks (url, scrape_type, state, updated_at) VALUES (?, ?, ?, ?)
+                ON CONFLICT (url, scrape_type) DO NOTHING
+            ''', (url, scrape_type, QUEUED, time.time()))
+            return cursor.rowcount == 1
+
+    def requeue_expired(self, now=None):
+        """Put tasks whose lease ran out back on the queue. Returns the number re-queued."""
+        now = now or time.time()
+        with self._transaction() as conn:
+            return self._requeue_expired(conn, now)
+
+    def _requeue_expired(self, conn, now):
+        conn.execute('''
+            UPDATE tasks SET state = ?, updated_at = ?
+            WHERE state = ? AND lease_expires < ? AND attempts >= ?
+        ''', (FAILED, now, LEASED, now, self.max_attempts))
+        cursor = conn.execute('''
+            UPDATE tasks SET state = ?, worker_id = NULL, lease_expires = NULL, updated_at = ?
+            WHERE state = ? AND lease_expires < ?
+        ''', (QUEUED, now, LEASED, now))
+        return cursor.rowcount
+
+    def checkout(self, worker_id, batch_size=1, visibility_timeout=DEFAULT_VISIBILITY_TIMEOUT):
+        """
+        Lease up to `batch_size` tasks to a worker.
+        Tasks not acked before the visibility timeout are handed out again.
+        """
+        now = time.time()
+        with self._transaction() as conn:
+            self._requeue_expired(conn, now)
+            rows = conn.execute('''
+                SELECT id, url, scrape_type FROM tasks WHERE state = ?
+                ORDER BY updated_at, id LIMIT ?
+            ''', (QUEUED, batch_size)).fetchall()
+            conn.executemany('''
+                UPDATE tasks SET state = ?, worker_id = ?, lease_expires = ?,
+                    attempts = attempts + 1, updated_at = ?
+                WHERE id = ?
+            ''', [(LEASED, worker_id, now + visibility_timeout, now, row['id']) for row in rows])
+
+        return [
+            {'task_id': row['id'], 'url': row['url'], 'scrape_type': row['scrape_type'],
+             'lease_expires': now + visibility_timeout}
+            for row in rows
+        ]
+
+    def extend(self, task_ids, worker_id, visibility_timeout=DEFAULT_VISIBILITY_TIMEOUT):
+        """
+        Push back the lease of tasks a worker is still holding (a heartbeat).
+        Leases that already ran out are not revived. Returns the number extended.
+        """
+        now = time.time()
+        with self._transaction() as conn:
+            cursor = conn.executemany('''
+                UPDATE tasks SET lease_expires = ?, updated_at = ?
+                WHERE id = ? AND state = ? AND worker_id = ? AND lease_expires >= ?
+            ''', [(now + visibility_timeout, now, task_id, LEASED, worker_id, now)
+                  for task_id in task_ids])
+            return cursor.rowcount
+
+    def take_unleased(self):
+        """
+        Hand out a task without leasing it, for workers that never ack.
+        Queued tasks come first, least recently handed out first, so successive
+        calls rotate through them; attempts are not counted. Returns None only
+        when the queue is empty.
+        """
+        now = time.time()
+        with self._transaction() as conn:
+            row = conn.execute('''
+                SELECT id, url, scrape_type, state FROM tasks
+                ORDER BY state = ? DESC, updated_at, id LIMIT 1
+            ''', (QUEUED,)).fetchone()
+            if row is None:
+                return None
+            if row['state'] == QUEUED:
+                conn.execute('UPDATE tasks SET updated_at = ? WHERE id = ?', (now, row['id']))
+        return {'url': row['url'], 'scrape_type': row['scrape_type']}
+
+    def _settle(self, task_ids, worker_id, state):
+        now = time.time()
+        with self._transaction() as conn:
+            # Only the current lease holder may settle a task, so a late ack from a
+            # worker whose lease already expired cannot clobber the new owner
+            cursor = conn.executemany('''
+                UPDATE tasks SET state = CASE WHEN ? = ? AND attempts >= ? THEN ? ELSE ? END,
+                    worker_id = NULL, lease_expires = NULL, updated_at = ?
+                WHERE id = ? AND state = ? AND worker_id = ?
+            ''', [(state, QUEUED, self.max_attempts, FAILED, state, now, task_id, LEASED, worker_id)
+                  for task_id in task_ids])
+            return cursor.rowcount
+
+    def ack(self, task_ids, worker_id):
+        """Mark leased tasks as done. Returns the number of tasks acknowledged."""
+        return self._settle(task_ids, worker_id, DONE)
+
+    def nack(self, task_ids, worker_id):
+        """
+        Release leased tasks back to the queue, or mark them failed once they have
+        used up their attempts. Returns the number of tasks released.
+        """
+        return self._settle(task_ids, worker_id, QUEUED)
+
+    def stats(self):
+        """Count tasks per state."""
+        with self._lock:
+            rows = self.conn.execute('SELECT state, COUNT(*) AS n FROM tasks GROUP BY state').fetchall()
+        return {row['state']: row['n'] for row in rows}
@@ -1,32 +1,34 @@
 import requests
 from bs4 import BeautifulSoup
-import json
-import datetime
 import xml.etree.ElementTree as ET
+from crawl_state import CrawlState
+from frontier import canonicalize_url
+from near_dup import NearDuplicateIndex, article_text
+from article_store import ArticleWriter
+from profiles import extract_for_url
+from extractor import charset_from_headers
 
 # Function to scrape a single article
 def scrape_article(article_url):
     try:
         response = requests.get(article_url)
-        soup = BeautifulSoup(response.content, "html.parser")
-        
-        # Extract the article details
-        title = soup.find("h1").text.strip() if soup.find("h1") else None
-        author = soup.find(class_="author_name").text.strip() if soup.find(class_="author_name") else "Unknown"
-        description = soup.find("meta", {"name": "description"})["content"].strip() if soup.find("meta", {"name": "description"}) else None
-        article_content = " ".join([p.text for p in soup.find_all("p")])  # All paragraphs combined
-        published_date = soup.find("time")["datetime"] if soup.find("time") else None
-        image = soup.find("img", {"class": "featured-image"})["src"] if soup.find("img", {"class": "featured-image"}) else None
+        if not response.ok:
+            # Error pages are not recorded, so the article is tried again next run
+            print(f"Error scraping {article_url}: HTTP {response.status_code}")
+            return None
+
+        # Extract every field in a single pass, using the profile for the article's site
+        article = extract_for_url(article_url, response.content, charset_from_headers(response.headers))
 
         # Return the data in the desired format
         return {
-            'title': title,
-            'author': author,
-            'description': description,
-            'text': article_content,
+            'title': article['title'],
+            'author': article['author'] or 'Unknown',
+            'description': article['description'],
+            'text': article['text'],
             'link': article_url,
-            'published_date': published_date,
-            'image_link': image
+            'published_date': article['published_date'],
+            'image_link': article['image_link']
         }
 
     except Exception as e:
@@ -71,7 +73,17 @@ def fetch_sitemap(url): #a function to fetch the urls from the sitemap.xml url,
 def main():
     sitemap_urls = fetch_sitemap('https://www.aajtak.in/rssfeeds/sitemap.xml')
     
-    all_articles = []
+    # Per-URL state from earlier runs so already-scraped, unchanged articles are skipped.
+    # It is keyed by the canonical URL, so AMP and tracking variants share one record
+    crawl_state = CrawlState()
+    # Canonical article URLs discovered this run, so a story linked from several sections
+    # is only scraped once per run; across runs crawl_state decides, so failed fetches
+    # are retried and changed ones refetched
+    seen = set()
+    # MinHash-LSH index of recent article texts; syndicated copies with small edits are dropped
+    near_dups = NearDuplicateIndex.load('near_dups.pkl', max_items=200_000)
+    # Articles are streamed to disk as they are scraped, so a crash keeps everything written so far
+    writer = ArticleWriter("aajtak_articles")
     
     for section_url in sitemap_urls:
         print(f"Crawling section: {section_url}")
@@ -80,16 +92,25 @@ def main():
         print(f"Found {len(article_links)} articles in {section_url}")
         
         for article_url in article_links:
+            canonical = canonicalize_url(article_url)
+            if canonical in seen or not crawl_state.should_fetch(canonical):
+                continue
+            seen.add(canonical)
             article_data = scrape_article(article_url)
-            if article_data:
-                all_articles.append(article_data)
+            # Only new or changed articles go into this run's output
+            if article_data and crawl_state.record(canonical, article_data['text']):
+                # Pages without body text (videos, galleries) are kept; titles alone are no evidence
+                duplicate_of = near_dups.add(article_url, article_text(article_data)) if article_data['text'] else None
+                if duplicate_of is not None:
+                    print(f"Skipping {article_url}: near-duplicate of {duplicate_of}")
+                    continue
+                writer.write(article_data)
     
-    # Save all articles to a JSON file
-    output_file = f"aajtak_articles_{datetime.datetime.now().strftime('%Y%m%d')}.json"
-    with open(output_file, "w", encoding="utf-8") as f:
-        json.dump(all_articles, f, ensure_ascii=False, indent=4)
+    crawl_state.close()
+    near_dups.save('near_dups.pkl')
+    writer.close()
     
-    print(f"Saved {len(all_articles)} articles to {output_file}")
+    print(f"Saved {writer.count} new or changed articles to {', '.join(writer.paths) or 'no files'}")
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -1,33 +1,34 @@
 import requests
 from bs4 import BeautifulSoup
-import json
-import datetime
 import xml.etree.ElementTree as ET
+from crawl_state import CrawlState
+from frontier import canonicalize_url
+from near_dup import NearDuplicateIndex, article_text
+from article_store import ArticleWriter
+from profiles import extract_for_url
+from extractor import charset_from_headers
 from urllib.parse import urlparse
+from http_cache import cached_get
+from crawl_pipeline import crawl_and_parse
+from politeness import Politeness
 
 # Function to scrape a single article
 def scrape_article(article_url):
     try:
         response = requests.get(article_url)
-        soup = BeautifulSoup(response.content, "html.parser")
-        
-        # Extract the article details
-        title = soup.find("h1").text.strip() if soup.find("h1") else None
-        author = soup.find(class_="author_name").text.strip() if soup.find(class_="author_name") else "Unknown"
-        description = soup.find("meta", {"name": "description"})["content"].strip() if soup.find("meta", {"name": "description"}) else None
-        article_content = " ".join([p.text for p in soup.find_all("p")])  # All paragraphs combined
-        published_date = soup.find("time")["datetime"] if soup.find("time") else None
-        image = soup.find("img", {"class": "featured-image"})["src"] if soup.find("img", {"class": "featured-image"}) else None
+
+        # Extract every field in a single pass, using the profile for the article's site
+        article = extract_for_url(article_url, response.content, charset_from_headers(response.headers))
 
         # Return the data in the desired format
         return {
-            'title': title,
-            'author': author,
-            'description': description,
-            'text': article_content,
+            'title': article['title'],
+            'author': article['author'] or 'Unknown',
+            'description': article['description'],
+            'text': article['text'],
             'link': article_url,
-            'published_date': published_date,
-            'image_link': image
+            'published_date': article['published_date'],
+            'image_link': article['image_link']
         }
 
     except Exception as e:
@@ -35,9 +36,16 @@ def scrape_article(article_url):
         return None
 
 # Function to crawl a section of the site and get articles
-def crawl_section(section_url, domain, article_path_pattern):
+def crawl_section(section_url, domain, article_path_pattern, politeness=None, fetched=None):
+    # Responses are appended to `fetched` so their validators can be committed
+    # once every article they link to has been handled
     try:
-        response = requests.get(section_url)
+        response = cached_get(section_url, politeness=politeness)
+        if fetched is not None:
+            fetched.append(response)
+        if response.not_modified:
+            # Section page unchanged since the last run, so it links no new articles
+            return []
         soup = BeautifulSoup(response.content, "html.parser")
         
         # Find all article links in the section
@@ -58,11 +66,12 @@ def crawl_section(section_url, domain, article_path_pattern):
         return []
 
 # Function to fetch the sitemap URLs
-def fetch_sitemap(url):
-    response = requests.get(url)
+def fetch_sitemap(url, politeness=None):
+    # The section list is needed even when unchanged, so a 304 reads the cached body back
+    response = cached_get(url, load_body=True, politeness=politeness)
     
     # Check if the request was successful
-    if response.status_code == 200:
+    if response.status in (200, 304) and response.content is not None:
         # Parse the XML content
         root = ET.fromstring(response.content)
         
@@ -71,7 +80,7 @@ def fetch_sitemap(url):
         
         return urls
     else:
-        print(f"Failed to fetch sitemap. HTTP Status code: {response.status_code}")
+        print(f"Failed to fetch sitemap. HTTP Status code: {response.status}")
         return []
 
 # Main function to crawl and save articles in JSON format
@@ -85,28 +94,64 @@ def main():
     # Define the article path pattern (can be replaced based on the site you're crawling)
     article_path_pattern = "/story/"  # For AajTak, you can change it as needed
     
+    # robots.txt, per-host rate limits and backoff for every request of the crawl
+    politeness = Politeness()
+
     # Fetch the sitemap URLs
-    sitemap_urls = fetch_sitemap(sitemap_url)
+    sitemap_urls = fetch_sitemap(sitemap_url, politeness)
     
-    all_articles = []
-    
-    for section_url in sitemap_urls:
-        print(f"Crawling section: {section_url}")
-        article_links = crawl_section(section_url, domain, article_path_pattern)
-        
-        print(f"Found {len(article_links)} articles in {section_url}")
-        
-        for article_url in article_links:
-            article_data = scrape_article(article_url)
-            if article_data:
-                all_articles.append(article_data)
+    # Per-URL state from earlier runs so already-scraped, unchanged articles are skipped.
+    # It is keyed by the canonical URL, so AMP and tracking variants share one record
+    crawl_state = CrawlState()
+    # Canonical article URLs discovered this run, so a story linked from several sections
+    # is only fetched once per run; across runs crawl_state decides, so failed fetches
+    # are retried and changed ones refetched
+    seen = set()
+    # MinHash-LSH index of recent article texts; syndicated copies with small edits are dropped
+    near_dups = NearDuplicateIndex.load(f"near_dups_{domain}.pkl", max_items=200_000)
+    # Articles are streamed to disk as they are parsed, so a crash keeps everything written so far
+    writer = ArticleWriter(f"{domain}_articles")
+
+    # Section pages fetched this run; a 304 means "nothing new" only after they were fully crawled
+    section_responses = []
+
+    def article_urls():
+        # Runs in the fetch engine's feeder thread, so sections are crawled while
+        # earlier articles are already being downloaded and parsed
+        for section_url in sitemap_urls:
+            print(f"Crawling section: {section_url}")
+            article_links = crawl_section(section_url, domain, article_path_pattern, politeness, section_responses)
+
+            print(f"Found {len(article_links)} articles in {section_url}")
+
+            for article_url in article_links:
+                canonical = canonicalize_url(article_url)
+                if canonical not in seen and crawl_state.should_fetch(canonical):
+                    seen.add(canonical)
+                    yield article_url
+
+    def handle_article(article_data):
+        # Only new or changed articles go into this run's output
+        if crawl_state.record(canonicalize_url(article_data['link']), article_data['text']):
+            # Pages without body text (videos, galleries) are kept; titles alone are no evidence
+            duplicate_of = near_dups.add(article_data['link'], article_text(article_data)) \
+                if article_data['text'] else None
+            if duplicate_of is not None:
+                print(f"Skipping {article_data['link']}: near-duplicate of {duplicate_of}")
+                return
+            writer.write(article_data)
+
+    # Network fetch and HTML parsing run as separate stages: pages are downloaded
+    # concurrently and parsed on every core by a process pool
+    crawl_and_parse(article_urls(), handle_article, politeness=politeness)
+    for response in section_responses:
+        response.commit()
     
-    # Save all articles to a JSON file
-    output_file = f"articles_{domain}_{datetime.datetime.now().strftime('%Y%m%d')}.json"
-    with open(output_file, "w", encoding="utf-8") as f:
-        json.dump(all_articles, f, ensure_ascii=False, indent=4)
+    crawl_state.close()
+    near_dups.save(f"near_dups_{domain}.pkl")
+    writer.close()
     
-    print(f"Saved {len(all_articles)} articles to {output_file}")
+    print(f"Saved {writer.count} new or changed articles to {', '.join(writer.paths) or 'no files'}")
 
 if __name__ == "__main__":
     main()